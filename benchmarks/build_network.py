@@ -0,0 +1,238 @@
+"""Benchmark the host-side paths used to build, serialise and decode networks
+
+Builds synthetic networks of 3x3 convolutional layers and measures the time
+and peak memory of adding layers (partitioning and Vertex construction),
+assigning the keyspace, sizing and serialising each region class and decoding
+recorded spikes. Results are appended to a JSON file, labelled with the
+current git revision, and compared against the previous run of each case.
+
+Run from the root of the repository with:
+    python -m benchmarks.build_network
+"""
+# Import modules
+import argparse
+import json
+import multiprocessing
+import numpy as np
+import os
+import resource
+import subprocess
+import time
+
+# Import classes
+from collections import OrderedDict
+from conv_net import ConvNet
+from conv_neuron_layer import Regions
+from io import BytesIO
+from readback import RegionBuffer
+
+# Synthetic networks to benchmark - size of square input
+# images and number of kernels in each layer with stride
+Networks = OrderedDict([
+    ("cifar", (32, [(96, 1), (96, 1), (96, 2), (192, 1), (192, 1),
+                    (192, 2), (192, 1)])),
+    ("large", (64, [(128, 1), (128, 1), (128, 2), (256, 1), (256, 1),
+                    (256, 2), (512, 1), (512, 1)])),
+])
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def get_label():
+    # Label results with the current git revision if possible
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            stderr=subprocess.STDOUT).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def build_weights(args):
+    # Generate random weights for each layer of network
+    rng = np.random.RandomState(args.seed)
+    image_size, layers = Networks[args.network]
+
+    depth = 3
+    weights = []
+    for num_kernels, stride in layers:
+        weights.append((rng.randn(3, 3, depth, num_kernels) * 0.05, stride))
+        depth = num_kernels
+    return rng.rand(3, image_size, image_size), weights
+
+def build_network(args, test_data, weights):
+    conv_net = ConvNet(16.0, np.exp(-1.0 / 10.0), test_data,
+                       sim_ticks=args.ticks,
+                       num_profile_samples=args.profile_samples)
+
+    size = test_data.shape[1]
+    for w, stride in weights:
+        size //= stride
+        conv_net.add_layer(output_width=size, output_height=size, padding=1,
+                           stride=stride, weights=w, record_spikes=True,
+                           spike_rate=args.rate)
+    return conv_net
+
+def build_recordings(args, conv_net):
+    # Generate random recordings for every vertex, including the region
+    # header, to build memory as it would be read back from SDRAM
+    rng = np.random.RandomState(args.seed)
+    region_memory = {}
+    for l in conv_net._layers:
+        neurons = l.regions[Regions.neurons]
+        for v in l.vertices:
+            num_bytes = neurons.sizeof(v.x_slice, v.y_slice, v.z_slice,
+                                       v.neuron_fixed_point_pos)
+            data = rng.randint(0, 256, num_bytes).astype(np.uint8)
+            region_memory[v] = {Regions.neurons: RegionBuffer(data.tobytes())}
+    return region_memory
+
+def get_region_vertices(conv_net, z_mask, region):
+    # Get the layer, vertex and arguments of every
+    # vertex in the network which has the region
+    return [(l, v, l.get_region_arguments(v, z_mask)[region])
+            for l in conv_net._layers if region in l.regions
+            for v in l.vertices]
+
+# ----------------------------------------------------------------------------
+# Cases
+# ----------------------------------------------------------------------------
+# Each case is a module-level function which performs any setup required and
+# returns a function to time. As some operations can only be performed once
+# on a network, setup is repeated before each measurement
+# **NOTE** cases are passed to a new process so must be picklable under any
+# multiprocessing start method - any parameters are passed as extra arguments
+def case_add_layer(args, test_data, weights):
+    return lambda: build_network(args, test_data, weights)
+
+def case_assign_keyspace(args, test_data, weights):
+    conv_net = build_network(args, test_data, weights)
+    return conv_net._assign_keyspace
+
+def case_region(args, test_data, weights, region):
+    conv_net = build_network(args, test_data, weights)
+    z_mask = conv_net._assign_keyspace()
+    region_vertices = get_region_vertices(conv_net, z_mask, region)
+
+    def serialise():
+        for l, v, (a, k) in region_vertices:
+            fp = BytesIO()
+            l.regions[region].sizeof(*a, **k)
+            l.regions[region].write_subregion_to_file(fp, *a, **k)
+    return serialise
+
+def case_decode_spikes(args, test_data, weights):
+    conv_net = build_network(args, test_data, weights)
+    region_memory = build_recordings(args, conv_net)
+
+    def decode():
+        for l in conv_net._layers:
+            for m in (region_memory[v][Regions.neurons] for v in l.vertices):
+                m.seek(0)
+            l.read_recorded_spikes(region_memory)
+    return decode
+
+def measure(case, case_args, args, queue):
+    # Build inputs before measuring so they aren't counted
+    test_data, weights = build_weights(args)
+
+    # Measure how much the peak resident set size grows during a single run
+    # **NOTE** this runs before timing as the peak is a high-water mark
+    func = case(args, test_data, weights, *case_args)
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    func()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Time case, repeating setup before each run
+    times = []
+    for _ in range(args.repeats):
+        func = case(args, test_data, weights, *case_args)
+        start_time = time.time()
+        func()
+        times.append(time.time() - start_time)
+
+    queue.put((min(times), peak_rss - start_rss))
+
+def run_case(case, case_args, args):
+    # Run each case in a separate process so peak memory usage is independent
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure,
+                                      args=(case, case_args, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def load_results(filename):
+    if os.path.exists(filename):
+        with open(filename, "r") as f:
+            return json.load(f)
+    else:
+        return []
+
+def get_previous(results, network, name):
+    # Find the most recent result for case
+    for run in reversed(results):
+        if network in run["results"] and name in run["results"][network]:
+            return run["label"], run["results"][network][name]
+    return None, None
+
+# ----------------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--networks", nargs="+", choices=list(Networks),
+                        default=list(Networks))
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=0.02,
+                        help="expected spikes per neuron per tick")
+    parser.add_argument("--profile-samples", type=int, default=None,
+                        help="add profiler regions with this many samples")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--results", default="benchmark_results.json",
+                        help="JSON file results are appended to")
+    parser.add_argument("--label", default=None,
+                        help="label for results (defaults to git revision)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    label = get_label() if args.label is None else args.label
+    results = load_results(args.results)
+
+    cases = [("add_layer", case_add_layer, ()),
+             ("assign_keyspace", case_assign_keyspace, ())]
+    cases.extend(("serialise_%s" % r.name, case_region, (r,)) for r in Regions
+                 if r != Regions.profiler or args.profile_samples is not None)
+    cases.append(("decode_spikes", case_decode_spikes, ()))
+
+    # **NOTE** ru_maxrss is in kilobytes on Linux
+    run_results = {}
+    for network in args.networks:
+        args.network = network
+        print("Network '%s' (%s)" % (network, label))
+
+        network_results = run_results[network] = {}
+        for name, case, case_args in cases:
+            duration, peak_kb = run_case(case, case_args, args)
+            network_results[name] = {"time_s": duration, "peak_kb": peak_kb}
+
+            # Compare against previous result
+            prev_label, prev = get_previous(results, network, name)
+            if prev is None:
+                change = ""
+            else:
+                change = " (%+.1f%% time, %+.2fMiB peak memory vs %s)" % (
+                    ((duration / prev["time_s"]) - 1.0) * 100.0,
+                    (peak_kb - prev["peak_kb"]) / 1024.0, prev_label)
+
+            print("\t%-24s %10.2fms, peak memory increase %8.2fMiB%s" %
+                  (name, duration * 1000.0, peak_kb / 1024.0, change))
+
+    # Append this run to results file
+    if not args.no_save:
+        results.append({"label": label, "time": time.time(),
+                        "ticks": args.ticks, "rate": args.rate,
+                        "results": run_results})
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
@@ -0,0 +1,141 @@
+"""Benchmark decoding of spike recordings in Neurons.read_recorded_spikes
+
+Run from the root of the repository with:
+    python -m benchmarks.decode_spikes
+"""
+# Import modules
+import argparse
+import multiprocessing
+import numpy as np
+import resource
+import timeit
+
+# Import classes
+from io import BytesIO
+from regions import Neurons
+
+# Import functions
+from regions.neurons import calc_bitfield_words
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def build_recording(args):
+    # Create a neurons region for a single vertex
+    neurons = Neurons(args.width, args.height, 0.9, 1.0, True, args.ticks)
+
+    # Generate random spiking bitfield words for each tick
+    # **NOTE** ticks are generated one at a time to keep
+    # the peak memory usage of the benchmark itself low
+    num_neurons = args.width * args.height * args.depth
+    rng = np.random.RandomState(args.seed)
+    words = np.zeros((args.ticks, calc_bitfield_words(num_neurons)),
+                     dtype="<u4")
+    for t in range(args.ticks):
+        neuron = np.flatnonzero(rng.rand(num_neurons) < args.rate)
+        np.bitwise_or.at(words[t], neuron // 32,
+                         (1 << (neuron % 32)).astype(np.uint32))
+
+    # Prepend region header to build memory as it would be read from SDRAM
+    return neurons, BytesIO((b"\0" * Neurons.HeaderBytes) + words.tobytes())
+
+def legacy_read_recorded_spikes(neurons, z_slice, region_memory):
+    # Decoder previously used by Neurons.read_recorded_spikes
+    output_depth = z_slice.stop - z_slice.start
+    num_neurons = neurons.output_width * neurons.output_height * output_depth
+    sample_bytes = calc_bitfield_words(num_neurons) * 4
+
+    region_memory.seek(Neurons.HeaderBytes)
+    data = region_memory.read(sample_bytes * neurons.sim_ticks)
+    data = np.frombuffer(data, dtype=np.uint8).copy()
+    data = data.view(dtype=np.uint32).byteswap().view(dtype=np.uint8)
+    data = np.fliplr(np.unpackbits(data).reshape(-1, 32))
+    data = data.reshape((-1, sample_bytes * 8))
+    data = data[:, :num_neurons]
+    return data.reshape((neurons.sim_ticks, neurons.output_width,
+                         neurons.output_height, output_depth))
+
+def get_slices(neurons, z_slice):
+    # Decode recording of a vertex simulating the whole output plane
+    return (slice(0, neurons.output_width), slice(0, neurons.output_height),
+            z_slice)
+
+def decode_legacy(neurons, z_slice, region_memory, args):
+    return legacy_read_recorded_spikes(neurons, z_slice, region_memory)
+
+def decode_dense(neurons, z_slice, region_memory, args):
+    return neurons.read_recorded_spikes(*get_slices(neurons, z_slice),
+                                        region_memory=region_memory)
+
+def decode_indices(neurons, z_slice, region_memory, args):
+    return neurons.read_recorded_spikes(*get_slices(neurons, z_slice),
+                                        region_memory=region_memory,
+                                        indices=True)
+
+def decode_indices_chunked(neurons, z_slice, region_memory, args):
+    # Decode recording a chunk of ticks at a time, as it might be streamed
+    spike_indices = []
+    for start_tick in range(0, args.ticks, args.chunk_ticks):
+        tick_slice = slice(start_tick, start_tick + args.chunk_ticks)
+        spike_indices.extend(neurons.read_recorded_spikes(
+            *get_slices(neurons, z_slice), region_memory=region_memory,
+            tick_slice=tick_slice, indices=True))
+    return spike_indices
+
+def measure(decoder, args, queue):
+    # Build recording before measuring so it isn't counted
+    neurons, region_memory = build_recording(args)
+    z_slice = slice(0, args.depth)
+
+    # Measure how much the peak resident set size grows during a single decode
+    # **NOTE** this runs before timing as the peak is a high-water mark
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    decoder(neurons, z_slice, region_memory, args)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Time decoder
+    times = timeit.repeat(
+        lambda: decoder(neurons, z_slice, region_memory, args),
+        number=1, repeat=args.repeats)
+
+    queue.put((min(times), peak_rss - start_rss))
+
+def run_case(decoder, args):
+    # Run each case in a separate process so peak memory usage is independent
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure,
+                                      args=(decoder, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+# ----------------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=32)
+    parser.add_argument("--height", type=int, default=32)
+    parser.add_argument("--depth", type=int, default=96)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=0.02,
+                        help="probability of each neuron spiking each tick")
+    parser.add_argument("--chunk-ticks", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    print("Decoding %u ticks of %ux%ux%u neurons (spike probability %f)" %
+          (args.ticks, args.width, args.height, args.depth, args.rate))
+
+    # **NOTE** ru_maxrss is in kilobytes on Linux
+    cases = [("legacy dense", decode_legacy),
+             ("dense", decode_dense),
+             ("indices", decode_indices),
+             ("indices (%u tick chunks)" % args.chunk_ticks,
+              decode_indices_chunked)]
+    for name, decoder in cases:
+        duration, peak_kb = run_case(decoder, args)
+        print("\t%-24s %8.2fms, peak memory increase %8.2fMiB" %
+              (name, duration * 1000.0, peak_kb / 1024.0))
@@ -0,0 +1,188 @@
+"""Evaluate the classification accuracy and throughput of an imported network
+
+Presents test images to a network loaded from a bundle, either simulated on
+the host or run on a SpiNNaker board, and predicts the class of each image as
+the channel of the output layer which emitted the most spikes (summed across
+its width and height). Reports the accuracy after every tick, images per
+second and the time spent in each phase and saves them to an npz file.
+
+Test images should be preprocessed in the same way as those the network was
+trained on and saved as the "images" (image, channel, width, height) and
+"labels" arrays of an npz file.
+
+**NOTE** like neon_test.py, the spikes recorded by the output layer are saved
+to layer_N.npz in the current directory, from where they are read back
+
+Run from the root of the repository with:
+    python -m benchmarks.evaluate model.bundle test_data.npz
+"""
+# Import modules
+import argparse
+import importers
+import logging
+import numpy as np
+import time
+
+# Import classes
+from collections import OrderedDict
+from conv_net import ConvNet
+from spike_store import SpikeStore
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def load_test_data(filename, num_images):
+    # Load images and labels, optionally using only the first num_images
+    with np.load(filename) as data:
+        images = data["images"][:num_images]
+        labels = data["labels"][:num_images].astype(np.int64)
+
+    assert len(images.shape) == 4
+    assert len(images) == len(labels)
+    return images, labels
+
+def get_class_spikes(spike_store):
+    # Sum output spikes across width and height to count the spikes
+    # emitted by each class and accumulate over the ticks of each image
+    # **NOTE** result has shape (images, ticks, classes)
+    return np.cumsum(np.sum(spike_store.dense(), axis=(2, 3), dtype=np.uint32),
+                     axis=1, dtype=np.uint32)
+
+def get_predictions(class_spikes):
+    # Predict the class which emitted the most spikes, counting images
+    # where no class leads (including those with no spikes) as unclassified
+    predictions = np.argmax(class_spikes, axis=-1)
+    leader = np.amax(class_spikes, axis=-1)
+    num_leaders = np.sum(class_spikes == leader[..., np.newaxis], axis=-1)
+    predictions[num_leaders > 1] = -1
+    return predictions
+
+def evaluate_batch(args, layers, images):
+    conv_net = ConvNet(args.threshold, np.exp(-1.0 / args.decay_tau), images,
+                       timer_period_us=args.timer_period,
+                       sim_ticks=args.ticks)
+
+    # Add layers, only recording the output layer's spikes
+    record_spikes = [False] * (len(layers) - 1) + [True]
+    importers.add_layers(conv_net, layers, record_spikes=record_spikes,
+                         weight_bits=args.weight_bits)
+
+    # Simulate on host or run on SpiNNaker
+    if args.spinnaker is None:
+        conv_net.simulate()
+        decision_tick = None
+    else:
+        decision_tick = conv_net.run(
+            args.spinnaker,
+            place_and_route_cache_dir=args.place_and_route_cache_dir,
+            early_termination_margin=args.early_termination_margin)
+
+    # Read back output layer's spikes
+    spike_store = SpikeStore.load("layer_%u.npz" % (len(layers) - 1))
+    return get_class_spikes(spike_store), conv_net.phase_times, decision_tick
+
+def print_report(labels, predictions, phase_times, duration, decision_ticks,
+                 num_report_ticks):
+    num_images, num_ticks = predictions.shape
+    accuracy = np.mean(predictions == labels[:, np.newaxis], axis=0)
+    unclassified = np.mean(predictions[:, -1] == -1)
+
+    print("Evaluated %u images for %u ticks" % (num_images, num_ticks))
+    print("\tAccuracy:%.2f%% (%.2f%% unclassified)" %
+          (accuracy[-1] * 100.0, unclassified * 100.0))
+
+    # Report accuracy after evenly-spaced ticks and when it first
+    # reaches 99% of its final value, roughly how many ticks are required
+    print("\tAccuracy after tick:")
+    for t in np.unique(np.linspace(0, num_ticks, num_report_ticks + 1,
+                                   dtype=int)[1:]):
+        print("\t\t%4u: %.2f%%" % (t, accuracy[t - 1] * 100.0))
+    settled_tick = np.argmax(accuracy >= (0.99 * accuracy[-1])) + 1
+    print("\t99%% of final accuracy reached after %u ticks" % settled_tick)
+
+    if len(decision_ticks) > 0:
+        print("\tEarly termination decided %u/%u images after a mean of "
+              "%.1f ticks" % (len(decision_ticks), num_images,
+                              np.mean(decision_ticks)))
+
+    print("\tThroughput:%.2f images per second (%.3fs per image)" %
+          (num_images / duration, duration / num_images))
+    print("\tTime per phase:")
+    for name, phase_time in phase_times.items():
+        print("\t\t%-16s %8.2fs (%.3fs per image)" %
+              (name, phase_time, phase_time / num_images))
+
+# ----------------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("bundle", help="bundle of layers to evaluate")
+    parser.add_argument("data", help="npz file of test images and labels")
+    parser.add_argument("--num-images", type=int, default=None,
+                        help="number of test images to evaluate (default all)")
+    parser.add_argument("--batch-size", type=int, default=10,
+                        help="number of images presented in each simulation")
+    parser.add_argument("--spinnaker", default=None,
+                        help="hostname of SpiNNaker board to run on "
+                             "(default simulate on host)")
+    parser.add_argument("--ticks", type=int, default=200,
+                        help="number of ticks each image is presented for")
+    parser.add_argument("--timer-period", type=int, default=20000,
+                        help="timer period in microseconds")
+    parser.add_argument("--threshold", type=float, default=16.0)
+    parser.add_argument("--decay-tau", type=float, default=10.0,
+                        help="membrane time constant in ticks")
+    parser.add_argument("--weight-bits", type=int, default=8, choices=(4, 8))
+    parser.add_argument("--early-termination-margin", type=int, default=None,
+                        help="stop simulating each image once the leading "
+                             "class leads by this many spikes (SpiNNaker "
+                             "only, requires a batch size of 1)")
+    parser.add_argument("--place-and-route-cache-dir", default=None)
+    parser.add_argument("--report-ticks", type=int, default=10,
+                        help="number of ticks to report accuracy after")
+    parser.add_argument("--output", default="evaluation.npz",
+                        help="npz file results are saved to")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    layers = importers.load_bundle(args.bundle)
+    images, labels = load_test_data(args.data, args.num_images)
+
+    # Evaluate images in batches, accumulating time spent in each phase
+    class_spikes = []
+    decision_ticks = []
+    phase_times = OrderedDict()
+    start_time = time.time()
+    for start in range(0, len(images), args.batch_size):
+        batch_class_spikes, batch_phase_times, decision_tick =\
+            evaluate_batch(args, layers,
+                           images[start:start + args.batch_size])
+        class_spikes.append(batch_class_spikes)
+        if decision_tick is not None:
+            decision_ticks.append(decision_tick)
+        for name, phase_time in batch_phase_times.items():
+            phase_times[name] = phase_times.get(name, 0.0) + phase_time
+
+        print("Evaluated %u/%u images" % (start + len(batch_class_spikes),
+                                          len(images)))
+    duration = time.time() - start_time
+
+    class_spikes = np.concatenate(class_spikes)
+    predictions = get_predictions(class_spikes)
+
+    print_report(labels, predictions, phase_times, duration, decision_ticks,
+               args.report_ticks)
+
+    np.savez(args.output, labels=labels, predictions=predictions,
+             class_spikes=class_spikes[:, -1],
+             accuracy=np.mean(predictions == labels[:, np.newaxis], axis=0),
+             decision_ticks=np.asarray(decision_ticks),
+             phase_names=np.asarray(list(phase_times.keys())),
+             phase_times=np.asarray(list(phase_times.values())),
+             images_per_second=len(images) / duration)
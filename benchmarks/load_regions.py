@@ -0,0 +1,116 @@
+"""Benchmark loading regions using a stand-in for MachineController
+
+Run from the root of the repository with:
+    python -m benchmarks.load_regions
+"""
+# Import modules
+import argparse
+import itertools
+import numpy as np
+from rig import machine
+import threading
+import time
+
+# Import classes
+from conv_net import ConvNet
+from loader import Loader
+from rig.machine_control.machine_controller import MemoryIO
+
+# ----------------------------------------------------------------------------
+# LocalMachineController
+# ----------------------------------------------------------------------------
+class LocalMachineController(object):
+    """Stand-in for MachineController which discards writes after delaying
+    them to model the latency and bandwidth of each board's connection"""
+    ChipsPerBoard = 48
+
+    def __init__(self, latency_s, bytes_per_s):
+        self.latency_s = latency_s
+        self.bytes_per_s = bytes_per_s
+
+        self._next_address = {}
+        self._lock = threading.Lock()
+
+    def _get_connection(self, x, y):
+        # Use one connection per board of chips
+        return ((y * 256) + x) // self.ChipsPerBoard
+
+    def sdram_alloc_as_filelike(self, size, tag=0, x=None, y=None):
+        # Bump allocate SDRAM on each chip
+        with self._lock:
+            address = self._next_address.get((x, y), 0x60000000)
+            self._next_address[(x, y)] = address + size
+
+        # Allocation requires a round trip
+        time.sleep(self.latency_s)
+        return MemoryIO(self, x, y, address, address + size)
+
+    def write(self, address, data, x, y, p=0):
+        time.sleep(self.latency_s + (len(data) / float(self.bytes_per_s)))
+
+    def read(self, address, length_bytes, x, y, p=0):
+        time.sleep(self.latency_s + (length_bytes / float(self.bytes_per_s)))
+        return b"\0" * length_bytes
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def build_network(args):
+    # Build a network of 3x3 convolutional layers with random weights
+    rng = np.random.RandomState(args.seed)
+    conv_net = ConvNet(16.0, np.exp(-1.0 / 10.0),
+                       rng.randn(3, args.size, args.size))
+
+    depth = 3
+    for num_kernels in args.kernels:
+        conv_net.add_layer(output_width=args.size, output_height=args.size,
+                           padding=1, stride=1,
+                           weights=rng.randn(3, 3, depth, num_kernels) * 0.05,
+                           record_spikes=True)
+        depth = num_kernels
+
+    z_mask = conv_net._assign_keyspace()
+    return conv_net._layers, z_mask
+
+def place(layers, args):
+    # Place 16 vertices per chip, spreading chips across boards
+    placements = {}
+    allocations = {}
+    vertices = itertools.chain.from_iterable(l.vertices for l in layers)
+    for i, v in enumerate(vertices):
+        chip = i // 16
+        board = chip % args.boards
+        chip_on_board = chip // args.boards
+        placements[v] = ((board * LocalMachineController.ChipsPerBoard) +
+                         chip_on_board, 0)
+        allocations[v] = {machine.Cores: slice(1 + (i % 16), 2 + (i % 16))}
+    return placements, allocations
+
+# ----------------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=32)
+    parser.add_argument("--kernels", type=int, nargs="+",
+                        default=[96, 96, 96, 192, 192, 192])
+    parser.add_argument("--boards", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--bandwidth-mb", type=float, default=8.0)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    layers, z_mask = build_network(args)
+    placements, allocations = place(layers, args)
+    print("Loading %u vertices on %u chips across %u boards" %
+          (len(placements), len(set(placements.values())), args.boards))
+
+    machine_controller = LocalMachineController(
+        args.latency_ms / 1000.0, args.bandwidth_mb * 1024.0 * 1024.0)
+    for num_threads in args.threads:
+        loader = Loader(machine_controller, placements, allocations, z_mask,
+                        num_threads)
+        start_time = time.time()
+        loader.load(layers)
+        print("\t%u threads: %.2fs" % (num_threads, time.time() - start_time))
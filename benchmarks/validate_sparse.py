@@ -0,0 +1,130 @@
+"""Validate sparse kernels against dense kernels in a host simulation
+
+Builds the same synthetic network of 3x3 convolutional layers twice: once with
+dense kernels whose weights have already been pruned and once with the
+original weights and a prune threshold, so they are stored in the sparse
+format. Checks that unpacking the sparse serialisation of every core's kernels
+gives exactly the same fixed-point kernels as the pruned dense serialisation
+and that simulating both networks on the host produces identical spikes.
+
+Run from the root of the repository with:
+    python -m benchmarks.validate_sparse
+"""
+# Import modules
+import argparse
+import numpy as np
+import sys
+
+# Import classes
+from conv_net import ConvNet
+from conv_neuron_layer import Regions
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def build_weights(args):
+    # Generate random images and weights for each layer of network
+    rng = np.random.RandomState(args.seed)
+
+    depth = 3
+    weights = []
+    for num_kernels, stride in ((16, 1), (24, 2), (8, 1)):
+        weights.append((rng.randn(3, 3, depth, num_kernels) * args.scale,
+                        stride))
+        depth = num_kernels
+    return rng.rand(args.images, 3, args.size, args.size), weights
+
+def prune(weights, prune_threshold):
+    # Zero weights with smaller magnitudes, as ConvKernel.prune does
+    return np.where(np.fabs(weights) < prune_threshold, 0.0, weights)
+
+def build_network(args, test_data, weights, sparse):
+    conv_net = ConvNet(1.0, np.exp(-1.0 / 10.0), test_data,
+                       sim_ticks=args.ticks)
+
+    # Add layers either with pre-pruned dense
+    # kernels or with sparse kernels pruned on build
+    size = test_data.shape[2]
+    for w, stride in weights:
+        size //= stride
+        conv_net.add_layer(
+            output_width=size, output_height=size, padding=1, stride=stride,
+            weights=(w if sparse else prune(w, args.prune_threshold)),
+            record_spikes=True, tile_width=args.tile_size,
+            tile_height=args.tile_size,
+            prune_threshold=(args.prune_threshold if sparse else None))
+    return conv_net
+
+def unpack_vertex_kernels(layer, vertex):
+    # Serialise vertex's kernels exactly as they would be written to
+    # SDRAM and unpack them into dense fixed-point kernels
+    return layer.regions[Regions.conv_kernel].get_runtime_kernels(
+        vertex.weights, vertex.fixed_point_pos)
+
+def compare_kernels(dense_net, sparse_net):
+    # Loop through the vertices of each pair of layers
+    num_mismatched = 0
+    for i, (dense_layer, sparse_layer) in enumerate(zip(dense_net.layers,
+                                                        sparse_net.layers)):
+        assert sparse_layer.regions[Regions.conv_kernel].sparse
+        density = sparse_layer.regions[Regions.conv_kernel].get_density(
+            sparse_layer.vertices[0].weights)
+        print("Layer %u: density:%.3f, dense cores:%u, sparse cores:%u" %
+              (i, density, len(dense_layer.vertices),
+               len(sparse_layer.vertices)))
+
+        # **NOTE** fixed-point positions are chosen for each core so
+        # kernels can only be compared if layers are partitioned identically
+        slices = [[(v.x_slice, v.y_slice, v.z_slice) for v in l.vertices]
+                  for l in (dense_layer, sparse_layer)]
+        if slices[0] != slices[1]:
+            print("\tLayers partitioned differently - cannot compare")
+            num_mismatched += 1
+            continue
+
+        for j, (dense_vert, sparse_vert) in enumerate(
+                zip(dense_layer.vertices, sparse_layer.vertices)):
+            dense_kernels = unpack_vertex_kernels(dense_layer, dense_vert)
+            sparse_kernels = unpack_vertex_kernels(sparse_layer, sparse_vert)
+            if not np.array_equal(dense_kernels, sparse_kernels):
+                print("\tVertex %u kernels differ in %u weights" %
+                      (j, np.count_nonzero(dense_kernels != sparse_kernels)))
+                num_mismatched += 1
+    return num_mismatched
+
+def compare_spikes(dense_net, sparse_net):
+    # Simulate both networks on host and compare spikes emitted by each layer
+    num_mismatched = 0
+    for i, (dense_spikes, sparse_spikes) in enumerate(
+            zip(dense_net.simulate_spikes(), sparse_net.simulate_spikes())):
+        identical = np.array_equal(dense_spikes, sparse_spikes)
+        print("Layer %u: dense spikes:%u, sparse spikes:%u, identical:%s" %
+              (i, np.sum(dense_spikes), np.sum(sparse_spikes), identical))
+        if not identical:
+            num_mismatched += 1
+    return num_mismatched
+
+# ----------------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=12,
+                        help="width and height of input images")
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--tile-size", type=int, default=4)
+    parser.add_argument("--scale", type=float, default=0.2,
+                        help="standard deviation of random weights")
+    parser.add_argument("--prune-threshold", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    test_data, weights = build_weights(args)
+    dense_net = build_network(args, test_data, weights, False)
+    sparse_net = build_network(args, test_data, weights, True)
+
+    num_mismatched = (compare_kernels(dense_net, sparse_net) +
+                      compare_spikes(dense_net, sparse_net))
+    print("PASSED" if num_mismatched == 0 else "FAILED")
+    sys.exit(0 if num_mismatched == 0 else 1)
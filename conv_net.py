@@ -2,20 +2,34 @@
 import itertools
 import logging
 import numpy as np
-from rig import machine
-from rig_cpp_common import profiling
+import regions
 import time
 
 # Import classes
-from conv_neuron_layer import ConvNeuronLayer
+from collections import OrderedDict
+from conv_neuron_layer import ConvNeuronLayer, Regions
+from cost_model import CostModel
+from early_termination import EarlyTermination
+from loader import Loader
+from performance_model import PerformanceModel
+from place_and_route_cache import PlaceAndRouteCache
+from profile_report import ProfileReport
+from readback import Readback
+from region_cache import RegionCache
+from run_monitor import RunMonitor
 from rig.bitfield import BitField
 from rig.machine_control.consts import AppState, signal_types, AppSignal, MessageType
 from rig.machine_control.machine_controller import MachineController
-from rig.netlist import Net
+from simulator import Simulator
+from spike_store import SpikeStore
+from traffic_model import TrafficModel
 
 # Import functions
-from rig.place_and_route import place_and_route_wrapper
+from routing import (build_nets, log_routing_table_report,
+                     minimise_routing_tables, place_and_route)
 from six import iteritems, itervalues
+from traffic_model import (get_expected_vertex_packets,
+                           get_recorded_vertex_packets)
 
 logger = logging.getLogger("convolver")
 
@@ -24,22 +38,37 @@ logger = logging.getLogger("convolver")
 # ----------------------------------------------------------------------------
 class ConvNet(object):
     def __init__(self, neuron_threshold, neuron_decay, test_data,
-                 timer_period_us=20000, sim_ticks=200, num_profile_samples=None):
+                 timer_period_us=20000, sim_ticks=200, num_profile_samples=None,
+                 cost_model=None):
+        # If a single test image is passed, treat it as a batch of one
+        # **NOTE** test data is either a single channel, width, height
+        # image or a batch of these stacked along a leading image axis
+        self._batch = (len(test_data.shape) == 4)
+        if not self._batch:
+            test_data = test_data[np.newaxis]
+
         # Cache network parameters
         self._neuron_threshold = neuron_threshold
         self._neuron_decay = neuron_decay
         self._test_data = test_data
+        self._num_images = test_data.shape[0]
         self._timer_period_us = timer_period_us
         self._sim_ticks = sim_ticks
         self._num_profile_samples = num_profile_samples
+        self._cost_model = CostModel() if cost_model is None else cost_model
 
         self._vert_index = 0
 
         # Create data structures
         self._layers = []
+        self._spike_rates = []
         self._vertex_applications = {}
         self._vertex_resources = {}
 
+        # Time taken by each phase of the last simulation or run
+        self.phase_times = OrderedDict()
+        self._phase_start_time = None
+
         # Create a 32-bit keyspace
         self._keyspace = BitField(32)
         self._keyspace.add_field("vert_index", tags="routing")
@@ -47,14 +76,40 @@ class ConvNet(object):
         self._keyspace.add_field("y", length=8, start_at=8)
         self._keyspace.add_field("x", length=8, start_at=0)
 
+    # ------------------------------------------------------------------------
+    # Properties
+    # ------------------------------------------------------------------------
+    @property
+    def layers(self):
+        """Layers added to the network, in the order they were added"""
+        return self._layers
+
     # ------------------------------------------------------------------------
     # Public methods
     # ------------------------------------------------------------------------
     def add_layer(self, output_width, output_height, padding, stride, weights,
-                  record_spikes):
+                  record_spikes, spike_rate=None, tile_width=None,
+                  tile_height=None, weight_bits=8, prune_threshold=None,
+                  record_tick_statistics=False, precompute_input=False,
+                  pool_size=None, record_spike_rate=None):
         # Get index of new layer
         layer_index = len(self._layers)
 
+        # Get shape of the previous layer's output volume
+        if layer_index == 0:
+            input_shape = None
+        else:
+            prev_layer = self._layers[-1]
+            input_shape = (prev_layer.output_width, prev_layer.output_height,
+                           prev_layer.vertices[-1].z_slice.stop)
+
+        # **NOTE** if no rates are specified, partitioning only
+        # considers the costs which don't depend on spiking activity
+        if layer_index == 0 or self._spike_rates[-1] is None:
+            input_spike_rate = 0.0
+        else:
+            input_spike_rate = self._spike_rates[-1]
+
         # Add layer to conv net
         self._layers.append(
             ConvNeuronLayer(start_vert_index=self._vert_index,
@@ -64,6 +119,7 @@ class ConvNet(object):
                             neuron_decay=self._neuron_decay,
                             neuron_threshold=self._neuron_threshold,
                             record_spikes=record_spikes,
+                            record_tick_statistics=record_tick_statistics,
                             weights=weights, parent_keyspace=self._keyspace,
                             input_data=(self._test_data if layer_index == 0
                                         else None),
@@ -71,57 +127,143 @@ class ConvNet(object):
                             vertex_resources=self._vertex_resources,
                             timer_period_us=self._timer_period_us,
                             sim_ticks=self._sim_ticks,
-                            num_profile_samples=self._num_profile_samples))
+                            num_images=self._num_images,
+                            num_profile_samples=self._num_profile_samples,
+                            tile_width=tile_width, tile_height=tile_height,
+                            input_shape=input_shape,
+                            input_spike_rate=input_spike_rate,
+                            spike_rate=(0.0 if spike_rate is None
+                                        else spike_rate),
+                            cost_model=self._cost_model,
+                            weight_bits=weight_bits,
+                            prune_threshold=prune_threshold,
+                            precompute_input=precompute_input,
+                            pool_size=pool_size,
+                            record_spike_rate=record_spike_rate))
+        self._spike_rates.append(spike_rate)
 
         # **YUCK** update vertex index
         self._vert_index += len(self._layers[-1].vertices)
 
-    def run(self, spinnaker_hostname, disable_software_watchdog=False):
-        logger.info("Assigning keyspaces")
-
-        # Finalise keyspace fields
-        self._keyspace.assign_fields()
-
-        # Extract position and length of z-field in keyspace
-        z_loc, z_length = self._keyspace.get_location_and_length("z")
-        z_mask = (1 << z_length) - 1
-        logger.debug("Z location:%u, length:%u, mask:%08x",
-                        z_loc, z_length, z_mask)
-
-        # Loop through layers and their successors
+    def simulate(self):
+        self._start_phases()
+        layer_spikes = self._simulate()
+        self._end_phase("simulate")
+
+        # Save off layer data
+        for i, (l, spikes) in enumerate(zip(self._layers, layer_spikes)):
+            if l.record_spikes:
+                self._save_spikes(i, SpikeStore.from_dense(spikes))
+        self._end_phase("save")
+
+    def estimate_spike_rates(self):
+        """Simulate network on host and return the mean number of spikes
+        emitted by each neuron in each layer per tick, suitable for passing
+        to add_layer when building a network to run on SpiNNaker"""
+        return [float(np.mean(s)) for s in self._simulate()]
+
+    def simulate_spikes(self):
+        """Simulate network on host and return, rather than save,
+        the spikes emitted by every neuron in each layer
+
+        Returns
+        -------
+        [ndarray, ...]
+            uint8 array of shape (images, ticks, width, height, depth)
+            for each layer
+        """
+        return self._simulate()
+
+    def estimate_performance(self):
+        """Estimate the per-tick workload of every core using the expected
+        spike rates passed to add_layer, logging a warning for each core
+        expected to overrun its timer tick or drop incoming spikes
+
+        Returns
+        -------
+        [[:py:class:`~performance_model.CoreEstimate`, ...], ...]
+            estimates for each vertex in each layer
+        """
+        performance_model = PerformanceModel(self._cost_model,
+                                             self._timer_period_us)
+        estimates = performance_model.estimate(self._layers,
+                                               self._spike_rates)
+        performance_model.log_report(estimates)
+        return estimates
+
+    def log_quantisation_report(self):
+        """Log the error introduced by quantising the weights of each layer
+        to both 8 and 4-bit, the DTCM each kernel requires in each format
+        and the error introduced by quantising the neuron parameters"""
+        logger.info("Weight quantisation")
+        for i, l in enumerate(self._layers):
+            conv_kernel = l.regions[Regions.conv_kernel]
+            logger.info("\tLayer %u (%u-bit)", i, conv_kernel.weight_bits)
+            for weight_bits in (8, 4):
+                rms_error, max_error, relative_error =\
+                    l.get_quantisation_error(weight_bits)
+                kernel_bytes = regions.ConvKernel(
+                    conv_kernel.kernel_width, conv_kernel.kernel_height,
+                    conv_kernel.kernel_depth, weight_bits).kernel_dtcm_bytes
+                logger.info("\t\t%u-bit - RMS error:%f, max error:%f, "
+                            "relative error:%f, kernel DTCM:%u bytes",
+                            weight_bits, rms_error, max_error,
+                            relative_error, kernel_bytes)
+
+            # **NOTE** neurons use the same fixed-point format for any weight_bits
+            threshold_error, decay_error = l.get_neuron_quantisation_error()
+            logger.info("\t\tNeurons - threshold error:%f, decay error:%f",
+                        threshold_error, decay_error)
+
+    def run(self, spinnaker_hostname, disable_software_watchdog=False,
+            num_loading_threads=8, region_cache_dir=None,
+            place_and_route_cache_dir=None, timeout=5.0,
+            num_readback_threads=8, profile_trace_filename=None,
+            early_termination_margin=None):
+        self._start_phases()
+
+        # Finalise keyspace
+        z_mask = self._assign_keyspace()
+
+        # Check mapping is likely to keep up before using the machine
+        self.estimate_performance()
+
+        # Connect vertices to those in the next layer they affect
         logger.info("Building nets")
-        nets = []
-        net_keys = {}
-        for layer, next_layer in zip(self._layers[:-1], self._layers[1:]):
-            # Loop through all vertices in layer
-            for vertex in layer.vertices:
-                # Create a key for the vertex feeding forward
-                net_key = (vertex.routing_key, vertex.routing_mask)
-
-                # Create a net connecting vertex
-                # to all vertices in next layer
-                net = Net(vertex, next_layer.vertices)
-
-                # Add net to list and associate with key
-                nets.append(net)
-                net_keys[net] = net_key
+        nets, net_keys = build_nets(self._layers)
+        logger.info("\t%u nets, %u sinks", len(nets),
+                    sum(len(n.sinks) for n in nets))
+
+        # Assume all ticks will be simulated
+        num_simulated_ticks = self._sim_ticks * self._num_images
+        for l in self._layers:
+            l.num_simulated_ticks = num_simulated_ticks
+
+        # **NOTE** images presented one after another share a simulation
+        # so it can only be stopped early if a single image is presented
+        if early_termination_margin is not None and self._num_images > 1:
+            logger.warning("Early termination is only supported when a single "
+                           "image is presented - simulating all %u ticks",
+                           num_simulated_ticks)
+            early_termination_margin = None
 
         machine_controller = None
+        decision_tick = None
+        self._end_phase("prepare")
         try:
             # Get machine controller from connected SpiNNaker board and boot
             machine_controller = MachineController(spinnaker_hostname)
             machine_controller.boot()
+            self._end_phase("boot")
 
             # Get system info
             system_info = machine_controller.get_system_info()
             logger.debug("Found %u chip machine", len(system_info))
 
             # Place-and-route
-            logger.info("Placing and routing")
             placements, allocations, run_app_map, routing_tables =\
-                place_and_route_wrapper(self._vertex_resources,
-                                        self._vertex_applications,
-                                        nets, net_keys, system_info)
+                self._place_and_route(nets, net_keys, system_info,
+                                      place_and_route_cache_dir)
 
             # Convert placement values to a set to get unique list of chips
             unique_chips = set(itervalues(placements))
@@ -129,6 +271,17 @@ class ConvNet(object):
                         len(placements), len(unique_chips))
             logger.debug(list(itervalues(placements)))
 
+            # Model traffic through routers and links and, if spike
+            # rates were specified, check links are unlikely to drop packets
+            traffic_model = TrafficModel(self._cost_model, placements,
+                                         routing_tables, system_info.width,
+                                         system_info.height)
+            if any(r is not None for r in self._spike_rates):
+                traffic_model.log_report(traffic_model.estimate(
+                    get_expected_vertex_packets(self._layers,
+                                                self._spike_rates)))
+            self._end_phase("place_and_route")
+
             # If software watchdog is disabled, write zero to each chip in
             # placement's SV struct, otherwise, write default from SV struct file
             wdog = (0 if disable_software_watchdog else
@@ -139,10 +292,20 @@ class ConvNet(object):
                 machine_controller.write_struct_field("sv", "soft_wdog",
                                                     wdog, x, y)
 
+            # If a cache directory is specified, re-use any
+            # regions serialised by previous runs from it
+            region_cache = (None if region_cache_dir is None
+                            else RegionCache(region_cache_dir))
+
+            # **NOTE** if num_loading_threads is 1, layers are loaded serially
             logger.info("Loading layers")
-            for i, l in enumerate(self._layers):
-                logger.info("\tLayer %u", i)
-                l.load(placements, allocations, machine_controller, z_mask)
+            loader = Loader(machine_controller, placements, allocations,
+                            z_mask, num_loading_threads, region_cache)
+            loader.load(self._layers)
+
+            if region_cache is not None:
+                logger.info("\t%u regions read from cache, %u serialised",
+                            region_cache.hits, region_cache.misses)
 
             # Load routing tables and applications
             logger.info("Loading routing tables")
@@ -150,32 +313,59 @@ class ConvNet(object):
 
             logger.info("Loading applications")
             machine_controller.load_application(run_app_map)
+            self._end_phase("load")
 
             # Wait for all cores to hit SYNC0
             logger.info("Waiting for synch")
-            num_verts = len(self._vertex_resources)
-            self._wait_for_transition(placements, allocations,
-                                      machine_controller,
-                                      AppState.init, AppState.sync0,
-                                      num_verts)
+            monitor = RunMonitor(machine_controller, placements, allocations)
+            monitor.wait_for_state("sync", AppState.sync0, timeout)
 
             # Sync!
             machine_controller.send_signal("sync0")
-
-            # Wait for simulation to complete
-            logger.info("Simulating")
-            time.sleep(float(self._timer_period_us * self._sim_ticks) / 1000000.0)
+            self._end_phase("sync")
 
             # Wait for all cores to exit
-            logger.info("Waiting for exit")
-            self._wait_for_transition(placements, allocations,
-                                      machine_controller,
-                                      AppState.run, AppState.exit,
-                                      num_verts)
+            # **NOTE** timer event overruns can stretch ticks beyond the
+            # timer period so allow the simulation to run well past the
+            # nominal duration before considering it to have hung
+            logger.info("Simulating")
+            sim_duration = float(self._timer_period_us * self._sim_ticks *
+                                 self._num_images) / 1000000.0
+            sim_timeout = (2.0 * sim_duration) + timeout
+
+            # If early termination is enabled, monitor output layer's
+            # spikes and stop all cores once classification is decided
+            if early_termination_margin is not None:
+                early_termination = EarlyTermination(
+                    machine_controller, placements, allocations,
+                    self._layers[-1], early_termination_margin)
+                decision_tick = early_termination.monitor(sim_timeout)
+
+                # Ignore anything recorded after classification was decided
+                if decision_tick is not None:
+                    num_simulated_ticks = decision_tick
+                    for l in self._layers:
+                        l.num_simulated_ticks = num_simulated_ticks
+
+            monitor.wait_for_state("simulate", AppState.exit, sim_timeout)
+            self._end_phase("simulate")
+
+            # Read back all recorded data at once, decoding spikes recorded
+            # by each vertex as soon as its regions have been read
+            logger.info("Reading back results")
+            vertex_layers = {v: l for l in self._layers for v in l.vertices}
+            readback = Readback(machine_controller, placements,
+                                num_readback_threads)
+            readback_results = readback.read(
+                [(v, l.get_readback_region_memory(v))
+                 for v, l in iteritems(vertex_layers)],
+                lambda v, m: self._decode_vertex(vertex_layers[v], v, m))
+            region_memory = {v: m for v, (m, _) in iteritems(readback_results)}
+            self._end_phase("readback")
 
             logger.info("Reading stats")
             for i, l in enumerate(self._layers):
-                stats = l.read_statistics()
+                stats = l.read_statistics(region_memory)
                 logger.info("\tLayer %u", i)
                 logger.info("\t\tInput buffer overflows:%u",
                             np.sum(stats["input_buffer_overflows"]))
@@ -188,57 +378,152 @@ class ConvNet(object):
                 logger.info("\t\tSpikes convolved:%u",
                             np.sum(stats["spikes_convolved"]))
 
+                # If layer recorded statistics every tick, log the
+                # busiest tick of the busiest core and save them
+                if l.regions[Regions.tick_statistics].record:
+                    tick_stats = l.read_tick_statistics(region_memory)
+                    for j, n in enumerate(l.tick_statistic_names):
+                        peak_tick, peak_vertex = np.unravel_index(
+                            np.argmax(tick_stats[:, :, j]),
+                            tick_stats.shape[:2])
+                        logger.info("\t\tPeak %s:%u (tick %u, vertex %u)",
+                                    n, tick_stats[peak_tick, peak_vertex, j],
+                                    peak_tick, peak_vertex)
+                    self._save_tick_statistics(i, l, tick_stats)
+
+            # Model traffic using the spikes each core actually emitted
+            traffic_model.log_report(traffic_model.estimate(
+                get_recorded_vertex_packets(
+                    self._layers, num_simulated_ticks, region_memory)))
+
+            # If profiling is enabled, aggregate the profiles of every core
             if self._num_profile_samples is not None:
                 logger.info("Reading profiling data")
+                profile_report = ProfileReport(
+                    self._layers, placements, allocations,
+                    self._timer_period_us, num_simulated_ticks,
+                    region_memory)
+                profile_report.log_report()
 
-                timestep_ms = self._timer_period_us / 1000.0
-                duration_ms = timestep_ms * self._sim_ticks
-
-                for i, l in enumerate(self._layers):
-                    profiling_data = l.read_profile()[0][1]
-                    logger.info("\tLayer %u", i)
-                    #print profiling_data
-                    profiling.print_summary(profiling_data, duration_ms,
-                                            timestep_ms)
-
+                if profile_trace_filename is not None:
+                    profile_report.write_chrome_trace(profile_trace_filename)
 
-            #logger.info("Downloading spikes")
-            # Save off layer data
+            # Save off data from layers which recorded spikes
             for i, l in enumerate(self._layers):
-                spikes = l.read_recorded_spikes()
-                np.save("layer_%u.npy" % i, spikes)
+                if l.record_spikes:
+                    spike_events = {v: readback_results[v][1]
+                                    for v in l.vertices}
+                    self._save_spikes(i, l.read_recorded_spike_store(
+                        region_memory, spike_events))
+            self._end_phase("report")
 
         finally:
             if machine_controller is not None:
                 logger.info("Stopping SpiNNaker application")
                 machine_controller.send_signal("stop")
 
+        # Return tick at which classification was decided (None if the
+        # simulation wasn't stopped early) so callers can measure it
+        return decision_tick
+
     # ------------------------------------------------------------------------
     # Private methods
     # ------------------------------------------------------------------------
-    def _wait_for_transition(self, placements, allocations, machine_controller,
-                             from_state, to_state,
-                             num_verts, timeout=5.0):
-        while True:
-            # If no cores are still in from_state, stop
-            if machine_controller.count_cores_in_state(from_state) == 0:
-                break
-
-            # Wait a bit
-            time.sleep(1.0)
-
-        # Wait for all cores to reach to_state
-        cores_in_to_state =\
-            machine_controller.wait_for_cores_to_reach_state(
-                to_state, num_verts, timeout=timeout)
-        if cores_in_to_state != num_verts:
-            # Loop through all placed vertices
-            for vertex, (x, y) in iteritems(placements):
-                p = allocations[vertex][machine.Cores].start
-                status = machine_controller.get_processor_status(p, x, y)
-                if status.cpu_state is not to_state:
-                    print("Core ({}, {}, {}) in state {!s}".format(
-                        x, y, p, status))
-                    print machine_controller.get_iobuf(p, x, y)
-            raise Exception("Unexpected core failures "
-                            "before reaching %s state (%u/%u)." % (to_state, cores_in_to_state, num_verts))
+    def _start_phases(self):
+        # Clear phase times and start timing first phase
+        self.phase_times.clear()
+        self._phase_start_time = time.time()
+
+    def _end_phase(self, name):
+        # Record time since end of previous phase and start timing next
+        now = time.time()
+        self.phase_times[name] = now - self._phase_start_time
+        self._phase_start_time = now
+
+    def _assign_keyspace(self):
+        logger.info("Assigning keyspaces")
+
+        # Finalise keyspace fields
+        self._keyspace.assign_fields()
+
+        # Extract position and length of z-field in keyspace
+        z_loc, z_length = self._keyspace.get_location_and_length("z")
+        z_mask = (1 << z_length) - 1
+        logger.debug("Z location:%u, length:%u, mask:%08x",
+                        z_loc, z_length, z_mask)
+        return z_mask
+
+    def _place_and_route(self, nets, net_keys, system_info, cache_dir):
+        vertices = list(itertools.chain.from_iterable(
+            l.vertices for l in self._layers))
+
+        # If a cache directory is specified, try and re-use results
+        # from a previous run of the same network on the same machine
+        if cache_dir is not None:
+            cache = PlaceAndRouteCache(cache_dir)
+            cache_key = cache.get_key(vertices, self._vertex_resources,
+                                      self._vertex_applications,
+                                      nets, net_keys, system_info)
+            cached = cache.load(cache_key, vertices)
+        else:
+            cached = None
+
+        if cached is None:
+            logger.info("Placing and routing")
+            placements, allocations, app_map, routing_tables =\
+                place_and_route(self._vertex_resources,
+                                self._vertex_applications,
+                                nets, net_keys, system_info)
+
+            # Minimise routing tables
+            logger.info("Minimising routing tables")
+            routing_tables, routing_table_report =\
+                minimise_routing_tables(routing_tables, system_info)
+
+            # Add results to cache
+            if cache_dir is not None:
+                cache.save(cache_key, vertices, placements, allocations,
+                           app_map, routing_tables, routing_table_report)
+        else:
+            (placements, allocations, app_map,
+             routing_tables, routing_table_report) = cached
+
+        log_routing_table_report(routing_table_report)
+        return placements, allocations, app_map, routing_tables
+
+    def _simulate(self):
+        # Finalise keyspace
+        z_mask = self._assign_keyspace()
+
+        logger.info("Simulating on host")
+        simulator = Simulator(self._layers, z_mask, self._sim_ticks,
+                              self._num_images)
+        return simulator.run()
+
+    def _decode_vertex(self, layer, vertex, region_memory):
+        # If layer recorded spikes, decode those recorded by vertex
+        if layer.record_spikes:
+            return layer.read_vertex_spike_events(vertex,
+                                                  {vertex: region_memory})
+        else:
+            return None
+
+    def _save_tick_statistics(self, layer_index, layer, tick_stats):
+        # Split ticks into those each image was presented for
+        # and, if a single image was simulated, remove image axis
+        tick_stats = tick_stats.reshape((self._num_images, self._sim_ticks) +
+                                        tick_stats.shape[1:])
+        if not self._batch:
+            tick_stats = tick_stats[0]
+
+        np.savez("layer_%u_tick_statistics.npz" % layer_index,
+                 tick_statistics=tick_stats,
+                 names=np.asarray(layer.tick_statistic_names))
+
+    def _save_spikes(self, layer_index, spike_store):
+        # If a batch of images was simulated, save spikes
+        # with a leading image axis, otherwise remove it
+        if not self._batch:
+            spike_store.shape = spike_store.shape[1:]
+
+        spike_store.save("layer_%u.npz" % layer_index)
@@ -1,5 +1,6 @@
 # Import modules
 import enum
+import itertools
 import logging
 import numpy as np
 from rig import machine
@@ -7,14 +8,38 @@ import regions
 
 # Import classes
 from collections import defaultdict
+from partitioner import partition_kernels
 from rig_cpp_common.regions import Profiler, Statistics, System
 from rig_cpp_common.utils import Args
-
-# Import functions
-from rig_cpp_common.utils import load_regions
+from spike_store import SpikeStore
 
 logger = logging.getLogger("convolver")
 
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _split(size, tile_size):
+    # Split an axis of the output volume into tiles
+    return [slice(start, min(start + tile_size, size))
+            for start in range(0, size, tile_size)]
+
+def _get_receptive_field(neuron_slice, kernel_size, stride):
+    # Calculate the range of inputs along an axis which can
+    # affect a tile of neurons in ConvKernelBase::ConvolveSpike
+    # **NOTE** this is conservative when stride > 1 as the
+    # stride alignment of the kernel offsets isn't considered
+    start = (neuron_slice.start * stride) - (kernel_size // 2)
+    num_neurons = neuron_slice.stop - neuron_slice.start
+    return slice(start, start + (num_neurons * stride) + kernel_size - 1)
+
+def _get_region_memory(vertex, region, region_memory):
+    # Get memory to read region from, defaulting to the
+    # vertex's memory on the machine if no copy is provided
+    if region_memory is None:
+        return vertex.region_memory[region]
+    else:
+        return region_memory[vertex][region]
+
 # ----------------------------------------------------------------------------
 # Regions
 # ----------------------------------------------------------------------------
@@ -26,17 +51,22 @@ class Regions(enum.IntEnum):
     input = 3
     profiler = 4
     statistics = 5
+    tick_statistics = 6
+    pooling = 7
 
 # ----------------------------------------------------------------------------
 # Vertex
 # ----------------------------------------------------------------------------
 class Vertex(object):
-    def __init__(self, vert_index, z_slice, parent_keyspace, weights):
+    def __init__(self, vert_index, x_slice, y_slice, z_slice,
+                 parent_keyspace, weights, weight_bits):
         # Build child keyspace
         self.keyspace = parent_keyspace(vert_index=vert_index)
 
-        # Cache weights
+        # Cache weights and the tile of the output volume this vertex simulates
         self.weights = weights
+        self.x_slice = x_slice
+        self.y_slice = y_slice
         self.z_slice = z_slice
 
         # Create a temporary child keyspace to ensure the
@@ -46,14 +76,20 @@ class Vertex(object):
         max_weight = np.amax(np.fabs(weights))
         logger.debug("\t\t\t\tMax absolute kernel weight:%f", max_weight)
 
-
-        # Get MSB for maximum weight
-        max_msb = np.floor(np.log2(max_weight)) + 1
-
         # Calculate where the weight format fixed-point lies
-        self.fixed_point_pos = (7 - int(max_msb))
-        logger.debug("\t\t\t\tFixed point position %d",
-                     self.fixed_point_pos)
+        self.fixed_point_pos = regions.get_fixed_point_pos(weights,
+                                                           weight_bits)
+
+        # Calculate where the fixed-point of the neurons' membrane voltage,
+        # threshold and decay lies and how far input currents, calculated
+        # in the weight format, must be shifted left to match it
+        # **NOTE** this is independent of weight_bits so that
+        # quantising weights doesn't also change neuron dynamics
+        self.neuron_fixed_point_pos = regions.get_fixed_point_pos(weights, 8)
+        self.input_shift = self.neuron_fixed_point_pos - self.fixed_point_pos
+        logger.debug("\t\t\t\tFixed point position %d, neuron fixed point "
+                     "position %d", self.fixed_point_pos,
+                     self.neuron_fixed_point_pos)
 
     # ------------------------------------------------------------------------
     # Properties
@@ -79,6 +115,12 @@ class ConvNeuronLayer(object):
         2:  "Update neurons",
     }
 
+    # DTCM available for kernels, neurons and input on each core
+    max_dtcm_bytes = 55 * 1024
+
+    # Fraction of each timer tick cores can be expected to be busy for
+    max_tick_utilisation = 0.8
+
     # Names of statistics
     statistic_names = (
         "input_buffer_overflows",
@@ -88,157 +130,470 @@ class ConvNeuronLayer(object):
         "spikes_convolved",
     )
 
+    # Names of statistics recorded each tick
+    tick_statistic_names = regions.TickStatistics.StatNames
+
     def __init__(self, start_vert_index, output_width, output_height,
                  padding, stride, weights, neuron_decay, neuron_threshold,
-                 record_spikes, parent_keyspace, input_data,
+                 record_spikes, record_tick_statistics, parent_keyspace,
+                 input_data,
                  vertex_applications, vertex_resources,
-                 timer_period_us, sim_ticks, num_profile_samples):
+                 timer_period_us, sim_ticks, num_images, num_profile_samples,
+                 tile_width, tile_height, input_shape, input_spike_rate,
+                 spike_rate, cost_model, weight_bits, prune_threshold,
+                 precompute_input, pool_size, record_spike_rate):
          # Check blob shape - num samples, depth, width, height
         assert len(weights.shape) == 4
 
         # If we have input data, check it is in correct
         # format and matches convolution kernel
         if input_data is not None:
-            assert len(input_data.shape) == 3
-            assert input_data.shape[0] == weights.shape[2]
+            assert len(input_data.shape) == 4
+            assert input_data.shape[0] == num_images
+            assert input_data.shape[1] == weights.shape[2]
+
+        # Cache stride, pool size and the number of
+        # ticks each image is presented for
+        self.stride = stride
+        self.pool_size = pool_size
+        self.sim_ticks = sim_ticks
+        self.num_images = num_images
+
+        # **NOTE** if the simulation is stopped early, this is reduced
+        # so anything recorded after it stopped is ignored when reading
+        self.num_simulated_ticks = sim_ticks * num_images
 
         # Create standard regions
+        # **NOTE** images are presented one after another so
+        # the simulation runs for sim_ticks for each image
+        total_sim_ticks = sim_ticks * num_images
         self.regions = {}
-        self.regions[Regions.system] = System(timer_period_us, sim_ticks)
+        self.regions[Regions.system] = System(timer_period_us, total_sim_ticks)
+        # **NOTE** if the layer is pooled, only the spikes
+        # of the pooled neurons are emitted and recorded
         self.regions[Regions.neurons] =\
             regions.Neurons(output_width, output_height,
-                            neuron_decay, neuron_threshold, record_spikes,
-                            sim_ticks)
+                            neuron_decay, neuron_threshold,
+                            record_spikes and pool_size is None,
+                            total_sim_ticks, record_spike_rate)
         self.regions[Regions.conv_kernel] =\
-            regions.ConvKernel(weights.shape[0], weights.shape[1], weights.shape[2])
-        self.regions[Regions.input] = regions.Input(input_data, padding)
+            regions.ConvKernel(weights.shape[0], weights.shape[1],
+                               weights.shape[2], weight_bits, prune_threshold)
+        self.regions[Regions.input] = regions.Input(input_data, padding,
+                                                    weights.shape[0], stride,
+                                                    precompute_input)
         self.regions[Regions.statistics] = Statistics(len(self.statistic_names))
+        self.regions[Regions.tick_statistics] =\
+            regions.TickStatistics(record_tick_statistics, total_sim_ticks)
+        self.regions[Regions.pooling] =\
+            regions.Pooling(pool_size, output_width, output_height,
+                            record_spikes, total_sim_ticks)
 
         # Add profiler region if required
         if num_profile_samples is not None:
             self.regions[Regions.profiler] = Profiler(num_profile_samples)
 
+        # Split output plane into tiles
+        # **NOTE** if no tile size is specified, each
+        # vertex simulates the entire output plane
+        if pool_size is not None:
+            assert tile_width is None or (tile_width % pool_size) == 0
+            assert tile_height is None or (tile_height % pool_size) == 0
+        x_slices = _split(output_width,
+                          output_width if tile_width is None else tile_width)
+        y_slices = _split(output_height,
+                          output_height if tile_height is None else tile_height)
+        logger.debug("\t\t%ux%u tiles", len(x_slices), len(y_slices))
+
         # Calculate memory required for the neurons driven by a single kernel
-        neuron_bytes = self.regions[Regions.neurons].output_dim_dtcm_bytes
+        # **NOTE** the first tile is always the largest
+        pooling = self.regions[Regions.pooling]
+        neuron_bytes = self.regions[Regions.neurons].get_output_dim_dtcm_bytes(
+            x_slices[0], y_slices[0])
+        pooled_x_slice = pooling.get_pooled_slice(x_slices[0])
+        pooled_y_slice = pooling.get_pooled_slice(y_slices[0])
+        pooled_neuron_bytes = pooling.get_output_dim_dtcm_bytes(
+            pooled_x_slice, pooled_y_slice)
+
+        # Calculate memory required by each core to pool neurons
+        pooling_core_bytes = pooling.get_dtcm_bytes(pooled_x_slice,
+                                                    pooled_y_slice)
 
         # Calculate memory required for a single kernel
-        kernel_bytes = self.regions[Regions.conv_kernel].kernel_dtcm_bytes
+        # **NOTE** sparse kernels also require some memory shared by all
+        # kernels on a core and less for each kernel the sparser they are
+        conv_kernel = self.regions[Regions.conv_kernel]
+        kernel_core_bytes, kernel_bytes = conv_kernel.get_dtcm_bytes(weights)
 
         # Calculate memory required for any input data
-        input_bytes = self.regions[Regions.input].dtcm_bytes
-
-
-        total_bytes = neuron_bytes + kernel_bytes + input_bytes
-        logger.debug("\t\tDTCM - neurons:%u bytes, kernel:%u bytes, input:%u bytes, total:%u bytes",
-                     neuron_bytes, kernel_bytes, input_bytes, total_bytes)
-
-        # Calculate how many of these kernels can fit on each core
-        num_kernels_per_core = (55 * 1024) // total_bytes
-        logger.debug("\t\t%u kernels per core", num_kernels_per_core)
-
+        # **NOTE** each core holds one copy of the current image
+        input_region = self.regions[Regions.input]
+        input_bytes = input_region.get_dtcm_bytes(x_slices[0], y_slices[0])
+
+        # Calculate memory required to accumulate per-tick statistics
+        tick_statistics = self.regions[Regions.tick_statistics]
+        tick_statistics_bytes = tick_statistics.get_dtcm_bytes()
+
+        logger.debug("\t\tDTCM - neurons:%u bytes, pooled neurons:%u bytes, "
+                     "kernel:%u bytes, kernel shared:%u bytes, "
+                     "input:%u bytes, tick statistics:%u bytes, "
+                     "pooling shared:%u bytes",
+                     neuron_bytes, pooled_neuron_bytes, kernel_bytes,
+                     kernel_core_bytes, input_bytes, tick_statistics_bytes,
+                     pooling_core_bytes)
+
+        # Calculate how many spikes the previous layer will emit each
+        # tick and how many of these fall within a tile's receptive field
         kernel_width = self.regions[Regions.conv_kernel].kernel_width
         kernel_height = self.regions[Regions.conv_kernel].kernel_height
-        vertex_application = ("binaries/convolution_neuron_%ux%u_%u%s.aplx" %
+        if input_shape is None:
+            input_spikes_per_tick = 0.0
+            tile_input_spikes_per_tick = 0.0
+        else:
+            input_spikes_per_tick = input_spike_rate * np.prod(input_shape)
+            x_field = _get_receptive_field(x_slices[0], kernel_width, stride)
+            y_field = _get_receptive_field(y_slices[0], kernel_height, stride)
+            tile_input_spikes_per_tick = (
+                input_spike_rate * input_shape[2] *
+                min(input_shape[0], x_field.stop - x_field.start) *
+                min(input_shape[1], y_field.stop - y_field.start))
+
+        # Estimate cycles each core requires per tick, both
+        # fixed and for each kernel it is responsible for
+        if input_region.input_data is None:
+            image_size = None
+        else:
+            image_size = [s.stop - s.start for s in
+                          input_region.get_image_slices(x_slices[0],
+                                                        y_slices[0])]
+        core_cycles = cost_model.get_core_cycles(input_spikes_per_tick)
+        kernel_cycles = cost_model.get_kernel_cycles(
+            kernel_width, weights.shape[2], stride,
+            x_slices[0].stop - x_slices[0].start,
+            y_slices[0].stop - y_slices[0].start,
+            tile_input_spikes_per_tick, spike_rate, image_size,
+            conv_kernel.get_density(weights), input_region.precompute,
+            pool_size)
+        max_cycles = cost_model.get_budget_cycles(timer_period_us,
+                                                  self.max_tick_utilisation)
+        logger.debug("\t\tCycles per tick - core:%u, kernel:%u, budget:%u",
+                     core_cycles, kernel_cycles, max_cycles)
+
+        # Partition kernels between the cores simulating each tile
+        z_slices = partition_kernels(weights.shape[3],
+                                     (input_bytes + kernel_core_bytes +
+                                      tick_statistics_bytes +
+                                      pooling_core_bytes),
+                                     (neuron_bytes + pooled_neuron_bytes +
+                                      kernel_bytes),
+                                     self.max_dtcm_bytes, core_cycles,
+                                     kernel_cycles, max_cycles,
+                                     (regions.ConvKernel.MaxSparseKernels
+                                      if conv_kernel.sparse else None))
+
+        vertex_application = ("binaries/convolution_neuron_%ux%u_%u%s%s%s.aplx" %
                               (kernel_width, kernel_height, stride,
+                               "_int4" if weight_bits == 4 else "",
+                               "_sparse" if conv_kernel.sparse else "",
                                "_profiled" if num_profile_samples is not None else ""))
         logger.debug("\t\tApplication: %s", vertex_application)
 
-        # Loop through slices of kernels to assign to each core
+        # Loop through tiles and slices of kernels to assign to each core
         self.vertices = []
-        for vert_index, z_slice_start in enumerate(range(0, weights.shape[3], num_kernels_per_core)):
-            z_slice_stop = min(z_slice_start + num_kernels_per_core, weights.shape[3])
-            z_slice = slice(z_slice_start, z_slice_stop)
-
-            logger.debug("\t\t\tVertex %u: z slice: [%u, %u)",
-                         vert_index, z_slice_start, z_slice_stop)
+        tiles = itertools.product(x_slices, y_slices, z_slices)
+        for vert_index, (x_slice, y_slice, z_slice) in enumerate(tiles):
+            logger.debug("\t\t\tVertex %u: x slice: [%u, %u), y slice: [%u, %u), z slice: [%u, %u)",
+                         vert_index, x_slice.start, x_slice.stop,
+                         y_slice.start, y_slice.stop,
+                         z_slice.start, z_slice.stop)
 
             # Create vertex
-            v = Vertex(vert_index + start_vert_index, z_slice,
-                       parent_keyspace, weights[:,:,:,z_slice])
+            v = Vertex(vert_index + start_vert_index, x_slice, y_slice,
+                       z_slice, parent_keyspace, weights[:,:,:,z_slice],
+                       weight_bits)
 
             # Add vertex to list
             self.vertices.append(v)
 
             # Add application
-            kernel_width = self.regions[Regions.conv_kernel].kernel_width
-            kernel_height = self.regions[Regions.conv_kernel].kernel_height
             vertex_applications[v] = vertex_application
 
             # Add resources
-            # **NOTE** SDRAM needs are minimal so don't bother
-            vertex_resources[v] = {machine.Cores: 1}
+            # **NOTE** SDRAM needs are dominated by recording so
+            # other, much smaller, regions are not accounted for
+            neurons = self.regions[Regions.neurons]
+            recording_bytes = (
+                neurons.sizeof(x_slice, y_slice, z_slice,
+                               v.neuron_fixed_point_pos) +
+                tick_statistics.sizeof() +
+                pooling.sizeof(*self.get_output_slices(v)))
+            vertex_resources[v] = {machine.Cores: 1,
+                                   machine.SDRAM: recording_bytes}
 
         logger.debug("\t\t%u vertices", len(self.vertices))
 
+    # ----------------------------------------------------------------------------
+    # Properties
+    # ----------------------------------------------------------------------------
+    @property
+    def output_width(self):
+        """Width of the volume of (pooled) neurons whose spikes the layer
+        emits and records, as seen by the next layer"""
+        return self._output_region.output_width
+
+    @property
+    def output_height(self):
+        """Height of the volume of (pooled) neurons whose spikes the
+        layer emits and records, as seen by the next layer"""
+        return self._output_region.output_height
+
+    @property
+    def record_spikes(self):
+        return self._output_region.record_spikes
+
+    @property
+    def _output_region_index(self):
+        # Get the region which emits and records the layer's output spikes
+        return (Regions.neurons if self.pool_size is None
+                else Regions.pooling)
+
+    @property
+    def _output_region(self):
+        return self.regions[self._output_region_index]
+
     # ----------------------------------------------------------------------------
     # Public methods
     # ----------------------------------------------------------------------------
-    def read_recorded_spikes(self):
-        region = self.regions[Regions.neurons]
-        return np.concatenate(
-            [region.read_recorded_spikes(v.z_slice,
-                                         v.region_memory[Regions.neurons])
-            for v in self.vertices], axis=3)
-
-    def read_profile(self):
+    def get_readback_region_memory(self, vertex):
+        """Get the memory occupied by each of a vertex's
+        regions which should be read back after simulation"""
+        readback_regions = [Regions.statistics]
+        if self.record_spikes:
+            readback_regions.append(self._output_region_index)
+        if self.regions[Regions.tick_statistics].record:
+            readback_regions.append(Regions.tick_statistics)
+        if Regions.profiler in self.regions:
+            readback_regions.append(Regions.profiler)
+
+        return {r: vertex.region_memory[r] for r in readback_regions}
+
+    def read_recorded_spikes(self, region_memory=None):
+        region = self._output_region
+
+        # Loop through vertices and copy their spikes into the
+        # corresponding tile and slice of the layer's output volume
+        spikes = np.zeros((self.sim_ticks * self.num_images,
+                           region.output_width, region.output_height,
+                           self.vertices[-1].z_slice.stop), dtype=np.uint8)
+        tick_slice = slice(0, self.num_simulated_ticks)
+        for v in self.vertices:
+            output_slices = self.get_output_slices(v)
+            spikes[(tick_slice,) + output_slices] =\
+                region.read_recorded_spikes(
+                    *output_slices,
+                    region_memory=_get_region_memory(
+                        v, self._output_region_index, region_memory),
+                    tick_slice=tick_slice)
+
+        # Split recording into the ticks each image was presented for
+        return spikes.reshape((self.num_images, self.sim_ticks) +
+                              spikes.shape[1:])
+
+    def read_vertex_spike_events(self, vertex, region_memory=None,
+                                 tick_slice=None):
+        """Read the spikes recorded by a single vertex as columns of
+        ticks and the layer coordinates of the neurons which spiked.
+        If tick_slice is specified, only spikes from these ticks are read
+        and ticks are relative to its start, otherwise all simulated ticks
+        are read"""
+        region = self._output_region
+        x_slice, y_slice, z_slice = self.get_output_slices(vertex)
+
+        if tick_slice is None:
+            tick_slice = slice(0, self.num_simulated_ticks)
+
+        # Read indices of neurons which spiked in each tick
+        spike_indices = region.read_recorded_spikes(
+            x_slice, y_slice, z_slice,
+            _get_region_memory(vertex, self._output_region_index,
+                               region_memory),
+            tick_slice=tick_slice, indices=True)
+
+        # Convert to columns of ticks and vertex neuron indices
+        ticks = np.repeat(np.arange(len(spike_indices)),
+                          [len(i) for i in spike_indices])
+        neuron_index = np.concatenate(spike_indices)
+
+        # Convert vertex neuron indices to layer coordinates
+        x, y, z = np.unravel_index(
+            neuron_index, (x_slice.stop - x_slice.start,
+                           y_slice.stop - y_slice.start,
+                           z_slice.stop - z_slice.start))
+        return (ticks, x + x_slice.start, y + y_slice.start,
+                z + z_slice.start)
+
+    def read_recorded_spike_store(self, region_memory=None,
+                                  vertex_spike_events=None):
+        """Read the spikes recorded by all vertices into a spike store,
+        optionally using spike events already read from each vertex"""
+        # Read spike events from any vertices they weren't provided for
+        if vertex_spike_events is None:
+            vertex_spike_events = {}
+        events = [vertex_spike_events[v] if v in vertex_spike_events
+                  else self.read_vertex_spike_events(v, region_memory)
+                  for v in self.vertices]
+
+        # Build spike store with spikes from all vertices
+        ticks, x, y, z = (np.concatenate(c) for c in zip(*events))
+        shape = (self.num_images, self.sim_ticks, self.output_width,
+                 self.output_height, self.vertices[-1].z_slice.stop)
+        return SpikeStore.from_events(shape, ticks, x, y, z)
+
+    def read_profile(self, region_memory=None):
         # Get the profile recording region and
         region = self.regions[Regions.profiler]
 
         # Return profile data for each vertex that makes up population
         return [(v.z_slice,
-                 region.read_profile(v.region_memory[Regions.profiler],
-                                     self.profiler_tag_names))
+                 region.read_profile(
+                     _get_region_memory(v, Regions.profiler, region_memory),
+                     self.profiler_tag_names))
                 for v in self.vertices]
 
-    def read_statistics(self):
+    def read_statistics(self, region_memory=None):
         # Get the statistics recording region
         region = self.regions[Regions.statistics]
 
         # Read stats from all vertices
         return region.read_stats(
-            [v.region_memory[Regions.statistics] for v in self.vertices],
+            [_get_region_memory(v, Regions.statistics, region_memory)
+             for v in self.vertices],
             self.statistic_names)
 
-    def load(self, placements, allocations, machine_controller, z_mask):
-        # Loop through vertices
+    def read_tick_statistics(self, region_memory=None):
+        """Read the statistics each vertex recorded every tick
+
+        Returns
+        -------
+        ndarray
+            uint32 array of shape (ticks, vertices, stats) whose last
+            axis is ordered as in :py:attr:`tick_statistic_names`
+        """
+        region = self.regions[Regions.tick_statistics]
+
+        tick_stats = np.stack(
+            [region.read_tick_stats(
+                _get_region_memory(v, Regions.tick_statistics, region_memory))
+             for v in self.vertices], axis=1)
+
+        # Zero any ticks which weren't simulated
+        tick_stats[self.num_simulated_ticks:] = 0
+        return tick_stats
+
+    def get_quantisation_error(self, weight_bits):
+        """Get the error introduced by quantising the kernels of each vertex
+        to weight_bits bits using the fixed-point position this implies.
+
+        Returns
+        -------
+        rms_error : float
+            root-mean-square difference between float and quantised weights
+        max_error : float
+            largest absolute difference between float and quantised weights
+        relative_error : float
+            norm of the difference relative to the norm of the float weights
+        """
+        squared_error = 0.0
+        squared_weights = 0.0
+        max_error = 0.0
+        num_weights = 0
         for v in self.vertices:
-            # Get placement and allocation
-            vertex_placement = placements[v]
-            vertex_allocation = allocations[v]
-
-            # Get core this vertex should be run on
-            core = vertex_allocation[machine.Cores]
-            assert (core.stop - core.start) == 1
-
-            logger.debug("\t\t\tVertex %s (%u, %u, %u)",
-                            v, vertex_placement[0], vertex_placement[1],
-                            core.start)
-
-            # Select placed chip
-            with machine_controller(x=vertex_placement[0],
-                                    y=vertex_placement[1]):
-                # Create region arguments
-                region_arguments = defaultdict(Args)
-
-                # Add kwargs for regions that require them
-                region_arguments[Regions.system].kwargs["application_words"] =\
-                    [z_mask, v.z_slice.start, v.routing_key, v.fixed_point_pos]
-
-                # Add neurons region kwargs
-                region_arguments[Regions.neurons].kwargs["output_depth"] =\
-                    (v.z_slice.stop - v.z_slice.start)
-                region_arguments[Regions.neurons].kwargs["fixed_point_pos"] =\
-                    v.fixed_point_pos
-
-                # Add conv kernel region kwargs
-                region_arguments[Regions.conv_kernel].kwargs["weights"] =\
-                    v.weights
-                region_arguments[Regions.conv_kernel].kwargs["fixed_point_pos"] =\
-                    v.fixed_point_pos
-
-                # Load regions
-                v.region_memory = load_regions(self.regions, region_arguments,
-                                               machine_controller, core,
-                                               logger)
-
-
+            # Quantise vertex's weights and convert back to float
+            fixed_point_pos = regions.get_fixed_point_pos(v.weights,
+                                                          weight_bits)
+            quantised = regions.quantise_weights(v.weights, fixed_point_pos,
+                                                 weight_bits)
+            error = v.weights - (quantised * (2.0 ** -fixed_point_pos))
+
+            # Accumulate error
+            squared_error += np.sum(np.square(error))
+            squared_weights += np.sum(np.square(v.weights))
+            max_error = max(max_error, np.amax(np.fabs(error)))
+            num_weights += v.weights.size
+
+        return (np.sqrt(squared_error / num_weights), max_error,
+                np.sqrt(squared_error / squared_weights))
+
+    def get_neuron_quantisation_error(self):
+        """Get the largest error introduced by converting the neuron
+        threshold and decay to the fixed-point format of any vertex
+
+        Returns
+        -------
+        threshold_error : float
+            largest absolute difference between float and fixed-point threshold
+        decay_error : float
+            largest absolute difference between float and fixed-point decay
+        """
+        neurons = self.regions[Regions.neurons]
+        errors = [neurons.get_quantisation_error(v.neuron_fixed_point_pos)
+                  for v in self.vertices]
+        return tuple(np.amax(errors, axis=0))
+
+    def get_output_slices(self, vertex):
+        """Get the slices of the layer's output volume whose spikes a
+        vertex emits - its tile of neurons or, if the layer is pooled,
+        the pooled neurons this tile is pooled into"""
+        pooling = self.regions[Regions.pooling]
+        return (pooling.get_pooled_slice(vertex.x_slice),
+                pooling.get_pooled_slice(vertex.y_slice), vertex.z_slice)
+
+    def get_receptive_field(self, vertex):
+        """Get the slices of the previous layer's output
+        plane which can affect a vertex's tile of neurons"""
+        conv_kernel = self.regions[Regions.conv_kernel]
+        return (_get_receptive_field(vertex.x_slice,
+                                     conv_kernel.kernel_width, self.stride),
+                _get_receptive_field(vertex.y_slice,
+                                     conv_kernel.kernel_height, self.stride))
+
+    def get_region_arguments(self, vertex, z_mask):
+        # Create region arguments
+        region_arguments = defaultdict(Args)
+
+        # Add kwargs for regions that require them
+        region_arguments[Regions.system].kwargs["application_words"] =\
+            [z_mask, vertex.z_slice.start, vertex.routing_key,
+             vertex.neuron_fixed_point_pos, self.sim_ticks,
+             vertex.x_slice.start, vertex.y_slice.start, vertex.input_shift]
+
+        # Add neurons region kwargs
+        region_arguments[Regions.neurons].kwargs["x_slice"] = vertex.x_slice
+        region_arguments[Regions.neurons].kwargs["y_slice"] = vertex.y_slice
+        region_arguments[Regions.neurons].kwargs["z_slice"] = vertex.z_slice
+        region_arguments[Regions.neurons].kwargs["fixed_point_pos"] =\
+            vertex.neuron_fixed_point_pos
+
+        # Add pooling region kwargs
+        x_slice, y_slice, z_slice = self.get_output_slices(vertex)
+        region_arguments[Regions.pooling].kwargs["x_slice"] = x_slice
+        region_arguments[Regions.pooling].kwargs["y_slice"] = y_slice
+        region_arguments[Regions.pooling].kwargs["z_slice"] = z_slice
+
+        # Add input region kwargs
+        region_arguments[Regions.input].kwargs["x_slice"] = vertex.x_slice
+        region_arguments[Regions.input].kwargs["y_slice"] = vertex.y_slice
+        if self.regions[Regions.input].precompute:
+            region_arguments[Regions.input].kwargs["kernels"] =\
+                self.regions[Regions.conv_kernel].get_runtime_kernels(
+                    vertex.weights, vertex.fixed_point_pos)
+            region_arguments[Regions.input].kwargs["input_shift"] =\
+                vertex.input_shift
+
+        # Add conv kernel region kwargs
+        region_arguments[Regions.conv_kernel].kwargs["weights"] =\
+            vertex.weights
+        region_arguments[Regions.conv_kernel].kwargs["fixed_point_pos"] =\
+            vertex.fixed_point_pos
+
+        return region_arguments
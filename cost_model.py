@@ -0,0 +1,177 @@
+# ----------------------------------------------------------------------------
+# CostModel
+# ----------------------------------------------------------------------------
+class CostModel(object):
+    """Estimates of the CPU cycles the convolution neuron runtime spends on
+    each of the operations it performs during a simulation tick.
+
+    **NOTE** the default costs are rough estimates for the ARM968 and should
+    be calibrated against the profiler output of the binaries being used
+    """
+    def __init__(self, clock_mhz=200, tick_cycles=2000, spike_cycles=150,
+                 synapse_cycles=12, neuron_cycles=24, emit_cycles=100,
+                 emit_delay_us=5, image_mac_cycles=4, input_current_cycles=8,
+                 pool_spike_cycles=30):
+        """Create a new cost model.
+
+        Parameters
+        ----------
+        clock_mhz : int
+            clock speed of the core in MHz
+        tick_cycles : int
+            fixed cost of each timer tick e.g. interrupt
+            handling, statistics and recording DMA
+        spike_cycles : int
+            cost of popping, decoding and dispatching
+            a spike received from the previous layer
+        synapse_cycles : int
+            cost of applying a single kernel weight to a neuron
+            (ConvKernelBase::ConvolveSpike inner loop)
+        neuron_cycles : int
+            cost of updating a single neuron (NeuronsBase::Update)
+        emit_cycles : int
+            cost of sending a spike, excluding the gap left after it
+        emit_delay_us : int
+            gap left after emitting each spike
+        image_mac_cycles : int
+            cost of a single image pixel multiply-accumulate
+            (ConvKernelBase::ConvolveImage inner loop)
+        input_current_cycles : int
+            cost of adding a single precomputed input current from SDRAM
+            to a neuron (NeuronsBase::AddInputCurrents)
+        pool_spike_cycles : int
+            cost of accumulating a spike into a pooled neuron
+            (Pooling::AddSpike)
+        """
+        self.clock_mhz = clock_mhz
+        self.tick_cycles = tick_cycles
+        self.spike_cycles = spike_cycles
+        self.synapse_cycles = synapse_cycles
+        self.neuron_cycles = neuron_cycles
+        self.emit_cycles = emit_cycles
+        self.emit_delay_us = emit_delay_us
+        self.image_mac_cycles = image_mac_cycles
+        self.input_current_cycles = input_current_cycles
+        self.pool_spike_cycles = pool_spike_cycles
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def get_budget_cycles(self, timer_period_us, max_utilisation):
+        """Get number of cycles available to a core each tick"""
+        return int(timer_period_us * self.clock_mhz * max_utilisation)
+
+    def get_core_cycles(self, input_spikes_per_tick):
+        """Get cycles spent each tick independently of how
+        many kernels a core is responsible for"""
+        # **NOTE** every core in a layer receives every spike
+        # emitted by the previous layer so must dispatch them all
+        return self.tick_cycles + self.get_dispatch_cycles(input_spikes_per_tick)
+
+    def get_kernel_cycles(self, kernel_size, kernel_depth, stride,
+                          output_width, output_height, input_spikes_per_tick,
+                          output_spike_rate, image_size=None,
+                          weight_density=1.0, precomputed_input=False,
+                          pool_size=None):
+        """Get cycles spent each tick on each kernel a core is responsible for.
+
+        Parameters
+        ----------
+        kernel_size : int
+            width and height of convolution kernel
+        kernel_depth : int
+            depth of convolution kernel
+        stride : int
+            stride of convolution
+        output_width : int
+            width of neuron layer
+        output_height : int
+            height of neuron layer
+        input_spikes_per_tick : float
+            expected number of spikes received from previous layer each tick
+        output_spike_rate : float
+            expected number of spikes emitted by each neuron each tick
+        image_size : tuple or None
+            width and height of (padded) input image
+            or None if the layer has no image input
+        weight_density : float
+            fraction of weights stored, less than one if kernels are sparse
+        precomputed_input : bool
+            has the convolution of the image been precomputed on the host
+        pool_size : int or None
+            width and height of average pooling window if layer is pooled
+
+        Returns
+        -------
+        float
+            The number of cycles required per kernel per tick.
+        """
+        # Each incoming spike is convolved with every kernel
+        synapse_cycles = (input_spikes_per_tick *
+                          self.get_convolve_spike_cycles(kernel_size, stride,
+                                                         weight_density))
+
+        # Each neuron is updated every tick and emitting a spike
+        # costs both the send itself and the gap left afterwards
+        # **NOTE** if the layer is pooled, spikes are instead accumulated
+        # into pooled neurons which emit at the same mean rate
+        num_neurons = output_width * output_height
+        neuron_cycles = self.get_update_cycles(num_neurons)
+        if pool_size is None:
+            emit_cycles = self.get_emit_cycles(num_neurons * output_spike_rate)
+        else:
+            num_spikes = num_neurons * output_spike_rate
+            emit_cycles = (self.get_pool_cycles(num_spikes) +
+                           self.get_emit_cycles(num_spikes /
+                                                float(pool_size ** 2)))
+
+        # If there is an image, it is convolved with each kernel every
+        # tick unless its input currents have been precomputed
+        if image_size is None:
+            image_cycles = 0
+        elif precomputed_input:
+            image_cycles = self.get_add_input_cycles(num_neurons)
+        else:
+            image_cycles = self.get_convolve_image_cycles(
+                kernel_size, kernel_depth, stride, image_size, weight_density)
+
+        return synapse_cycles + neuron_cycles + emit_cycles + image_cycles
+
+    def get_convolve_spike_cycles(self, kernel_size, stride,
+                                  weight_density=1.0):
+        """Get cycles spent convolving a single spike with a single kernel"""
+        # On average, each incoming spike visits kernel_size / stride
+        # offsets along each axis, of which only weight_density are stored
+        offsets_per_spike = (float(kernel_size) / float(stride)) ** 2
+        return offsets_per_spike * weight_density * self.synapse_cycles
+
+    def get_convolve_image_cycles(self, kernel_size, kernel_depth, stride,
+                                  image_size, weight_density=1.0):
+        """Get cycles spent convolving a (padded) image with a single kernel"""
+        # **NOTE** this mirrors the exclusive bounds of ConvolveImage
+        num_pixels = (len(range(0, image_size[0] - kernel_size, stride)) *
+                      len(range(0, image_size[1] - kernel_size, stride)))
+        return (num_pixels * kernel_size * kernel_size * kernel_depth *
+                weight_density * self.image_mac_cycles)
+
+    def get_add_input_cycles(self, num_neurons):
+        """Get cycles spent adding precomputed input currents to neurons"""
+        return num_neurons * self.input_current_cycles
+
+    def get_update_cycles(self, num_neurons):
+        """Get cycles spent updating neurons"""
+        return num_neurons * self.neuron_cycles
+
+    def get_emit_cycles(self, num_spikes):
+        """Get cycles spent emitting spikes, including the gap after each"""
+        return num_spikes * (self.emit_cycles +
+                             (self.emit_delay_us * self.clock_mhz))
+
+    def get_pool_cycles(self, num_spikes):
+        """Get cycles spent accumulating spikes into pooled neurons"""
+        return num_spikes * self.pool_spike_cycles
+
+    def get_dispatch_cycles(self, num_spikes):
+        """Get cycles spent receiving spikes, whether or not they
+        fall within the receptive field of the core they reach"""
+        return num_spikes * self.spike_cycles
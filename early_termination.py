@@ -0,0 +1,144 @@
+# Import modules
+import logging
+import numpy as np
+import time
+
+# Import classes
+from rig.machine_control.consts import AppState
+from rig.place_and_route import Cores
+
+# Import functions
+from six import iteritems
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# EarlyTermination
+# ----------------------------------------------------------------------------
+class EarlyTermination(object):
+    """Monitors the spikes recorded by the output layer of a network while it
+    runs on SpiNNaker and stops the simulation once the classification of the
+    image being presented is decided.
+
+    Each core reports how many ticks it has completely recorded in the
+    ``user0`` field of its VCPU struct, only counting a tick once the DMA
+    transfers writing its recording to SDRAM have completed. The recordings
+    of the output layer's cores are periodically read up to the tick all of
+    them have reached and the spikes emitted by each class (output channel)
+    are counted. Once the leading class has emitted at least margin spikes
+    more than any other, every core is signalled to stop by setting the
+    ``user1`` field of its VCPU struct and exits cleanly at the start of its
+    next tick.
+
+    **NOTE** as all images presented in a run share one simulation, only runs
+    which present a single image can be terminated early
+    """
+    def __init__(self, machine_controller, placements, allocations,
+                 output_layer, margin, poll_interval=0.05):
+        """
+        Parameters
+        ----------
+        machine_controller : :py:class:`~rig.machine_control.MachineController`
+        placements : {vertex: (x, y), ...}
+        allocations : {vertex: {resource: slice, ...}, ...}
+        output_layer : :py:class:`~conv_neuron_layer.ConvNeuronLayer`
+            layer whose recorded spikes determine the classification
+        margin : int
+            number of spikes by which the leading class must lead all
+            others for the classification to be considered decided
+        poll_interval : float
+            number of seconds to wait between reading recordings
+        """
+        assert output_layer.record_spikes
+
+        self.machine_controller = machine_controller
+        self.placements = placements
+        self.allocations = allocations
+        self.output_layer = output_layer
+        self.margin = margin
+        self.poll_interval = poll_interval
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def monitor(self, timeout):
+        """Read the output layer's recordings until the classification is
+        decided, the simulation completes or timeout seconds have passed.
+
+        Returns
+        -------
+        int or None
+            number of ticks after which classification was decided and the
+            simulation was stopped or None if the simulation wasn't stopped
+        """
+        num_cores = len(self.placements)
+        deadline = time.time() + timeout
+
+        # Count spikes emitted by each output channel
+        class_spikes = np.zeros(self.output_layer.vertices[-1].z_slice.stop,
+                                dtype=np.uint32)
+        num_ticks_read = 0
+        num_polls = 0
+        while time.time() < deadline:
+            num_polls += 1
+
+            # If all cores have already exited, there's nothing to stop
+            num_exited = self.machine_controller.count_cores_in_state(
+                AppState.exit)
+            if num_exited >= num_cores:
+                break
+
+            # Find the last tick all output cores have completely recorded
+            num_ticks_recorded = min(
+                self._read_vcpu_field("user0", v)
+                for v in self.output_layer.vertices)
+
+            # If any new ticks have been recorded, add their spikes to counts
+            if num_ticks_recorded > num_ticks_read:
+                tick_slice = slice(num_ticks_read, num_ticks_recorded)
+                for v in self.output_layer.vertices:
+                    _, _, _, z = self.output_layer.read_vertex_spike_events(
+                        v, tick_slice=tick_slice)
+                    class_spikes += np.bincount(
+                        z, minlength=len(class_spikes)).astype(np.uint32)
+                num_ticks_read = num_ticks_recorded
+
+                # If the leading class leads by the margin, stop all cores
+                if self._is_decided(class_spikes):
+                    logger.info("\tClassified as %u after %u ticks "
+                                "(%u spikes, runner-up %u) in %u polls",
+                                np.argmax(class_spikes), num_ticks_read,
+                                np.amax(class_spikes),
+                                np.sort(class_spikes)[-2], num_polls)
+                    self._stop()
+                    return num_ticks_read
+
+            time.sleep(self.poll_interval)
+
+        logger.info("\tClassification not decided after %u ticks",
+                    num_ticks_read)
+        return None
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _is_decided(self, class_spikes):
+        # Classification is decided if leading class leads runner-up by margin
+        if len(class_spikes) < 2:
+            return np.sum(class_spikes) >= self.margin
+        else:
+            runner_up, leader = np.sort(class_spikes)[-2:]
+            return (int(leader) - int(runner_up)) >= self.margin
+
+    def _read_vcpu_field(self, field_name, vertex):
+        x, y = self.placements[vertex]
+        p = self.allocations[vertex][Cores].start
+        return self.machine_controller.read_vcpu_struct_field(
+            field_name, x, y, p)
+
+    def _stop(self):
+        # Signal every core to stop at the start of its next tick
+        for vertex, (x, y) in iteritems(self.placements):
+            p = self.allocations[vertex][Cores].start
+            self.machine_controller.write_vcpu_struct_field("user1", 1,
+                                                            x, y, p)
@@ -0,0 +1,67 @@
+# Import modules
+import enum
+import hashlib
+import numpy as np
+import six
+
+# Import functions
+from six import iteritems
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _get_digest(value):
+    # Get digest of a single value, used to order unordered containers
+    h = hashlib.sha1()
+    hash_value(h, value)
+    return h.digest()
+
+def hash_value(h, value):
+    """Recursively add a value built from numpy arrays, containers, enums,
+    slices and scalars to a hashlib hash object, tagging each component with
+    its type so differently-typed values don't collide"""
+    # **NOTE** values are hashed from a canonical serialisation rather than
+    # their repr so keys are stable across runs and Python versions
+    if isinstance(value, np.ndarray):
+        h.update(("ndarray%s%s" % (value.dtype.str,
+                                   value.shape)).encode("ascii"))
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, np.generic):
+        hash_value(h, np.asarray(value))
+    elif isinstance(value, dict):
+        h.update(("dict%u" % len(value)).encode("ascii"))
+        for k, v in sorted(iteritems(value), key=lambda i: _get_digest(i[0])):
+            hash_value(h, k)
+            hash_value(h, v)
+    elif isinstance(value, (set, frozenset)):
+        h.update(("set%u" % len(value)).encode("ascii"))
+        for v in sorted(value, key=_get_digest):
+            hash_value(h, v)
+    elif isinstance(value, (list, tuple)):
+        h.update(("list%u" % len(value)).encode("ascii"))
+        for v in value:
+            hash_value(h, v)
+    elif isinstance(value, enum.Enum):
+        hash_value(h, value.value)
+    elif isinstance(value, slice):
+        h.update(b"slice")
+        hash_value(h, (value.start, value.stop, value.step))
+    elif value is None:
+        h.update(b"none")
+    # **NOTE** bool is a subclass of int so must be tested first
+    elif isinstance(value, bool):
+        h.update(b"bool:1" if value else b"bool:0")
+    elif isinstance(value, six.integer_types):
+        h.update(("int:%d" % value).encode("ascii"))
+    elif isinstance(value, float):
+        h.update(("float:%s" % value.hex()).encode("ascii"))
+    # **NOTE** Python 2 strs are treated as text so they hash like Python 3's
+    elif isinstance(value, six.string_types + (six.text_type,)):
+        h.update(b"str:")
+        h.update(value if isinstance(value, bytes) else value.encode("utf-8"))
+    elif isinstance(value, bytes):
+        h.update(b"bytes:")
+        h.update(value)
+    else:
+        raise TypeError("Cannot hash value of type %s" %
+                        type(value).__name__)
@@ -0,0 +1,2 @@
+from bundle import load_bundle, save_bundle
+from layer import ImportedLayer, add_layers, get_output_size
@@ -0,0 +1,116 @@
+# Import modules
+import json
+import logging
+import numpy as np
+import struct
+
+# Import classes
+from layer import ImportedLayer
+
+logger = logging.getLogger("convolver")
+
+# Bundle files start with a magic number and version followed by the length
+# of a JSON header describing each layer. The weights of each layer follow,
+# aligned so that they can be memory-mapped directly from the file
+_magic = b"CNVBNDL\0"
+_version = 1
+_preamble_format = "<8sII"
+_alignment = 64
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _align(offset):
+    return ((offset + _alignment - 1) // _alignment) * _alignment
+
+def save_bundle(filename, layers, dtype=np.float32):
+    """Write imported layers to a memory-mappable bundle file.
+
+    Parameters
+    ----------
+    filename : str
+    layers : [:py:class:`~importers.ImportedLayer`, ...]
+    dtype : numpy dtype
+        type to store weights as - weights are quantised to at most 8-bits
+        when loaded onto SpiNNaker so single-precision is plenty
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+
+    # Build description of each layer, placing weights at
+    # aligned offsets relative to the end of the header
+    layer_descriptions = []
+    offset = 0
+    for l in layers:
+        offset = _align(offset)
+        layer_descriptions.append({"padding": l.padding, "stride": l.stride,
+                                   "output_width": l.output_width,
+                                   "output_height": l.output_height,
+                                   "pool_size": l.pool_size,
+                                   "shape": list(l.weights.shape),
+                                   "offset": offset})
+        offset += l.weights.size * dtype.itemsize
+
+    header = json.dumps({"dtype": dtype.str,
+                         "layers": layer_descriptions}).encode("utf-8")
+    data_start = _align(struct.calcsize(_preamble_format) + len(header))
+
+    logger.info("Saving %u layers to %s", len(layers), filename)
+    with open(filename, "wb") as f:
+        f.write(struct.pack(_preamble_format, _magic, _version, len(header)))
+        f.write(header)
+
+        for l, d in zip(layers, layer_descriptions):
+            f.seek(data_start + d["offset"])
+            f.write(np.ascontiguousarray(l.weights, dtype=dtype).tobytes())
+
+def load_bundle(filename, mmap=True):
+    """Load imported layers from a bundle file written by
+    :py:func:`save_bundle`, without importing any training framework.
+
+    Parameters
+    ----------
+    filename : str
+    mmap : bool
+        if True, weights are memory-mapped from the bundle file
+        and only paged in when used, otherwise they are read into memory
+
+    Returns
+    -------
+    [:py:class:`~importers.ImportedLayer`, ...]
+    """
+    with open(filename, "rb") as f:
+        preamble_bytes = struct.calcsize(_preamble_format)
+        magic, version, header_bytes = struct.unpack(_preamble_format,
+                                                     f.read(preamble_bytes))
+        if magic != _magic:
+            raise ValueError("%s is not a bundle file" % filename)
+        if version != _version:
+            raise ValueError("%s is bundle version %u - only version %u is "
+                             "supported" % (filename, version, _version))
+
+        header = json.loads(f.read(header_bytes).decode("utf-8"))
+
+        data_start = _align(preamble_bytes + header_bytes)
+        dtype = np.dtype(str(header["dtype"]))
+
+        layers = []
+        for d in header["layers"]:
+            shape = tuple(d["shape"])
+            if mmap:
+                weights = np.memmap(filename, dtype=dtype, mode="r",
+                                    offset=data_start + d["offset"],
+                                    shape=shape)
+            else:
+                f.seek(data_start + d["offset"])
+                weights = np.fromfile(f, dtype=dtype,
+                                      count=int(np.prod(shape))).reshape(shape)
+
+            layers.append(ImportedLayer(weights, d["padding"], d["stride"],
+                                        d["output_width"],
+                                        d["output_height"],
+                                        d.get("pool_size")))
+            # **NOTE** bundles written before pooling was
+            # supported have no pool size so are unpooled
+
+    logger.info("Loaded %u layers from %s", len(layers), filename)
+    return layers
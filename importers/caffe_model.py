@@ -0,0 +1,134 @@
+# Import modules
+import logging
+import numpy as np
+
+# Import classes
+from layer import ImportedLayer
+
+# Import functions
+from layer import get_output_size
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _find_proto_layer(proto_net, name):
+    for layer in proto_net.layer:
+        if layer.name == name:
+            return layer
+
+    return None
+
+def _read_repeated_scalar_field(value, default):
+    if len(value) == 1:
+        return value[0]
+    elif len(value) == 0:
+        return default
+    else:
+        assert False
+
+def _convolution_neuron_layer(layers, layer_names, params, proto_net,
+                              input_shape):
+    # If there aren't at least two more layers then there
+    # can't be a convolution layer followed by a neuron layer!
+    if len(layers) < 2:
+        return 0, None
+
+    # If first layer is a convolution layer and next is a ReLU
+    # **TODO** other types of neural non-linearity
+    if layers[0].type == "Convolution" and layers[1].type == "ReLU":
+        logger.info("\tBuilding layer from convolution layer:%s and ReLU layer:%s",
+                    layer_names[0], layer_names[1])
+
+        # Find parameters for convolution layer
+        # **NOTE** ReLU layer is parameterless
+        conv_proto_params = _find_proto_layer(
+            proto_net, layer_names[0]).convolution_param
+        conv_params = params[layer_names[0]]
+
+        # Check weight shape - num kernels, kernel depth, width, height
+        weights = conv_params[0].data
+        assert len(weights.shape) == 4
+        assert weights.shape[0] == conv_proto_params.num_output
+        assert weights.shape[1] == input_shape[2]
+        assert weights.shape[2] == conv_proto_params.kernel_size[0]
+        assert weights.shape[3] == conv_proto_params.kernel_size[0]
+
+        # Biases aren't supported so warn if they aren't all zero
+        if len(conv_params) > 1 and np.any(conv_params[1].data != 0.0):
+            logger.warning("Ignoring non-zero biases in convolution layer:%s",
+                           layer_names[0])
+
+        # Re-order weights into kernel width, kernel height,
+        # kernel depth, num kernels and copy out of caffe's memory
+        weights = np.array(np.transpose(weights, (2, 3, 1, 0)))
+
+        padding = _read_repeated_scalar_field(conv_proto_params.pad, 0)
+        stride = _read_repeated_scalar_field(conv_proto_params.stride, 1)
+        logger.debug("\t\tPad:%u, Stride:%u", padding, stride)
+
+        # Apply stride and padding to input shape to calculate output shape
+        return 2, [ImportedLayer(
+            weights, padding, stride,
+            get_output_size(input_shape[0], weights.shape[0], padding, stride),
+            get_output_size(input_shape[1], weights.shape[1], padding, stride))]
+    else:
+        return 0, None
+
+def load_caffe_model(proto_filename, model_filename, input_shape):
+    """Load a trained caffe model and convert it into a layer list.
+
+    Parameters
+    ----------
+    proto_filename : str
+        prototxt file describing network
+    model_filename : str
+        caffemodel file containing trained weights
+    input_shape : (int, int, int)
+        width, height and depth of the model's input
+
+    Returns
+    -------
+    [:py:class:`~importers.ImportedLayer`, ...]
+    """
+    # **NOTE** caffe is only imported when a model is actually converted
+    import caffe
+    import caffe.proto.caffe_pb2 as caffe_pb2
+    from google.protobuf import text_format
+
+    caffe.set_mode_cpu()
+    net = caffe.Net(proto_filename, model_filename, caffe.TEST)
+
+    # Load proto buffer directly to read convolution parameters
+    proto_net = caffe_pb2.NetParameter()
+    with open(proto_filename, "r") as f:
+        text_format.Merge(f.read(), proto_net)
+
+    logger.info("Layers")
+    output_layers = []
+    l = 0
+    while l < len(net.layers):
+        # Slice out unprocessed layers of network
+        subsequent_layers = net.layers[l:]
+        subsequent_layer_names = net._layer_names[l:]
+
+        # Attempt to map to output layers
+        n_input_layers_processed, new_output_layers =\
+            _convolution_neuron_layer(
+                subsequent_layers, subsequent_layer_names, net.params,
+                proto_net, (output_layers[-1].output_shape
+                            if len(output_layers) > 0 else input_shape))
+
+        # If we failed to process any input layers
+        if n_input_layers_processed == 0:
+            logger.warning("Cannot map input layer name:%s, type:%s "
+                           "to SpiNNaker", subsequent_layer_names[0],
+                           subsequent_layers[0].type)
+            l += 1
+        # Otherwise add newly created output layers to list
+        else:
+            output_layers.extend(new_output_layers)
+            l += n_input_layers_processed
+
+    return output_layers
@@ -0,0 +1,68 @@
+# Import modules
+import logging
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def get_output_size(input_size, kernel_size, padding, stride):
+    """Apply stride and padding to the size of one dimension of
+    a convolution's input to get that of its output"""
+    return ((input_size - kernel_size + (2 * padding)) // stride) + 1
+
+def add_layers(conv_net, layers, record_spikes=True, **kwargs):
+    """Add a list of imported layers to a :py:class:`~conv_net.ConvNet`.
+
+    Parameters
+    ----------
+    conv_net : :py:class:`~conv_net.ConvNet`
+    layers : [:py:class:`ImportedLayer`, ...]
+    record_spikes : bool or [bool, ...]
+        should every layer record its spikes or, if a list
+        is passed, should each individual layer record its spikes
+    kwargs
+        any other keyword arguments to pass to
+        :py:meth:`~conv_net.ConvNet.add_layer` for every layer
+    """
+    if isinstance(record_spikes, bool):
+        record_spikes = [record_spikes] * len(layers)
+    assert len(record_spikes) == len(layers)
+
+    for l, r in zip(layers, record_spikes):
+        conv_net.add_layer(output_width=l.output_width,
+                           output_height=l.output_height,
+                           padding=l.padding, stride=l.stride,
+                           weights=l.weights, record_spikes=r,
+                           pool_size=l.pool_size, **kwargs)
+
+# ----------------------------------------------------------------------------
+# ImportedLayer
+# ----------------------------------------------------------------------------
+class ImportedLayer(object):
+    """A convolution layer followed by a neural non-linearity, imported from
+    a trained model, with weights ordered kernel width, kernel height, kernel
+    depth and number of kernels as expected by
+    :py:meth:`~conv_net.ConvNet.add_layer` and optionally followed by average
+    pooling with a pool_size x pool_size window"""
+    def __init__(self, weights, padding, stride, output_width, output_height,
+                 pool_size=None):
+        assert len(weights.shape) == 4
+
+        self.weights = weights
+        self.padding = padding
+        self.stride = stride
+        self.output_width = output_width
+        self.output_height = output_height
+        self.pool_size = pool_size
+
+    @property
+    def output_shape(self):
+        # **NOTE** output width and height are those of the convolution
+        if self.pool_size is None:
+            return (self.output_width, self.output_height,
+                    self.weights.shape[3])
+        else:
+            return (self.output_width // self.pool_size,
+                    self.output_height // self.pool_size,
+                    self.weights.shape[3])
@@ -0,0 +1,165 @@
+# Import modules
+import logging
+import numpy as np
+import os
+
+# Import classes
+from layer import ImportedLayer
+
+# Import functions
+from layer import get_output_size
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _ignore_dropout(layers, input_shape):
+    if layers[0]["type"] == "neon.layers.layer.Dropout":
+        logger.debug("\tIgnoring dropout layer:%s",
+                     layers[0]["config"]["name"])
+        return 1, []
+    else:
+        return 0, None
+
+def _convolution_neuron_layer(layers, input_shape):
+    # If there aren't at least two more layers then there
+    # can't be a convolution layer followed by a neuron layer!
+    if len(layers) < 2:
+        return 0, None
+
+    # If first layer is a convolution layer and next is an activation layer
+    if (layers[0]["type"] == "neon.layers.layer.Convolution" and
+        layers[1]["type"] == "neon.layers.layer.Activation"):
+        conv_config = layers[0]["config"]
+        activation_config = layers[1]["config"]
+
+        logger.info("\tBuilding layer from convolution layer:%s and activation layer:%s",
+            conv_config["name"], activation_config["name"])
+
+        stride = conv_config["strides"] if "strides" in conv_config else 1
+        padding = conv_config["padding"] if "padding" in conv_config else 0
+
+        conv_f_shape = conv_config["fshape"]
+
+        # Reshape weights into kernel_width, kernel_height, kernel_depth, num_filters
+        weights = layers[0]["params"]["W"]
+        assert conv_f_shape[0] * conv_f_shape[1] * input_shape[2] == weights.shape[0]
+        weights = np.reshape(weights, (conv_f_shape[0], conv_f_shape[1],
+                                       input_shape[2], weights.shape[1]))
+
+        # Check activation function
+        if activation_config["transform"]["type"] != "neon.transforms.activation.Rectlin":
+            logger.warning("Only RectLin activation functions are "
+                           "supported not %s",
+                           activation_config["transform"]["type"])
+
+        # Apply stride and padding to input shape to calculate output shape
+        return 2, [ImportedLayer(
+            weights, padding, stride,
+            get_output_size(input_shape[0], conv_f_shape[0], padding, stride),
+            get_output_size(input_shape[1], conv_f_shape[1], padding, stride))]
+    else:
+        return 0, None
+
+def _fuse_average_pooling(layers, output_layers):
+    # If layer isn't average pooling or there's no
+    # previous layer to fuse it into, it can't be fused
+    if (layers[0]["type"] != "neon.layers.layer.Pooling" or
+        len(output_layers) == 0 or output_layers[-1].pool_size is not None):
+        return 0
+
+    pool_config = layers[0]["config"]
+    if pool_config.get("op", "max") != "avg":
+        return 0
+
+    # Only non-overlapping, unpadded, square windows which
+    # exactly tile the previous layer's output are supported
+    # **NOTE** neon's stride defaults to the pool size
+    pool_size = pool_config["fshape"]
+    prev_layer = output_layers[-1]
+    if (not isinstance(pool_size, int) or
+        pool_config.get("strides", pool_size) not in (pool_size, {}) or
+        pool_config.get("padding", 0) not in (0, {}) or
+        (prev_layer.output_width % pool_size) != 0 or
+        (prev_layer.output_height % pool_size) != 0):
+        logger.warning("Cannot fuse average pooling layer:%s with "
+                       "pool size:%s into previous layer",
+                       pool_config["name"], pool_size)
+        return 0
+
+    logger.info("\tFusing average pooling layer:%s into previous layer",
+                pool_config["name"])
+    prev_layer.pool_size = pool_size
+    return 1
+
+_layer_processing_functions = [_ignore_dropout,
+                               _convolution_neuron_layer]
+
+def import_neon_model(model_description, input_shape):
+    """Convert the description of a trained neon model into a layer list.
+
+    Parameters
+    ----------
+    model_description : dict
+        description of model, including weights, as returned by
+        ``Model.get_description(get_weights=True)`` or saved by
+        ``Model.save_params``
+    input_shape : (int, int, int)
+        width, height and depth of the model's input
+
+    Returns
+    -------
+    [:py:class:`~importers.ImportedLayer`, ...]
+    """
+    # Get list of layers, unwrapping them from a container if necessary
+    layers = model_description["model"]["config"]["layers"]
+    if isinstance(layers, dict):
+        layers = layers["config"]["layers"]
+
+    logger.info("Layers")
+    output_layers = []
+    l = 0
+    while l < len(layers):
+        # Slice out unprocessed layers of network
+        subsequent_layers = layers[l:]
+
+        # If layer is average pooling, fuse it into the previous layer
+        n_input_layers_processed = _fuse_average_pooling(subsequent_layers,
+                                                         output_layers)
+        if n_input_layers_processed != 0:
+            l += n_input_layers_processed
+            continue
+
+        # Attempt to map to output layers using each layer processing function
+        n_input_layers_processed = 0
+        for f in _layer_processing_functions:
+            n_input_layers_processed, new_output_layers = f(
+                subsequent_layers,
+                (output_layers[-1].output_shape if len(output_layers) > 0
+                 else input_shape))
+            if n_input_layers_processed != 0:
+                break
+
+        # If we failed to process any input layers
+        if n_input_layers_processed == 0:
+            logger.warning("Cannot map input layer name:%s, type:%s "
+                           "to SpiNNaker",
+                           subsequent_layers[0]["config"]["name"],
+                           subsequent_layers[0]["type"])
+            l += 1
+        # Otherwise add newly created output layers to list
+        else:
+            output_layers.extend(new_output_layers)
+            l += n_input_layers_processed
+
+    return output_layers
+
+def load_neon_model(params_filename, input_shape):
+    """Load a trained neon model saved by ``Model.save_params``
+    and convert it into a layer list (see :py:func:`import_neon_model`)"""
+    # **NOTE** neon is only imported when a model is actually converted
+    from neon.util.persist import load_obj
+
+    return import_neon_model(load_obj(os.path.expanduser(params_filename)),
+                             input_shape)
@@ -0,0 +1,178 @@
+# Import modules
+import logging
+from rig import machine
+import threading
+
+# Import classes
+from collections import defaultdict
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+
+# Import functions
+from rig_cpp_common.utils import load_regions
+from six import iteritems
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _get_scp_connection(machine_controller, x, y):
+    # **NOTE** SCP connections are not thread-safe so loading and readback
+    # must serialise their use of each one. MachineController chooses which
+    # connection to use for each chip (that of the chip's local Ethernet-
+    # connected chip if it has one open, otherwise the boot connection) but
+    # doesn't expose this choice publicly. Rather than duplicating this logic
+    # and risking locking a different connection to the one actually used,
+    # this is the only place the private method is called
+    return machine_controller._get_connection(x, y)
+
+# ----------------------------------------------------------------------------
+# SerialisedRegion
+# ----------------------------------------------------------------------------
+class SerialisedRegion(object):
+    """Region whose contents have already been serialised, allowing the host-
+    side work of packing a region to be done separately from writing it"""
+    def __init__(self, size, data):
+        self.size = size
+        self.data = data
+
+    @classmethod
+    def from_region(cls, region, region_arguments):
+        # Serialise region into memory
+        args, kwargs = region_arguments
+        fp = BytesIO()
+        region.write_subregion_to_file(fp, *args, **kwargs)
+
+        return cls(region.sizeof(*args, **kwargs), fp.getvalue())
+
+    # --------------------------------------------------------------------------
+    # Region methods
+    # --------------------------------------------------------------------------
+    def sizeof(self, *args, **kwargs):
+        return self.size
+
+    def write_subregion_to_file(self, fp, *args, **kwargs):
+        fp.write(self.data)
+
+# ----------------------------------------------------------------------------
+# ChipMachineController
+# ----------------------------------------------------------------------------
+class ChipMachineController(object):
+    """Wrapper around a MachineController which directs SDRAM allocation to a
+    single chip without using the machine controller's context stack, which
+    is shared between threads"""
+    def __init__(self, machine_controller, x, y):
+        self._machine_controller = machine_controller
+        self.x = x
+        self.y = y
+
+    def __getattr__(self, name):
+        return getattr(self._machine_controller, name)
+
+    def sdram_alloc_as_filelike(self, size, tag=0, **kwargs):
+        return self._machine_controller.sdram_alloc_as_filelike(
+            size, tag, x=self.x, y=self.y, **kwargs)
+
+# ----------------------------------------------------------------------------
+# ConnectionLocks
+# ----------------------------------------------------------------------------
+class ConnectionLocks(object):
+    """Locks serialising access to each of the SCP connections a machine
+    controller uses, as SCP connections are not thread-safe. Shared by the
+    Loader and :py:class:`~readback.Readback`"""
+    def __init__(self, machine_controller):
+        self.machine_controller = machine_controller
+
+        # Create a lock for each SCP connection
+        self._connection_locks = defaultdict(threading.Lock)
+        self._connection_locks_lock = threading.Lock()
+
+    def get(self, x, y):
+        """Get the lock for the connection used to communicate with a chip"""
+        connection = _get_scp_connection(self.machine_controller, x, y)
+        with self._connection_locks_lock:
+            return self._connection_locks[connection]
+
+# ----------------------------------------------------------------------------
+# Loader
+# ----------------------------------------------------------------------------
+class Loader(object):
+    """Loads the regions of all vertices in a network, grouped by the chip
+    they are placed on. Chips are loaded concurrently on a bounded pool of
+    threads although, as SCP connections are not thread-safe, only the
+    serialisation of regions and communication with chips reached through
+    different connections actually happens in parallel."""
+    def __init__(self, machine_controller, placements, allocations, z_mask,
+                 num_threads=8, region_cache=None):
+        self.machine_controller = machine_controller
+        self.placements = placements
+        self.allocations = allocations
+        self.z_mask = z_mask
+        self.num_threads = num_threads
+        self.region_cache = region_cache
+
+        self._connection_locks = ConnectionLocks(machine_controller)
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def load(self, layers):
+        # Group vertices of all layers by chip
+        chip_vertices = defaultdict(list)
+        for l in layers:
+            for v in l.vertices:
+                chip_vertices[self.placements[v]].append((l, v))
+
+        logger.debug("\tLoading %u chips using %u threads",
+                     len(chip_vertices), self.num_threads)
+
+        # If loading should be serial, load each chip in turn
+        if self.num_threads <= 1:
+            for chip in iteritems(chip_vertices):
+                self._load_chip(chip)
+        # Otherwise, load chips using a pool of threads
+        else:
+            pool = ThreadPool(self.num_threads)
+            try:
+                pool.map(self._load_chip, list(iteritems(chip_vertices)))
+            finally:
+                pool.close()
+                pool.join()
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _serialise_region(self, region, region_arguments):
+        # If there's no cache, serialise region directly
+        if self.region_cache is None:
+            return SerialisedRegion.from_region(region, region_arguments)
+        # Otherwise, get serialised region from cache
+        else:
+            return self.region_cache.get(region, region_arguments)
+
+    def _load_chip(self, chip):
+        (x, y), vertices = chip
+        chip_machine_controller = ChipMachineController(
+            self.machine_controller, x, y)
+        connection_lock = self._connection_locks.get(x, y)
+
+        for l, v in vertices:
+            # Get core this vertex should be run on
+            core = self.allocations[v][machine.Cores]
+            assert (core.stop - core.start) == 1
+
+            logger.debug("\t\tVertex %s (%u, %u, %u)", v, x, y, core.start)
+
+            # Serialise regions
+            region_arguments = l.get_region_arguments(v, self.z_mask)
+            serialised_regions = {
+                r: self._serialise_region(region, region_arguments[r])
+                for r, region in iteritems(l.regions)}
+
+            # Allocate SDRAM and write serialised regions to it
+            with connection_lock:
+                v.region_memory = load_regions(serialised_regions,
+                                               region_arguments,
+                                               chip_machine_controller,
+                                               core, logger)
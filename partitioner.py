@@ -0,0 +1,83 @@
+# Import modules
+import logging
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def partition_kernels(num_kernels, core_dtcm_bytes, kernel_dtcm_bytes,
+                      max_dtcm_bytes, core_cycles, kernel_cycles, max_cycles,
+                      max_kernels=None):
+    """Split the kernels of a layer into evenly-sized slices, one per core,
+    such that no core exceeds either its DTCM or its per-tick cycle budget.
+
+    Parameters
+    ----------
+    num_kernels : int
+        number of kernels in layer
+    core_dtcm_bytes : int
+        DTCM required by each core regardless of how many kernels it has
+    kernel_dtcm_bytes : int
+        DTCM required for each kernel and the neurons it drives
+    max_dtcm_bytes : int
+        DTCM available to each core
+    core_cycles : float
+        cycles each core spends every tick regardless
+        of how many kernels it is responsible for
+    kernel_cycles : float
+        cycles spent every tick on each kernel
+    max_cycles : int
+        cycles available to each core every tick
+    max_kernels : int or None
+        maximum number of kernels the kernel format used
+        by each core supports or None if it is unlimited
+
+    Returns
+    -------
+    list of slices
+        Slices of kernels to assign to each core.
+    """
+    # Calculate how many kernels fit in DTCM
+    max_dtcm_kernels = (max_dtcm_bytes - core_dtcm_bytes) // kernel_dtcm_bytes
+    if max_dtcm_kernels < 1:
+        raise ValueError("A single kernel requires %u bytes of DTCM but only "
+                         "%u bytes are available" %
+                         (core_dtcm_bytes + kernel_dtcm_bytes, max_dtcm_bytes))
+
+    # Calculate how many kernels can be processed within tick
+    if kernel_cycles > 0:
+        max_cycle_kernels = int((max_cycles - core_cycles) // kernel_cycles)
+    else:
+        max_cycle_kernels = num_kernels
+
+    # If even a single kernel won't fit within the
+    # tick, warn and give each kernel its own core
+    if max_cycle_kernels < 1:
+        logger.warning("\t\tA single kernel requires %u cycles per tick but "
+                       "only %u are available - timer will overrun",
+                       core_cycles + kernel_cycles, max_cycles)
+        max_cycle_kernels = 1
+
+    max_kernels_per_core = min(max_dtcm_kernels, max_cycle_kernels)
+    logger.debug("\t\tMax kernels per core - DTCM:%u, cycles:%u",
+                 max_dtcm_kernels, max_cycle_kernels)
+
+    # Limit kernels per core to the number the kernel format supports
+    if max_kernels is not None:
+        max_kernels_per_core = min(max_kernels_per_core, max_kernels)
+        logger.debug("\t\tMax kernels per core - format:%u", max_kernels)
+
+    # Calculate the minimum number of cores required and
+    # split the kernels between them as evenly as possible
+    num_cores = -(-num_kernels // max_kernels_per_core)
+    base_kernels, extra_kernels = divmod(num_kernels, num_cores)
+
+    slices = []
+    start = 0
+    for c in range(num_cores):
+        stop = start + base_kernels + (1 if c < extra_kernels else 0)
+        slices.append(slice(start, stop))
+        start = stop
+
+    return slices
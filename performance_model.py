@@ -0,0 +1,253 @@
+# Import modules
+import logging
+
+# Import classes
+from conv_neuron_layer import Regions
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _get_overlap(a, b):
+    return max(0, min(a.stop, b.stop) - max(a.start, b.start))
+
+def _get_num_neurons(x_slice, y_slice, z_slice):
+    return ((x_slice.stop - x_slice.start) * (y_slice.stop - y_slice.start) *
+            (z_slice.stop - z_slice.start))
+
+# ----------------------------------------------------------------------------
+# CoreEstimate
+# ----------------------------------------------------------------------------
+class CoreEstimate(object):
+    """Estimated per-tick workload of the core simulating a single vertex"""
+    def __init__(self, layer_index, vertex, received_spikes,
+                 convolved_spikes, emitted_spikes, tick_cycles,
+                 dispatch_cycles, convolve_spike_cycles,
+                 convolve_image_cycles, update_cycles, emit_cycles,
+                 budget_cycles, peak_input_buffer):
+        self.layer_index = layer_index
+        self.vertex = vertex
+        self.received_spikes = received_spikes
+        self.convolved_spikes = convolved_spikes
+        self.emitted_spikes = emitted_spikes
+        self.tick_cycles = tick_cycles
+        self.dispatch_cycles = dispatch_cycles
+        self.convolve_spike_cycles = convolve_spike_cycles
+        self.convolve_image_cycles = convolve_image_cycles
+        self.update_cycles = update_cycles
+        self.emit_cycles = emit_cycles
+        self.budget_cycles = budget_cycles
+        self.peak_input_buffer = peak_input_buffer
+
+    # ------------------------------------------------------------------------
+    # Properties
+    # ------------------------------------------------------------------------
+    @property
+    def total_cycles(self):
+        return (self.tick_cycles + self.dispatch_cycles +
+                self.convolve_spike_cycles + self.convolve_image_cycles +
+                self.update_cycles + self.emit_cycles)
+
+    @property
+    def utilisation(self):
+        return float(self.total_cycles) / float(self.budget_cycles)
+
+    @property
+    def timer_overrun(self):
+        return self.total_cycles > self.budget_cycles
+
+    @property
+    def input_buffer_overflow(self):
+        return self.peak_input_buffer > PerformanceModel.spike_input_buffer_size
+
+# ----------------------------------------------------------------------------
+# PerformanceModel
+# ----------------------------------------------------------------------------
+class PerformanceModel(object):
+    """Analytical model of the per-tick workload of every core in a
+    partitioned network, used to find cores which will overrun their timer
+    tick or drop incoming spikes before running on SpiNNaker.
+
+    Spikes are assumed to be emitted at the expected rates, spread uniformly
+    across each layer. Each core emits its spikes back-to-back at the start of
+    each tick, separated by the emission gap, so the spikes a core receives
+    arrive over the longest emission period of the cores which send them.
+    """
+    # Size of SpikeInputBuffer
+    # **NOTE** this should match the typedef in each binary's config.h
+    spike_input_buffer_size = 256
+
+    def __init__(self, cost_model, timer_period_us):
+        self.cost_model = cost_model
+        self.timer_period_us = timer_period_us
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def estimate(self, layers, spike_rates):
+        """Estimate the workload of the core simulating each vertex.
+
+        Parameters
+        ----------
+        layers : [:py:class:`~conv_neuron_layer.ConvNeuronLayer`, ...]
+        spike_rates : [float or None, ...]
+            expected number of spikes emitted by each neuron in each layer
+            per tick (None is treated as no spikes)
+
+        Returns
+        -------
+        [[:py:class:`CoreEstimate`, ...], ...]
+            estimates for each vertex in each layer
+        """
+        spike_rates = [0.0 if r is None else r for r in spike_rates]
+        budget_cycles = self.cost_model.get_budget_cycles(
+            self.timer_period_us, 1.0)
+
+        estimates = []
+        for i, layer in enumerate(layers):
+            prev_layer = layers[i - 1] if i > 0 else None
+            prev_rate = spike_rates[i - 1] if i > 0 else 0.0
+            estimates.append([
+                self._estimate_vertex(i, layer, v, prev_layer, prev_rate,
+                                      spike_rates[i], budget_cycles)
+                for v in layer.vertices])
+        return estimates
+
+    def log_report(self, estimates):
+        """Log the estimated workload of the busiest core in each layer
+        and a warning for each core expected to overrun or drop spikes"""
+        logger.info("Performance estimate")
+        for i, layer_estimates in enumerate(estimates):
+            busiest = max(layer_estimates, key=lambda e: e.total_cycles)
+            logger.info("\tLayer %u - busiest core:%u cycles (%.1f%%) - "
+                        "dispatch:%u, convolve spike:%u, convolve image:%u, "
+                        "update:%u, emit:%u, peak input buffer:%u", i,
+                        busiest.total_cycles, busiest.utilisation * 100.0,
+                        busiest.dispatch_cycles,
+                        busiest.convolve_spike_cycles,
+                        busiest.convolve_image_cycles, busiest.update_cycles,
+                        busiest.emit_cycles, busiest.peak_input_buffer)
+
+            # Warn about cores expected to overrun
+            overruns = [e for e in layer_estimates if e.timer_overrun]
+            if len(overruns) > 0:
+                worst = max(overruns, key=lambda e: e.total_cycles)
+                logger.warning("\t\t%u cores will overrun their timer tick - "
+                               "worst requires %u cycles of %u", len(overruns),
+                               worst.total_cycles, worst.budget_cycles)
+
+            # Warn about cores expected to drop spikes
+            overflows = [e for e in layer_estimates
+                         if e.input_buffer_overflow]
+            if len(overflows) > 0:
+                worst = max(overflows, key=lambda e: e.peak_input_buffer)
+                logger.warning("\t\t%u cores may drop spikes - worst may "
+                               "queue %u spikes in a %u entry input buffer",
+                               len(overflows), worst.peak_input_buffer,
+                               self.spike_input_buffer_size)
+
+            # Log each of these cores at debug level
+            for e in layer_estimates:
+                if e.timer_overrun or e.input_buffer_overflow:
+                    v = e.vertex
+                    logger.debug("\t\t\tVertex x:[%u, %u), y:[%u, %u), "
+                                 "z:[%u, %u) - %u cycles, input buffer:%u",
+                                 v.x_slice.start, v.x_slice.stop,
+                                 v.y_slice.start, v.y_slice.stop,
+                                 v.z_slice.start, v.z_slice.stop,
+                                 e.total_cycles, e.peak_input_buffer)
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _estimate_vertex(self, layer_index, layer, vertex, prev_layer,
+                         prev_rate, rate, budget_cycles):
+        cost_model = self.cost_model
+        conv_kernel = layer.regions[Regions.conv_kernel]
+        num_kernels = vertex.z_slice.stop - vertex.z_slice.start
+        num_tile_neurons = ((vertex.x_slice.stop - vertex.x_slice.start) *
+                            (vertex.y_slice.stop - vertex.y_slice.start))
+        weight_density = conv_kernel.get_density(vertex.weights)
+
+        # Loop through the vertices in the previous layer which send spikes
+        # to this vertex i.e. any of whose neurons are in its receptive field
+        received_spikes = 0.0
+        convolved_spikes = 0.0
+        arrival_us = 0.0
+        if prev_layer is not None:
+            x_field, y_field = layer.get_receptive_field(vertex)
+            for source in prev_layer.vertices:
+                # **NOTE** if the previous layer is pooled, its
+                # pooled neurons spike at the same mean rate
+                source_slices = prev_layer.get_output_slices(source)
+                num_field_neurons = (
+                    _get_overlap(source_slices[0], x_field) *
+                    _get_overlap(source_slices[1], y_field) *
+                    (source.z_slice.stop - source.z_slice.start))
+                if num_field_neurons == 0:
+                    continue
+
+                # Every spike the source emits is received
+                # but only those in the receptive field are convolved
+                source_spikes = _get_num_neurons(*source_slices) * prev_rate
+                received_spikes += source_spikes
+                convolved_spikes += num_field_neurons * prev_rate
+
+                # Spikes arrive for as long as the slowest source is emitting
+                arrival_us = max(arrival_us,
+                                 cost_model.get_emit_cycles(source_spikes) /
+                                 cost_model.clock_mhz)
+
+        # Calculate cycles spent on each operation
+        dispatch_cycles = cost_model.get_dispatch_cycles(received_spikes)
+        convolve_spike_cycles = (
+            convolved_spikes * num_kernels *
+            cost_model.get_convolve_spike_cycles(conv_kernel.kernel_width,
+                                                 layer.stride, weight_density))
+
+        # **NOTE** adding precomputed input currents is counted
+        # as convolving images as it replaces this operation
+        input_region = layer.regions[Regions.input]
+        if input_region.input_data is None:
+            convolve_image_cycles = 0.0
+        elif input_region.precompute:
+            convolve_image_cycles = cost_model.get_add_input_cycles(
+                num_tile_neurons * num_kernels)
+        else:
+            image_size = [s.stop - s.start for s in
+                          input_region.get_image_slices(vertex.x_slice,
+                                                        vertex.y_slice)]
+            convolve_image_cycles = num_kernels * \
+                cost_model.get_convolve_image_cycles(
+                    conv_kernel.kernel_width, conv_kernel.kernel_depth,
+                    layer.stride, image_size, weight_density)
+
+        # If layer is pooled, spikes are accumulated into pooled
+        # neurons and only those these emit are sent
+        num_neurons = num_tile_neurons * num_kernels
+        emitted_spikes = (
+            _get_num_neurons(*layer.get_output_slices(vertex)) * rate)
+        update_cycles = cost_model.get_update_cycles(num_neurons)
+        emit_cycles = cost_model.get_emit_cycles(emitted_spikes)
+        if layer.pool_size is not None:
+            update_cycles += cost_model.get_pool_cycles(num_neurons * rate)
+
+        # If spikes arrive faster than they can be processed, the input
+        # buffer grows until the sources stop emitting, peaking at the
+        # number of spikes received minus those processed in the meantime
+        service_cycles = dispatch_cycles + convolve_spike_cycles
+        if received_spikes > 0.0 and service_cycles > 0.0:
+            service_us = (service_cycles /
+                          (received_spikes * cost_model.clock_mhz))
+            peak_input_buffer = max(0.0, received_spikes -
+                                    (arrival_us / service_us))
+        else:
+            peak_input_buffer = 0.0
+
+        return CoreEstimate(layer_index, vertex, received_spikes,
+                            convolved_spikes, emitted_spikes,
+                            cost_model.tick_cycles, dispatch_cycles,
+                            convolve_spike_cycles, convolve_image_cycles,
+                            update_cycles, emit_cycles, budget_cycles,
+                            int(round(peak_input_buffer)))
@@ -0,0 +1,106 @@
+# Import modules
+import hashlib
+import logging
+import os
+import tempfile
+
+# Import functions
+from hashing import hash_value
+from six import iteritems
+from six.moves import cPickle as pickle
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# PlaceAndRouteCache
+# ----------------------------------------------------------------------------
+class PlaceAndRouteCache(object):
+    """On-disk cache of placements, allocations, application maps and
+    (minimised) routing tables, addressed by a hash of everything place-and-
+    route depends upon: the resources and applications of each vertex, the
+    nets connecting them, their routing keys and the machine itself.
+
+    **NOTE** vertices are recreated every time a network is built so they
+    are identified by their index in the list of vertices passed
+    """
+    # Version of cache; increment whenever the format of the results changes
+    Version = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        # Create cache directory if required
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def get_key(self, vertices, vertex_resources, vertex_applications,
+                nets, net_keys, system_info):
+        vertex_indices = {v: i for i, v in enumerate(vertices)}
+
+        # Describe nets in terms of vertex indices
+        # **NOTE** nets are sorted so the order they were built in is ignored
+        net_structure = sorted(
+            (vertex_indices[n.source],
+             sorted(vertex_indices[s] for s in n.sinks),
+             n.weight, net_keys[n])
+            for n in nets)
+
+        # Describe resources by the names of rig's resource sentinels
+        resources = [{type(r).__name__: n
+                      for r, n in iteritems(vertex_resources[v])}
+                     for v in vertices]
+
+        h = hashlib.sha1()
+        hash_value(h, [self.Version, resources,
+                       [vertex_applications[v] for v in vertices],
+                       net_structure,
+                       system_info.width, system_info.height,
+                       dict(system_info)])
+        return h.hexdigest()
+
+    def load(self, key, vertices):
+        """Load cached results, returning None if there are none"""
+        try:
+            with open(self._get_filename(key), "rb") as f:
+                (placements, allocations, app_map,
+                 routing_tables, routing_table_report) = pickle.load(f)
+        except (IOError, OSError):
+            return None
+
+        logger.info("\tRead place-and-route results from cache")
+
+        # Convert vertex indices back into vertices
+        placements = {vertices[i]: p for i, p in iteritems(placements)}
+        allocations = {vertices[i]: a for i, a in iteritems(allocations)}
+        return (placements, allocations, app_map,
+                routing_tables, routing_table_report)
+
+    def save(self, key, vertices, placements, allocations, app_map,
+             routing_tables, routing_table_report):
+        # Convert vertices into indices
+        vertex_indices = {v: i for i, v in enumerate(vertices)}
+        placements = {vertex_indices[v]: p for v, p in iteritems(placements)}
+        allocations = {vertex_indices[v]: a
+                       for v, a in iteritems(allocations)}
+
+        # **NOTE** application maps are built from nested defaultdicts
+        # with lambda factories so must be converted to dicts to pickle
+        app_map = {app: dict(chips) for app, chips in iteritems(app_map)}
+
+        # Write to a temporary file before moving it into place
+        # so partial files are never seen by other processes
+        with tempfile.NamedTemporaryFile(dir=self.directory,
+                                         delete=False) as f:
+            pickle.dump((placements, allocations, app_map,
+                         routing_tables, routing_table_report),
+                        f, pickle.HIGHEST_PROTOCOL)
+        os.rename(f.name, self._get_filename(key))
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _get_filename(self, key):
+        return os.path.join(self.directory, key + ".pickle")
@@ -0,0 +1,155 @@
+# Import modules
+import json
+import logging
+import numpy as np
+from rig import machine
+
+# Import functions
+from six import iteritems, itervalues
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# ProfileReport
+# ----------------------------------------------------------------------------
+class ProfileReport(object):
+    """Aggregates the profiling data recorded by every core in a network.
+
+    Profiling data is read from each vertex using
+    :py:meth:`~conv_neuron_layer.ConvNeuronLayer.read_profile` which, for
+    each tag, provides the times (in ms since the core's first sample) at
+    which the profiled section was entered and how long it took. These are
+    binned into timer ticks so that the distribution of time spent in each
+    section per tick can be summarised across all of a layer's cores and
+    cores which are slower than the rest of their layer can be found.
+    """
+    def __init__(self, layers, placements, allocations, timer_period_us,
+                 num_ticks, region_memory=None):
+        """
+        Parameters
+        ----------
+        layers : [:py:class:`~conv_neuron_layer.ConvNeuronLayer`, ...]
+        placements : {vertex: (x, y), ...}
+        allocations : {vertex: {resource: slice, ...}, ...}
+        timer_period_us : int
+        num_ticks : int
+            total number of ticks simulated
+        region_memory : {vertex: {region: file-like, ...}, ...} or None
+            copies of regions read back from each vertex (if None, profiles
+            are read directly from each vertex's memory on the machine)
+        """
+        self.placements = placements
+        self.allocations = allocations
+        self.timestep_ms = timer_period_us / 1000.0
+        self.num_ticks = num_ticks
+
+        # Read profile from every vertex in every layer
+        # **NOTE** read_profile returns profiles in vertex order
+        self.layer_profiles = [
+            [(v, p) for v, (_, p) in zip(l.vertices,
+                                         l.read_profile(region_memory))]
+            for l in layers]
+
+        # Get tag names used by each layer
+        self.layer_tag_names = [sorted(l.profiler_tag_names.values())
+                                for l in layers]
+
+        # Bin each vertex's profile into the time spent on each tag per tick
+        self.layer_tick_times = [
+            {t: np.vstack([self._get_tick_times(p, t) for _, p in profiles])
+             for t in tag_names}
+            for profiles, tag_names in zip(self.layer_profiles,
+                                           self.layer_tag_names)]
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def log_report(self, num_slowest=5):
+        """Log the distribution of time spent per tick in each profiled
+        section across each layer's cores and the slowest cores"""
+        logger.info("Profile")
+        for i, (profiles, tick_times) in enumerate(
+                zip(self.layer_profiles, self.layer_tick_times)):
+            logger.info("\tLayer %u (%u cores)", i, len(profiles))
+            for tag, times in sorted(iteritems(tick_times)):
+                logger.info("\t\t%s - mean:%.3fms, median:%.3fms, "
+                            "95th percentile:%.3fms, max:%.3fms per tick",
+                            tag, np.mean(times), np.median(times),
+                            np.percentile(times, 95.0), np.amax(times))
+
+            # Sum time spent on all tags to get total per-tick time of
+            # each core and hence the cores which overrun most often
+            total_times = sum(itervalues(tick_times))
+            num_overruns = np.sum(total_times > self.timestep_ms, axis=1)
+            logger.info("\t\t%u ticks overran across %u cores",
+                        np.sum(num_overruns), np.count_nonzero(num_overruns))
+
+            # Log slowest cores by their worst tick
+            max_times = np.amax(total_times, axis=1)
+            for c in np.argsort(max_times)[::-1][:num_slowest]:
+                vertex = profiles[c][0]
+                logger.info("\t\t\tCore %s - %s - max:%.3fms, mean:%.3fms, "
+                            "overruns:%u", self._get_core_name(vertex),
+                            self._get_vertex_name(vertex), max_times[c],
+                            np.mean(total_times[c]), num_overruns[c])
+
+    def write_chrome_trace(self, filename):
+        """Write every profiled section as a Chrome trace event file which
+        can be viewed in chrome://tracing or https://ui.perfetto.dev.
+
+        Each layer is shown as a process with a track for each of its cores.
+        """
+        events = []
+        core_index = 0
+        for i, profiles in enumerate(self.layer_profiles):
+            events.append({"name": "process_name", "ph": "M", "pid": i,
+                           "args": {"name": "Layer %u" % i}})
+
+            for vertex, profile in profiles:
+                events.append({"name": "thread_name", "ph": "M", "pid": i,
+                               "tid": core_index,
+                               "args": {"name": "Core %s - %s" % (
+                                   self._get_core_name(vertex),
+                                   self._get_vertex_name(vertex))}})
+
+                # Add a complete event for each sample, converting to us
+                for tag, (entry_times, durations) in sorted(
+                        iteritems(profile)):
+                    events.extend(
+                        {"name": tag, "cat": "layer_%u" % i, "ph": "X",
+                         "pid": i, "tid": core_index,
+                         "ts": float(t) * 1000.0, "dur": float(d) * 1000.0}
+                        for t, d in zip(entry_times, durations))
+                core_index += 1
+
+        logger.info("Writing %u trace events to %s", len(events), filename)
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _get_tick_times(self, profile, tag):
+        # Get entry times and durations of tag, treating missing tags
+        # (i.e. sections a core never entered) as taking no time
+        entry_times, durations = profile.get(tag, ([], []))
+
+        # Sum the duration of samples into the tick in which they were entered
+        ticks = np.floor_divide(np.asarray(entry_times, dtype=float),
+                                self.timestep_ms).astype(int)
+        valid = (ticks >= 0) & (ticks < self.num_ticks)
+        return np.bincount(ticks[valid],
+                           weights=np.asarray(durations, dtype=float)[valid],
+                           minlength=self.num_ticks)
+
+    def _get_core_name(self, vertex):
+        x, y = self.placements[vertex]
+        return "(%u, %u, %u)" % (x, y,
+                                 self.allocations[vertex][machine.Cores].start)
+
+    @staticmethod
+    def _get_vertex_name(vertex):
+        return "x:[%u, %u), y:[%u, %u), z:[%u, %u)" % (
+            vertex.x_slice.start, vertex.x_slice.stop,
+            vertex.y_slice.start, vertex.y_slice.stop,
+            vertex.z_slice.start, vertex.z_slice.stop)
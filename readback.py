@@ -0,0 +1,219 @@
+# Import modules
+import logging
+import os
+import threading
+
+# Import classes
+from collections import defaultdict
+from loader import ConnectionLocks
+from multiprocessing.pool import ThreadPool
+
+# Import functions
+from six import iteritems, itervalues
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# RegionBuffer
+# ----------------------------------------------------------------------------
+class RegionBuffer(object):
+    """Copy of the memory a region occupies on the machine, supporting the
+    subset of the :py:class:`~rig.machine_control.machine_controller.MemoryIO`
+    interface used to read back and decode regions"""
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, sl):
+        if isinstance(sl, slice) and (sl.step is None or sl.step == 1):
+            return RegionBuffer(self._data[sl])
+        else:
+            raise ValueError("Can only make contiguous slices of RegionBuffer")
+
+    def read(self, n_bytes=-1):
+        # Read up to n_bytes, truncating at the end of the region
+        if n_bytes < 0:
+            n_bytes = len(self._data) - self._offset
+
+        data = self._data[self._offset:self._offset + n_bytes]
+        self._offset += len(data)
+        return data
+
+    def tell(self):
+        return self._offset
+
+    def seek(self, n_bytes, from_what=os.SEEK_SET):
+        if from_what == os.SEEK_SET:
+            self._offset = n_bytes
+        elif from_what == os.SEEK_CUR:
+            self._offset += n_bytes
+        elif from_what == os.SEEK_END:
+            self._offset = len(self._data) + n_bytes
+        else:
+            raise ValueError(from_what)
+
+        # Clamp offset to region
+        self._offset = max(0, min(len(self._data), self._offset))
+
+# ----------------------------------------------------------------------------
+# Readback
+# ----------------------------------------------------------------------------
+class Readback(object):
+    """Reads back the regions of all vertices in a network after simulation.
+
+    All the reads required are collected up front and grouped by chip. Reads
+    of regions which are adjacent (or nearly adjacent) in SDRAM are coalesced
+    into a single larger read and chips are read concurrently on a bounded
+    pool of threads. As soon as all the regions belonging to a vertex have
+    arrived, they are decoded on a second pool of threads, while reads of
+    other regions continue."""
+    def __init__(self, machine_controller, placements, num_threads=8,
+                 max_gap_bytes=256):
+        """
+        Parameters
+        ----------
+        machine_controller : :py:class:`~rig.machine_control.MachineController`
+        placements : {vertex: (x, y), ...}
+        num_threads : int
+            number of threads used both to read chips and decode vertices. If
+            1, chips are read one after another and vertices decoded serially
+        max_gap_bytes : int
+            largest number of unneeded bytes between two regions which
+            will be read in order to read both regions at once
+        """
+        self.machine_controller = machine_controller
+        self.placements = placements
+        self.num_threads = num_threads
+        self.max_gap_bytes = max_gap_bytes
+
+        self._connection_locks = ConnectionLocks(machine_controller)
+
+        # Counts of reads made and bytes read, shared between threads
+        self._stats_lock = threading.Lock()
+        self.num_reads = 0
+        self.num_bytes = 0
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def read(self, vertex_region_memory, decode=None):
+        """Read the regions of a list of vertices.
+
+        Parameters
+        ----------
+        vertex_region_memory : [(vertex, {region: MemoryIO, ...}), ...]
+            memory occupied by the regions to read from each vertex
+        decode : callable or None
+            function called as ``decode(vertex, {region: RegionBuffer})``
+            on a worker thread once all of a vertex's regions are read
+
+        Returns
+        -------
+        {vertex: ({region: :py:class:`RegionBuffer`, ...}, decoded), ...}
+            copies of the regions read from each vertex alongside the result
+            of decoding them (or None if no decode function was specified)
+        """
+        # Group reads by chip
+        chip_reads = defaultdict(list)
+        for vertex, region_memory in vertex_region_memory:
+            chip_reads[self.placements[vertex]].extend(
+                (vertex, r, m) for r, m in iteritems(region_memory))
+
+        logger.debug("\tReading %u chips using %u threads",
+                     len(chip_reads), self.num_threads)
+
+        # If reading should be serial, read and decode each chip in turn
+        if self.num_threads <= 1:
+            results = {}
+
+            def on_vertex_read(vertex, buffers):
+                results[vertex] = (buffers, (None if decode is None
+                                             else decode(vertex, buffers)))
+
+            for chip in iteritems(chip_reads):
+                self._read_chip(chip, on_vertex_read)
+        # Otherwise, read chips on one pool of threads, decoding vertices
+        # on another pool as soon as all their regions have arrived
+        else:
+            read_pool = ThreadPool(self.num_threads)
+            decode_pool = ThreadPool(self.num_threads)
+            try:
+                # **NOTE** each vertex is only added once so it is safe to
+                # add them to this dictionary from multiple reading threads
+                pending = {}
+
+                def on_vertex_read(vertex, buffers):
+                    pending[vertex] = (
+                        buffers, (None if decode is None
+                                  else decode_pool.apply_async(
+                                      decode, (vertex, buffers))))
+
+                read_pool.map(lambda c: self._read_chip(c, on_vertex_read),
+                              list(iteritems(chip_reads)))
+
+                # Wait for decoding to complete
+                results = {v: (b, None if r is None else r.get())
+                           for v, (b, r) in iteritems(pending)}
+            finally:
+                read_pool.close()
+                decode_pool.close()
+                read_pool.join()
+                decode_pool.join()
+
+        logger.debug("\tRead %u regions from %u vertices using %u reads "
+                     "(%u bytes)", sum(len(r) for r in itervalues(chip_reads)),
+                     len(results), self.num_reads, self.num_bytes)
+        return results
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _read_chip(self, chip, on_vertex_read):
+        (x, y), reads = chip
+        connection_lock = self._connection_locks.get(x, y)
+
+        # Get the address range occupied by each region
+        # **NOTE** slicing a MemoryIO gives a view at offset zero
+        regions = sorted(((m[:].address, len(m), v, r)
+                          for v, r, m in reads), key=lambda i: i[0])
+
+        # Coalesce regions separated by small enough gaps into blocks
+        blocks = []
+        for region in regions:
+            start, length = region[:2]
+            if (len(blocks) > 0 and
+                    start <= blocks[-1][1] + self.max_gap_bytes):
+                blocks[-1][1] = max(blocks[-1][1], start + length)
+                blocks[-1][2].append(region)
+            else:
+                blocks.append([start, start + length, [region]])
+
+        # Count how many regions must be read from each vertex
+        remaining_regions = defaultdict(int)
+        for v, _, _ in reads:
+            remaining_regions[v] += 1
+
+        # Read blocks
+        vertex_buffers = defaultdict(dict)
+        for start, end, block_regions in blocks:
+            with connection_lock:
+                data = self.machine_controller.read(start, end - start, x, y)
+
+            with self._stats_lock:
+                self.num_reads += 1
+                self.num_bytes += end - start
+
+            # Split block into regions
+            for region_start, length, v, r in block_regions:
+                offset = region_start - start
+                vertex_buffers[v][r] = RegionBuffer(
+                    data[offset:offset + length])
+
+                # If all of vertex's regions have been read, hand them on
+                remaining_regions[v] -= 1
+                if remaining_regions[v] == 0:
+                    on_vertex_read(v, vertex_buffers.pop(v))
+
@@ -0,0 +1,94 @@
+# Import modules
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+
+# Import classes
+from loader import SerialisedRegion
+
+# Import functions
+from hashing import hash_value
+
+# ----------------------------------------------------------------------------
+# RegionCache
+# ----------------------------------------------------------------------------
+class RegionCache(object):
+    """On-disk cache of serialised regions. Each region is addressed by a hash
+    of its type, its state and the arguments it is written with so, for
+    example, if only the input images change between runs, the kernel,
+    neuron and system regions of every vertex will be read from the cache."""
+    # Version of cache; increment whenever the format of any region changes
+    Version = 2
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        # Create cache directory if required
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def get(self, region, region_arguments):
+        """Get serialised region, either from the cache or,
+        if it isn't present, serialising it and adding it"""
+        filename = os.path.join(self.directory,
+                                self.get_key(region, region_arguments))
+
+        # If region is cached, read it
+        serialised_region = self._read(filename)
+        hit = serialised_region is not None
+
+        # Otherwise, serialise region and write to a temporary file
+        # before moving it into place so partial files are never seen
+        if not hit:
+            serialised_region = SerialisedRegion.from_region(region,
+                                                             region_arguments)
+            with tempfile.NamedTemporaryFile(dir=self.directory,
+                                             delete=False) as f:
+                f.write(struct.pack("2Q", serialised_region.size,
+                                    len(serialised_region.data)))
+                f.write(serialised_region.data)
+            os.rename(f.name, filename)
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return serialised_region
+
+    def get_key(self, region, region_arguments):
+        args, kwargs = region_arguments
+
+        h = hashlib.sha1()
+        hash_value(h, [self.Version, type(region).__module__,
+                       type(region).__name__, vars(region),
+                       list(args), kwargs])
+        return h.hexdigest()
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _read(self, filename):
+        # Read header containing region size and length of data, treating
+        # missing, truncated or otherwise corrupt files as cache misses
+        try:
+            with open(filename, "rb") as f:
+                size, data_bytes = struct.unpack("2Q", f.read(16))
+                data = f.read()
+        except (IOError, OSError, struct.error):
+            return None
+
+        if len(data) != data_bytes:
+            return None
+        else:
+            return SerialisedRegion(size, data)
@@ -1,3 +1,5 @@
-from conv_kernel import ConvKernel
+from conv_kernel import ConvKernel, get_fixed_point_pos, quantise_weights
 from input import Input
-from neurons import Neurons
\ No newline at end of file
+from neurons import Neurons
+from pooling import Pooling
+from tick_statistics import TickStatistics
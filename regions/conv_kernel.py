@@ -1,21 +1,60 @@
 # Import modules
 import logging
+import numpy as np
 import struct
 
 # Import classes
-from rig.type_casts import NumpyFloatToFixConverter
+from io import BytesIO
 from rig_cpp_common.regions import Region
 
 logger = logging.getLogger("pynn_spinnaker")
 
+# ------------------------------------------------------------------------------
+# Functions
+# ------------------------------------------------------------------------------
+def get_fixed_point_pos(weights, weight_bits):
+    """Get the position of the fixed point which allows the largest
+    absolute weight to be represented in a signed weight_bits integer"""
+    # Get MSB for maximum weight
+    max_weight = np.amax(np.fabs(weights))
+    max_msb = np.floor(np.log2(max_weight)) + 1
+
+    # Calculate where the weight format fixed-point lies
+    return (weight_bits - 1) - int(max_msb)
+
+def quantise_weights(weights, fixed_point_pos, weight_bits):
+    """Convert weights to signed fixed-point integers of weight_bits bits,
+    saturating and truncating in the same manner as
+    :py:class:`~rig.type_casts.NumpyFloatToFixConverter`"""
+    max_value = (2 ** (weight_bits - 1)) - 1
+    values = np.clip(weights * (2.0 ** fixed_point_pos),
+                     -max_value - 1, max_value)
+    return np.array(values, copy=True, dtype=np.int8)
+
+def _round_up_to_words(num_bytes):
+    return ((num_bytes + 3) // 4) * 4
+
+def _pad_to_words(data):
+    return data + (b"\0" * (_round_up_to_words(len(data)) - len(data)))
+
+
 # ------------------------------------------------------------------------------
 # ConvKernel
 # ------------------------------------------------------------------------------
 class ConvKernel(Region):
-    #  Size of a single weight
-    WeightBytes = 1
+    # Supported numbers of bits used to represent each weight
+    # **NOTE** 4-bit weights are packed two to a byte
+    WeightBits = (4, 8)
+
+    # Size of each row offset and (kernel index, weight) entry of sparse kernels
+    SparseRowOffsetBytes = 2
+    SparseEntryBytes = 2
 
-    def __init__(self, kernel_width, kernel_height, kernel_depth):
+    # Sparse kernel entries store kernel index in 8 bits
+    MaxSparseKernels = 256
+
+    def __init__(self, kernel_width, kernel_height, kernel_depth,
+                 weight_bits=8, prune_threshold=None):
         """Create a new convolution kernel region.
 
         Parameters
@@ -26,15 +65,28 @@ class ConvKernel(Region):
             height of convolution kernel
         kernel_depth : int
             depth of convolution kernel
-        stride : int
-            stride of convolution process
+        weight_bits : int
+            number of bits used to represent each weight (4 or 8)
+        prune_threshold : float or None
+            if not None, weights with smaller magnitudes are pruned and the
+            remainder stored in a sparse format rather than as dense kernels
         """
+        if weight_bits not in self.WeightBits:
+            raise ValueError("weight_bits: %u: must be one of %s" %
+                             (weight_bits, self.WeightBits))
+        if prune_threshold is not None and weight_bits != 8:
+            raise ValueError("Sparse kernels only support 8-bit weights")
+
         self.kernel_width = kernel_width
         self.kernel_height = kernel_height
         self.kernel_depth = kernel_depth
+        self.weight_bits = weight_bits
+        self.prune_threshold = prune_threshold
 
-        logger.debug("\t\tKernel width:%u, kernel height:%u, kernel depth:%u",
-                     self.kernel_width, self.kernel_height, self.kernel_depth)
+        logger.debug("\t\tKernel width:%u, kernel height:%u, kernel depth:%u, "
+                     "weight bits:%u, sparse:%s", self.kernel_width,
+                     self.kernel_height, self.kernel_depth, self.weight_bits,
+                     self.sparse)
 
     # --------------------------------------------------------------------------
     # Region methods
@@ -54,8 +106,14 @@ class ConvKernel(Region):
             The number of bytes required to store the data in the given slice
             of the region.
         """
-        #
-        return 8 + (weights.shape[3] * self.kernel_dtcm_bytes)
+        # If kernels are sparse, calculate size of row offsets and entries
+        # **NOTE** each array is padded to a whole number of words
+        if self.sparse:
+            _, entries = self._get_sparse_kernels(weights, fixed_point_pos)
+            return (8 + _round_up_to_words(self.sparse_row_offsets_bytes) +
+                    _round_up_to_words(len(entries) * self.SparseEntryBytes))
+        else:
+            return 8 + (weights.shape[3] * self.kernel_dtcm_bytes)
 
     def write_subregion_to_file(self, fp, weights, fixed_point_pos):
         """Write a portion of the region to a file applying the formatter.
@@ -73,15 +131,186 @@ class ConvKernel(Region):
         # and the depth of each one (width and height are compile-time)
         fp.write(struct.pack("2I", weights.shape[3], weights.shape[2]))
 
-         # Write kernel data
-        convert = NumpyFloatToFixConverter(signed=True, n_bits=8,
-                                           n_frac=fixed_point_pos)
-        fp.write(convert(weights).tostring())
+        # If kernels are sparse, write row offsets followed by entries
+        if self.sparse:
+            row_offsets, entries = self._get_sparse_kernels(weights,
+                                                            fixed_point_pos)
+            fp.write(_pad_to_words(row_offsets.tostring()))
+            fp.write(_pad_to_words(entries.tostring()))
+            return
+
+        # Convert weights to fixed point
+        kernels = quantise_weights(weights, fixed_point_pos, self.weight_bits)
+
+        # If weights are 4-bit, pack pairs into bytes
+        # **NOTE** ConvKernelBase treats the weight data as consecutive
+        # kernels so each one is padded to a whole number of bytes
+        if self.weight_bits == 4:
+            kernels = kernels.reshape((weights.shape[3], -1))
+            if (kernels.shape[1] % 2) != 0:
+                kernels = np.pad(kernels, ((0, 0), (0, 1)), "constant")
+
+            # Pack even weights into low nibbles and odd into high
+            nibbles = kernels.astype(np.uint8) & 0xF
+            kernels = nibbles[:, 0::2] | (nibbles[:, 1::2] << 4)
+
+        # Write kernel data
+        fp.write(kernels.tostring())
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+    def unpack_kernels(self, data, num_kernels):
+        """Unpack serialised kernel weights into one row of
+        signed fixed-point weights for each kernel
+
+        Parameters
+        ----------
+        data : bytes
+            kernel data following the region's header
+        num_kernels : int
+            number of kernels in data
+
+        Returns
+        -------
+        ndarray
+            int8 array of shape (num_kernels, width * height * depth)
+        """
+        num_weights = self.kernel_width * self.kernel_height * self.kernel_depth
+        if self.sparse:
+            # Read row offsets and then entries from following word
+            row_offsets = np.frombuffer(data, dtype=np.uint16,
+                                        count=num_weights + 1)
+            entries = np.frombuffer(
+                data, dtype=np.uint16, count=row_offsets[-1],
+                offset=_round_up_to_words(self.sparse_row_offsets_bytes))
+
+            # Scatter entries into dense kernels
+            kernels = np.zeros((num_kernels, num_weights), dtype=np.int8)
+            index = np.repeat(np.arange(num_weights), np.diff(row_offsets))
+            kernels[entries >> 8, index] =\
+                (entries & 0xFF).astype(np.uint8).view(np.int8)
+            return kernels
+        elif self.weight_bits == 8:
+            return np.frombuffer(data, dtype=np.int8,
+                                 count=num_kernels * num_weights).reshape(
+                                     (num_kernels, num_weights))
+        else:
+            packed = np.frombuffer(data, dtype=np.uint8,
+                                   count=num_kernels * self.kernel_bytes)
+            packed = packed.reshape((num_kernels, self.kernel_bytes))
+
+            # Split bytes into nibbles and sign extend
+            nibbles = np.empty((num_kernels, self.kernel_bytes * 2),
+                               dtype=np.uint8)
+            nibbles[:, 0::2] = packed & 0xF
+            nibbles[:, 1::2] = packed >> 4
+            kernels = (nibbles << 4).view(np.int8) >> 4
+            return kernels[:, :num_weights]
+
+    def get_runtime_kernels(self, weights, fixed_point_pos):
+        """Get the signed fixed-point kernels a core will use, indexed as
+        ConvKernelBase does, by serialising and unpacking its weights
+
+        Returns
+        -------
+        ndarray
+            int8 array of shape (num_kernels, depth, height, width)
+        """
+        fp = BytesIO()
+        self.write_subregion_to_file(fp, weights, fixed_point_pos)
+        data = fp.getvalue()
+
+        # Re-interpret kernel data as ConvKernelBase indexes
+        # it i.e. kernel[x + (KernelSize * (y + (KernelSize * z)))]
+        num_kernels, kernel_depth = struct.unpack_from("2I", data)
+        return self.unpack_kernels(data[8:], num_kernels).reshape(
+            (num_kernels, kernel_depth, self.kernel_height, self.kernel_width))
+
+    def prune(self, weights):
+        """Zero any weights with magnitudes below the pruning threshold"""
+        if self.sparse:
+            return np.where(np.fabs(weights) < self.prune_threshold,
+                            0.0, weights)
+        else:
+            return weights
+
+    def get_density(self, weights):
+        """Get the fraction of weights which remain after pruning"""
+        return float(np.count_nonzero(self.prune(weights))) / weights.size
+
+    def get_dtcm_bytes(self, weights):
+        """Get the DTCM required by a core's copy of the kernels, both
+        independently of how many kernels it holds and for each kernel
+
+        Returns
+        -------
+        core_bytes : int
+        kernel_bytes : int
+        """
+        if self.sparse:
+            # **NOTE** size each kernel by the densest so this is an upper
+            # bound however kernels are partitioned between cores. Each
+            # kernel also requires an accumulator when convolving images
+            pruned = self.prune(weights).reshape((weights.shape[3], -1))
+            num_kernel_weights = np.sum(pruned != 0.0, axis=1)
+            return (self.sparse_row_offsets_bytes,
+                    (int(np.amax(num_kernel_weights)) *
+                     self.SparseEntryBytes) + 4)
+        else:
+            return 0, self.kernel_dtcm_bytes
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+    def _get_sparse_kernels(self, weights, fixed_point_pos):
+        if weights.shape[3] > self.MaxSparseKernels:
+            raise ValueError("Sparse kernels only support %u kernels per core" %
+                             self.MaxSparseKernels)
+
+        # Prune and convert weights to fixed point, reinterpreting
+        # them as consecutive kernels, as ConvKernelBase does
+        kernels = quantise_weights(self.prune(weights), fixed_point_pos, 8)
+        kernels = kernels.reshape((weights.shape[3], -1))
+
+        # Find non-zero weights, sorted by their index within each kernel
+        index, kernel = np.nonzero(kernels.T)
+
+        # Build offsets to the entries of each row, checking
+        # the last (the total number of entries) fits in 16 bits
+        offsets = np.cumsum(np.bincount(index, minlength=kernels.shape[1]),
+                            dtype=np.int64)
+        if offsets[-1] > np.iinfo(np.uint16).max:
+            raise ValueError("Too many non-zero weights for sparse kernels")
+
+        row_offsets = np.zeros(kernels.shape[1] + 1, dtype=np.uint16)
+        row_offsets[1:] = offsets.astype(np.uint16)
+
+        # Pack kernel indices and weights into entries
+        entries = ((kernel.astype(np.uint16) << 8) |
+                   kernels[kernel, index].view(np.uint8))
+        return row_offsets, entries.astype(np.uint16)
 
     # --------------------------------------------------------------------------
     # Properties
     # --------------------------------------------------------------------------
+    @property
+    def sparse(self):
+        return self.prune_threshold is not None
+
+    @property
+    def sparse_row_offsets_bytes(self):
+        # There is a row for each weight index within a
+        # kernel, followed by the total number of entries
+        num_weights = self.kernel_width * self.kernel_height * self.kernel_depth
+        return (num_weights + 1) * self.SparseRowOffsetBytes
+
+    @property
+    def kernel_bytes(self):
+        # **NOTE** round up to a whole number of bytes
+        num_weights = self.kernel_width * self.kernel_height * self.kernel_depth
+        return ((num_weights * self.weight_bits) + 7) // 8
+
     @property
     def kernel_dtcm_bytes(self):
-        return (self.WeightBytes * self.kernel_width * self.kernel_height *
-                self.kernel_depth) + self.WeightBytes
+        return self.kernel_bytes + 1
@@ -10,6 +10,66 @@ from rig_cpp_common.regions import Region
 
 logger = logging.getLogger("convolver")
 
+# ------------------------------------------------------------------------------
+# Functions
+# ------------------------------------------------------------------------------
+def convolve_image(image, kernels, stride, image_fixed_point, output_width,
+                   output_height):
+    """Convolve a padded fixed-point image with a core's kernels using the
+    same fixed-point arithmetic as ConvKernelBase::ConvolveImage.
+
+    Parameters
+    ----------
+    image : ndarray
+        int8 image with axes indexed as InputBase::GetPixel does i.e.
+        (image height, image width, depth)
+    kernels : ndarray
+        int8 kernels with axes indexed as ConvKernelBase does i.e.
+        (num kernels, kernel depth, kernel height, kernel width)
+    stride : int
+    image_fixed_point : int
+        position of fixed point in image pixels
+    output_width : int
+        width of the core's tile of neurons
+    output_height : int
+        height of the core's tile of neurons
+
+    Returns
+    -------
+    ndarray
+        int64 input current applied to each of the core's neurons
+        with shape (output_width, output_height, num kernels)
+    """
+    image_height, image_width, image_depth = image.shape
+    kernel_size = kernels.shape[3]
+    num_kernels = kernels.shape[0]
+
+    # Image pixels which are visited by ConvKernelBase::ConvolveImage
+    # **NOTE** this mirrors the exclusive upper bound used on the core
+    image_x = np.arange(0, image_width - kernel_size, stride)
+    image_y = np.arange(0, image_height - kernel_size, stride)
+
+    # Loop through kernel pixels and accumulate
+    value = np.zeros((len(image_x), len(image_y), num_kernels), dtype=np.int64)
+    for kernel_x in range(kernel_size):
+        for kernel_y in range(kernel_size):
+            pixels = image[np.ix_(image_y + kernel_y, image_x + kernel_x)]
+            pixels = np.swapaxes(pixels, 0, 1).astype(np.int64)
+
+            kernel = kernels[:, :image_depth, kernel_y, kernel_x]
+            value += np.dot(pixels, kernel.T.astype(np.int64))
+
+    # Shift down to complete fixed point multiply-accumulate
+    value = np.right_shift(value.astype(np.int32), image_fixed_point)
+
+    # Discard values that fall outside neuron volume
+    input_current = np.zeros((output_width, output_height, num_kernels),
+                             dtype=np.int64)
+    width = min(len(image_x), output_width)
+    height = min(len(image_y), output_height)
+    input_current[:width, :height, :] = value[:width, :height, :]
+    return input_current
+
 # ------------------------------------------------------------------------------
 # Input
 # ------------------------------------------------------------------------------
@@ -17,16 +77,34 @@ class Input(Region):
     # How many bytes are used to represent each input component
     InputBytes = 1
 
-    def __init__(self, input_data, pad):
+    # How many bytes are used to represent each precomputed input current
+    InputCurrentBytes = 2
+
+    def __init__(self, input_data, pad, kernel_size, stride,
+                 precompute=False):
         """Create a new input region.
 
         Parameters
         ----------
         input_data : ndarray
-            array of input data
+            array of input images with axes image, channel, x and y
+        pad : int
+            number of zero pixels to pad each edge of the images with
+        kernel_size : int
+            width and height of the kernel the images are convolved with
+        stride : int
+            stride of convolution process
+        precompute : bool
+            if True, rather than the images themselves, the input current
+            each image applies to each neuron is calculated on the host
         """
+        self.kernel_size = kernel_size
+        self.stride = stride
+        self.precompute = precompute
+
         if input_data is not None:
             # Calculate maximum absolute weight
+            # **NOTE** all images share a single fixed-point format
             max_input = np.amax(np.fabs(input_data))
 
             # Get MSB for maximum weight
@@ -35,28 +113,44 @@ class Input(Region):
             # Calculate where the weight format fixed-point lies
             self.fixed_point_pos = (7 - int(max_msb))
 
-            # Re-order the input data so it's axis are x, y, z
-            input_data = np.rollaxis(input_data, 0, 3)
+            # Re-order the input data so it's axis are image, x, y, z
+            input_data = np.rollaxis(input_data, 1, 4)
 
             # Pad input data
             two_pad = 2 * pad
-            self.input_data = np.zeros((input_data.shape[0] + two_pad,
+            self.input_data = np.zeros((input_data.shape[0],
                                         input_data.shape[1] + two_pad,
-                                        input_data.shape[2]),
+                                        input_data.shape[2] + two_pad,
+                                        input_data.shape[3]),
                                        dtype=input_data.dtype)
-            self.input_data[pad:-pad,pad:-pad,:] = input_data
+            self.input_data[:, pad:pad + input_data.shape[1],
+                            pad:pad + input_data.shape[2], :] = input_data
 
-            logger.debug("\t\tInput fixed-point position:%d, width:%u, height:%u, depth:%u",
-                        self.fixed_point_pos, *self.input_data.shape)
+            logger.debug("\t\tInput images:%u, fixed-point position:%d, width:%u, height:%u, depth:%u",
+                        self.input_data.shape[0], self.fixed_point_pos,
+                        *self.input_data.shape[1:])
         else:
             self.input_data = None
 
     # --------------------------------------------------------------------------
     # Region methods
     # --------------------------------------------------------------------------
-    def sizeof(self):
+    def sizeof(self, x_slice, y_slice, kernels=None, input_shift=0):
         """Get the size requirements of the region in bytes.
 
+        Parameters
+        ----------
+        x_slice : slice
+            slice of output volume's width simulated by vertex
+        y_slice : slice
+            slice of output volume's height simulated by vertex
+        kernels : ndarray or None
+            if input is precomputed, the vertex's kernels as returned by
+            :py:meth:`~regions.ConvKernel.get_runtime_kernels`
+        input_shift : int
+            if input is precomputed, how far input currents are shifted
+            left to convert them from the weight to the neuron format
+
         Returns
         -------
         int
@@ -66,12 +160,21 @@ class Input(Region):
         # If there's no input data, region will just contain a zero
         if self.input_data is None:
             return 4
-        # Otherwise, count, num channels, width, height and image data
+        # Otherwise, if input is precomputed, count, precomputed flag,
+        # number of neurons and the (word-aligned) currents for each image
+        elif self.precompute:
+            num_neurons = ((x_slice.stop - x_slice.start) *
+                           (y_slice.stop - y_slice.start) * kernels.shape[0])
+            return 12 + (self._get_input_current_words(num_neurons) * 4 *
+                         self.input_data.shape[0])
+        # Otherwise, count, precomputed flag, fixed
+        # point, width, height, depth and image data
         else:
-            return 20 + self.dtcm_bytes
-
+            return 24 + (self.get_image_bytes(x_slice, y_slice) *
+                         self.input_data.shape[0])
 
-    def write_subregion_to_file(self, fp):
+    def write_subregion_to_file(self, fp, x_slice, y_slice, kernels=None,
+                                input_shift=0):
         """Write a portion of the region to a file applying the formatter.
 
         Parameters
@@ -79,27 +182,116 @@ class Input(Region):
         fp : file-like object
             The file-like object to which data from the region will be written.
             This must support a `write` method.
+        x_slice : slice
+            slice of output volume's width simulated by vertex
+        y_slice : slice
+            slice of output volume's height simulated by vertex
+        kernels : ndarray or None
+            if input is precomputed, the vertex's kernels as returned by
+            :py:meth:`~regions.ConvKernel.get_runtime_kernels`
+        input_shift : int
+            if input is precomputed, how far input currents are shifted
+            left to convert them from the weight to the neuron format
         """
         # If there is no input data, write a zero
         if self.input_data is None:
             fp.write(struct.pack("I", 0))
+        # Otherwise, if input is precomputed
+        elif self.precompute:
+            # Convolve each image with kernels
+            width = x_slice.stop - x_slice.start
+            height = y_slice.stop - y_slice.start
+            input_currents = [
+                convolve_image(i, kernels, self.stride, self.fixed_point_pos,
+                               width, height)
+                for i in self.get_images(x_slice, y_slice)]
+
+            # Write header
+            num_neurons = width * height * kernels.shape[0]
+            fp.write(struct.pack("3I", len(input_currents), 1, num_neurons))
+
+            # Write input currents in the order of NeuronsBase's membrane
+            # voltages, converted to the neuron format and padding each
+            # image's currents to a whole word
+            # **NOTE** membrane voltages are 16-bit so truncating
+            # currents to 16-bit gives the same result when added
+            padding = ((self._get_input_current_words(num_neurons) * 2) -
+                       num_neurons)
+            for c in input_currents:
+                c = np.left_shift(c, input_shift).astype(np.int16).ravel()
+                fp.write(np.pad(c, (0, padding), "constant").tostring())
         # Otherwise
         else:
+            # Extract the pixels of each image the tile's neurons require
+            input_data = self.get_images(x_slice, y_slice)
+
             # Write header
-            fp.write(struct.pack("5I", 1, self.fixed_point_pos, *self.input_data.shape))
+            fp.write(struct.pack("6I", input_data.shape[0], 0,
+                                 self.fixed_point_pos, input_data.shape[2],
+                                 input_data.shape[1], input_data.shape[3]))
 
             # Write input data
-            convert = NumpyFloatToFixConverter(signed=True, n_bits=8,
-                                               n_frac=self.fixed_point_pos)
-            fp.write(convert(self.input_data).tostring())
+            fp.write(input_data.tostring())
 
     # --------------------------------------------------------------------------
-    # Properties
+    # Public methods
     # --------------------------------------------------------------------------
-    @property
-    def dtcm_bytes(self):
+    def get_dtcm_bytes(self, x_slice, y_slice):
+        # **NOTE** only the current image is held in DTCM and
+        # precomputed input currents are read directly from SDRAM
+        if self.input_data is None or self.precompute:
+            return 0
+        else:
+            return self.get_image_bytes(x_slice, y_slice)
+
+    def get_image_bytes(self, x_slice, y_slice):
+        """Get the size of the slice of each (padded) image
+        required to drive a tile of the output volume"""
         if self.input_data is None:
             return 0
         else:
-            return (self.InputBytes * self.input_data.shape[0] *
-                    self.input_data.shape[1] * self.input_data.shape[2])
+            image_x_slice, image_y_slice = self.get_image_slices(x_slice,
+                                                                 y_slice)
+            return (self.InputBytes *
+                    (image_x_slice.stop - image_x_slice.start) *
+                    (image_y_slice.stop - image_y_slice.start) *
+                    self.input_data.shape[3])
+
+    def get_images(self, x_slice, y_slice):
+        """Get the fixed-point pixels of each image a tile's neurons require
+        as an int8 array with axes image, image height, image width, depth"""
+        # **NOTE** InputBase::GetPixel indexes pixels as
+        # (y * width) + x so the first spatial axis is y
+        image_x_slice, image_y_slice = self.get_image_slices(x_slice, y_slice)
+        input_data = self.input_data[:, image_y_slice, image_x_slice, :]
+
+        convert = NumpyFloatToFixConverter(signed=True, n_bits=8,
+                                           n_frac=self.fixed_point_pos)
+        return convert(input_data)
+
+    def get_image_slices(self, x_slice, y_slice):
+        """Get the slices of the (padded) images required
+        to drive a tile of the output volume"""
+        return (self._get_image_slice(x_slice, self.input_data.shape[2]),
+                self._get_image_slice(y_slice, self.input_data.shape[1]))
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+    def _get_input_current_words(self, num_neurons):
+        return ((num_neurons * self.InputCurrentBytes) + 3) // 4
+
+    def _get_image_slice(self, neuron_slice, image_size):
+        # The first neuron is centred on the
+        # first pixel of kernel's footprint
+        start = neuron_slice.start * self.stride
+
+        # ConvKernelBase::ConvolveImage visits pixels strictly less than
+        # the image size minus the kernel size so include one extra pixel
+        # beyond the footprint of the last neuron's kernel
+        # **NOTE** clamping to the image size reproduces which
+        # neurons receive input when the layer isn't tiled
+        num_neurons = neuron_slice.stop - neuron_slice.start
+        stop = min(image_size, start + ((num_neurons - 1) * self.stride) +
+                   self.kernel_size + 1)
+        return slice(start, stop)
@@ -15,6 +15,154 @@ logger = logging.getLogger("convolver")
 def calc_bitfield_words(bits):
     return int(math.ceil(float(bits) / 32.0))
 
+def _get_num_neurons(x_slice, y_slice, z_slice):
+    return ((x_slice.stop - x_slice.start) * (y_slice.stop - y_slice.start) *
+            (z_slice.stop - z_slice.start))
+
+# Lookup table mapping each byte value to its bits, least significant first
+_byte_bits = ((np.arange(256, dtype=np.uint8)[:, np.newaxis] >>
+               np.arange(8, dtype=np.uint8)) & 1).astype(np.uint8)
+
+# Lookup table mapping each byte value to the same byte with its bits reversed
+_reversed_bytes = np.packbits(_byte_bits, axis=1).ravel()
+
+def _unpack_bits_little(data):
+    # Unpack 2D array of bytes into bits, least significant bit first
+    try:
+        return np.unpackbits(data, axis=1, bitorder="little")
+    # **NOTE** older versions of numpy don't support bitorder so reverse
+    # the bits in each byte before unpacking them most significant bit first
+    except TypeError:
+        return np.unpackbits(_reversed_bytes[data], axis=1)
+
+def decode_bitfield_dense(words, num_bits):
+    """Expand bitfield words into one byte per bit.
+
+    Parameters
+    ----------
+    words : ndarray
+        2D array of uint32 words with one row per sample
+    num_bits : int
+        number of valid bits in each sample
+
+    Returns
+    -------
+    ndarray
+        uint8 array of shape (num_samples, num_bits)
+    """
+    # **NOTE** bits are stored in little-endian words, least significant
+    # bit first, so the bits of each byte are in order in memory
+    data = np.ascontiguousarray(words, dtype="<u4").view(np.uint8)
+    return _unpack_bits_little(data)[:, :num_bits]
+
+def decode_bitfield_indices(words, num_bits):
+    """Find the indices of set bits in each sample of a bitfield.
+
+    Parameters
+    ----------
+    words : ndarray
+        2D array of uint32 words with one row per sample
+    num_bits : int
+        number of valid bits in each sample
+
+    Returns
+    -------
+    list
+        sorted array of set bit indices for each sample
+    """
+    if words.shape[0] == 0:
+        return []
+
+    # Find non-zero bytes and only expand these into bits
+    data = np.ascontiguousarray(words, dtype="<u4").view(np.uint8).ravel()
+    non_zero_bytes = np.flatnonzero(data)
+    byte_index, bit = np.nonzero(_byte_bits[data[non_zero_bytes]])
+
+    # Convert to sample and bit indices, discarding any padding
+    sample_bits = words.shape[1] * 32
+    sample, index = np.divmod((non_zero_bytes[byte_index] * 8) + bit,
+                              sample_bits)
+    valid = (index < num_bits)
+    sample = sample[valid]
+    index = index[valid]
+
+    # Split indices by sample
+    # **NOTE** np.nonzero returns indices in row-major
+    # order so these are already sorted by sample
+    splits = np.searchsorted(sample, np.arange(1, words.shape[0]))
+    return np.split(index, splits)
+
+def read_spike_recording(x_slice, y_slice, z_slice, sim_ticks, header_bytes,
+                         region_memory, tick_slice=None, indices=False):
+    """Read and decode the spike bitfields recorded each tick following a
+    header of header_bytes (see :py:meth:`Neurons.read_recorded_spikes`)"""
+    # Calculate size of bitfield required to
+    # represent one time step of spiking output
+    num_neurons = _get_num_neurons(x_slice, y_slice, z_slice)
+    sample_words = calc_bitfield_words(num_neurons)
+
+    # Determine which ticks to read
+    start_tick, stop_tick, _ = (slice(None) if tick_slice is None
+                                else tick_slice).indices(sim_ticks)
+    num_ticks = max(0, stop_tick - start_tick)
+
+    # Seek to first tick's recording and read data from memory
+    region_memory.seek(header_bytes + (start_tick * sample_words * 4))
+    data = region_memory.read(num_ticks * sample_words * 4)
+
+    # Load into numpy as little-endian words, one row per tick
+    words = np.frombuffer(data, dtype="<u4").reshape((num_ticks,
+                                                      sample_words))
+
+    if indices:
+        return decode_bitfield_indices(words, num_neurons)
+    else:
+        # Reshape into 4D
+        return decode_bitfield_dense(words, num_neurons).reshape(
+            (num_ticks, x_slice.stop - x_slice.start,
+             y_slice.stop - y_slice.start, z_slice.stop - z_slice.start))
+
+def decode_spike_indices(data, num_ticks):
+    """Decode spikes recorded as the indices of the neurons which spiked.
+
+    Each tick is recorded as a word containing the number of spikes, with
+    the most significant bit set if some could not be recorded, followed
+    by a 16-bit index for each spike, padded to a whole number of words.
+
+    Parameters
+    ----------
+    data : bytes
+        recording data
+    num_ticks : int
+        number of ticks to decode from the start of data
+
+    Returns
+    -------
+    indices : list
+        array of the indices of neurons which spiked in each tick
+    overflow_ticks : int
+        number of ticks in which some spikes were not recorded
+    """
+    # View data as little-endian words and half-words
+    words = np.frombuffer(data, dtype="<u4")
+    half_words = np.frombuffer(data, dtype="<u2")
+
+    indices = []
+    overflow_ticks = 0
+    offset = 0
+    for _ in range(num_ticks):
+        # Read tick header and extract spike count and overflow flag
+        header = int(words[offset])
+        count = header & 0x7FFFFFFF
+        overflow_ticks += (header >> 31)
+
+        # Copy out spike indices and advance past padded tick
+        start = (offset + 1) * 2
+        indices.append(half_words[start:start + count].astype(np.intp))
+        offset += 1 + ((count + 1) // 2)
+
+    return indices, overflow_ticks
+
 # ------------------------------------------------------------------------------
 # Neurons
 # ------------------------------------------------------------------------------
@@ -22,8 +170,17 @@ class Neurons(Region):
     # How many bytes does the state of each neuron require
     StateBytes = 2
 
+    # How many bytes does the header preceding the recording require
+    HeaderBytes = 7 * 4
+
+    # Recording modes
+    # **NOTE** these should match the RecordingMode enumeration in neurons.h
+    RecordingNone = 0
+    RecordingBitField = 1
+    RecordingIndices = 2
+
     def __init__(self, output_width, output_height, decay, threshold,
-                 record_spikes, sim_ticks):
+                 record_spikes, sim_ticks, record_spike_rate=None):
         """Create a new neurons region.
 
         Parameters
@@ -32,6 +189,12 @@ class Neurons(Region):
             width of 3D output volume of neurons
         output_height : int
             height of 3D output volume of neurons
+        record_spike_rate : float or None
+            if None, spikes are recorded as a bitfield of every neuron each
+            tick. Otherwise only the indices of the neurons which spike are
+            recorded with enough memory reserved for each neuron to spike
+            at this rate (spikes per tick) on average - any spikes beyond
+            this are dropped from the recording but still emitted.
         """
         self.output_width = output_width
         self.output_height = output_height
@@ -39,21 +202,38 @@ class Neurons(Region):
         self.threshold = threshold
         self.record_spikes = record_spikes
         self.sim_ticks = sim_ticks
+        self.record_spike_rate = record_spike_rate
 
         logger.debug("\t\tOutput width:%u, output height:%u, neuron decay:%f, neuron threshold:%f",
                      self.output_width, self.output_height,
                      self.decay, self.threshold)
 
+    # --------------------------------------------------------------------------
+    # Properties
+    # --------------------------------------------------------------------------
+    @property
+    def recording_mode(self):
+        if not self.record_spikes:
+            return self.RecordingNone
+        elif self.record_spike_rate is None:
+            return self.RecordingBitField
+        else:
+            return self.RecordingIndices
+
     # --------------------------------------------------------------------------
     # Region methods
     # --------------------------------------------------------------------------
-    def sizeof(self, output_depth, fixed_point_pos):
+    def sizeof(self, x_slice, y_slice, z_slice, fixed_point_pos):
         """Get the size requirements of the region in bytes.
 
         Parameters
         ----------
-        output_depth : int
-            depth of 3D output volume of neurons
+        x_slice : slice
+            slice of output volume's width simulated by vertex
+        y_slice : slice
+            slice of output volume's height simulated by vertex
+        z_slice : slice
+            slice of output volume's depth simulated by vertex
 
         Returns
         -------
@@ -61,86 +241,171 @@ class Neurons(Region):
             The number of bytes required to store the data in the given slice
             of the region.
         """
-        # If we're recording
-        if self.record_spikes:
+        # If we're recording indices, reserve a header for each
+        # tick followed by space for the expected number of spikes
+        if self.recording_mode == self.RecordingIndices:
+            recording_bytes = (
+                (self.sim_ticks * 4) +
+                (self._get_index_capacity_words(x_slice, y_slice, z_slice) * 4))
+        # Otherwise, if we're recording a bitfield
+        elif self.recording_mode == self.RecordingBitField:
             # Calculate size of bitfield required to
             # represent one time step of spiking output
-            num_neurons = self.output_width * self.output_height * output_depth
+            num_neurons = _get_num_neurons(x_slice, y_slice, z_slice)
             recording_words = calc_bitfield_words(num_neurons)
 
             recording_bytes = (recording_words * 4 * self.sim_ticks)
         else:
             recording_bytes = 0
 
-        return (6 * 4) + recording_bytes
+        return self.HeaderBytes + recording_bytes
 
-    def write_subregion_to_file(self, fp, output_depth, fixed_point_pos):
+    def write_subregion_to_file(self, fp, x_slice, y_slice, z_slice,
+                                fixed_point_pos):
         """Write a portion of the region to a file applying the formatter.
 
         Parameters
         ----------
-        output_depth : int
-            depth of 3D output volume of neurons
         fp : file-like object
             The file-like object to which data from the region will be written.
             This must support a `write` method.
+        x_slice : slice
+            slice of output volume's width simulated by vertex
+        y_slice : slice
+            slice of output volume's height simulated by vertex
+        z_slice : slice
+            slice of output volume's depth simulated by vertex
         """
         # Create converter to correct fixed point format
         convert = float_to_fp(signed=True, n_bits=32, n_frac=fixed_point_pos)
 
-        # Write structure
-        fp.write(struct.pack("4I2i",
-                             self.output_width, self.output_height,
-                             output_depth, 1 if self.record_spikes else 0,
-                             convert(self.threshold), convert(self.decay)))
-
-    def read_recorded_spikes(self, z_slice, region_memory):
-        assert self.record_spikes
+        # Calculate how many words of spike indices can be recorded
+        if self.recording_mode == self.RecordingIndices:
+            index_capacity_words = self._get_index_capacity_words(
+                x_slice, y_slice, z_slice)
+        else:
+            index_capacity_words = 0
 
-        # Calculate size of bitfield required to
-        # represent one time step of spiking output
-        output_depth = z_slice.stop - z_slice.start
-        num_neurons = self.output_width * self.output_height * output_depth
-        sample_bytes = calc_bitfield_words(num_neurons) * 4
+        # Write structure
+        fp.write(struct.pack("4I2iI",
+                             x_slice.stop - x_slice.start,
+                             y_slice.stop - y_slice.start,
+                             z_slice.stop - z_slice.start,
+                             self.recording_mode,
+                             convert(self.threshold), convert(self.decay),
+                             index_capacity_words))
 
-        # Seek to start of recording memory
-        region_memory.seek(6 * 4)
+    def get_quantisation_error(self, fixed_point_pos):
+        """Get the absolute error introduced by converting the
+        threshold and decay to a fixed-point format
 
-        # Read data from memory
-        data = region_memory.read(sample_bytes * self.sim_ticks)
+        Returns
+        -------
+        threshold_error : float
+        decay_error : float
+        """
+        convert = float_to_fp(signed=True, n_bits=32, n_frac=fixed_point_pos)
+        scale = 2.0 ** -fixed_point_pos
+        return (abs(self.threshold - (convert(self.threshold) * scale)),
+                abs(self.decay - (convert(self.decay) * scale)))
 
-        # Load into numpy
-        data = np.fromstring(data, dtype=np.uint8)
+    def read_recorded_spikes(self, x_slice, y_slice, z_slice, region_memory,
+                             tick_slice=None, indices=False):
+        """Read and decode recorded spikes from a vertex's region memory.
 
-        # Swap endianness
-        data = data.view(dtype=np.uint32).byteswap().view(dtype=np.uint8)
+        Parameters
+        ----------
+        x_slice : slice
+            slice of output volume's width simulated by vertex
+        y_slice : slice
+            slice of output volume's height simulated by vertex
+        z_slice : slice
+            slice of output volume's depth simulated by vertex
+        region_memory : file-like object
+            memory the region was written to
+        tick_slice : slice
+            contiguous range of ticks to read (defaults to all ticks)
+        indices : bool
+            if True return, for each tick, an array of the indices of the
+            vertex's neurons which spiked rather than a dense array
 
-        # Reverse bit order within each word
-        data = np.fliplr(np.unpackbits(data).reshape(-1, 32))
+        Returns
+        -------
+        ndarray or list
+            uint8 array of shape (ticks, width, height, depth) or
+            list of arrays of neuron indices, one per tick
+        """
+        assert self.record_spikes
 
-        # Finally reshape into a sample shaped vector
-        data = data.reshape((-1, sample_bytes * 8))
+        # If only indices were recorded
+        if self.recording_mode == self.RecordingIndices:
+            # Determine which ticks to read
+            start_tick, stop_tick, _ = (slice(None) if tick_slice is None
+                                        else tick_slice).indices(self.sim_ticks)
+            num_ticks = max(0, stop_tick - start_tick)
 
-        # Slice off padding
-        data = data[:, :num_neurons]
+            # Read recording and decode ticks up to the last one required
+            # **NOTE** ticks are variable-length so must be decoded in order
+            region_memory.seek(self.HeaderBytes)
+            data = region_memory.read(
+                self.sizeof(x_slice, y_slice, z_slice, None) -
+                self.HeaderBytes)
+            spike_indices, overflow_ticks = decode_spike_indices(
+                data, start_tick + num_ticks)
+            spike_indices = spike_indices[start_tick:]
 
-        # Reshape into 4D
-        return data.reshape((self.sim_ticks, self.output_width, self.output_height, output_depth))
+            if overflow_ticks > 0:
+                logger.warning("Spikes of vertex x:[%u, %u), y:[%u, %u), "
+                               "z:[%u, %u) exceeded recording space in %u "
+                               "ticks", x_slice.start, x_slice.stop,
+                               y_slice.start, y_slice.stop, z_slice.start,
+                               z_slice.stop, overflow_ticks)
 
+            if indices:
+                return spike_indices
+            else:
+                # Scatter indices into dense array and reshape into 4D
+                num_neurons = _get_num_neurons(x_slice, y_slice, z_slice)
+                spikes = np.zeros((num_ticks, num_neurons), dtype=np.uint8)
+                for t, i in enumerate(spike_indices):
+                    spikes[t, i] = 1
+                return spikes.reshape(
+                    (num_ticks, x_slice.stop - x_slice.start,
+                     y_slice.stop - y_slice.start,
+                     z_slice.stop - z_slice.start))
+        # Otherwise, read bitfields
+        else:
+            return read_spike_recording(x_slice, y_slice, z_slice,
+                                        self.sim_ticks, self.HeaderBytes,
+                                        region_memory, tick_slice, indices)
 
-    # --------------------------------------------------------------------------
-    # Properties
-    # --------------------------------------------------------------------------
-    @property
-    def output_dim_dtcm_bytes(self):
-        num_dim_neurons = self.output_width * self.output_height
+    def get_output_dim_dtcm_bytes(self, x_slice, y_slice):
+        """Get the DTCM required by the neurons a single kernel
+        drives within a tile of the output volume"""
+        num_dim_neurons = _get_num_neurons(x_slice, y_slice, slice(0, 1))
 
-        # If we're recording calculate the number of bytes required to
-        # store the spiking output of this dimension for one timestep
+        # If we're recording a bitfield calculate the number of bytes required
+        # to store the spiking output of this dimension for one timestep
         # **NOTE** this is an overestimate
-        if self.record_spikes:
+        # **NOTE** indices are written directly to SDRAM so need no DTCM
+        if self.recording_mode == self.RecordingBitField:
             recording_bytes = calc_bitfield_words(num_dim_neurons) * 4
         else:
             recording_bytes = 0
 
         return (self.StateBytes * num_dim_neurons) + recording_bytes
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+    def _get_index_capacity_words(self, x_slice, y_slice, z_slice):
+        # Calculate how many 16-bit indices are required to record the
+        # expected number of spikes, allowing for each tick to be padded
+        # to a whole number of words, but never more than every neuron
+        # spiking every tick and convert to words
+        num_neurons = _get_num_neurons(x_slice, y_slice, z_slice)
+        assert num_neurons <= 0x10000
+        num_indices = int(math.ceil(num_neurons * self.record_spike_rate *
+                                    self.sim_ticks)) + self.sim_ticks
+        return min((num_indices + 1) // 2,
+                   ((num_neurons + 1) // 2) * self.sim_ticks)
@@ -0,0 +1,181 @@
+# Import modules
+import logging
+import struct
+
+# Import classes
+from rig_cpp_common.regions import Region
+
+# Import functions
+from neurons import calc_bitfield_words, read_spike_recording
+
+logger = logging.getLogger("convolver")
+
+# ------------------------------------------------------------------------------
+# Pooling
+# ------------------------------------------------------------------------------
+class Pooling(Region):
+    # How many bytes does the state of each pooled neuron require
+    StateBytes = 2
+
+    # How many bytes does the header preceding the recording require
+    HeaderBytes = 7 * 4
+
+    def __init__(self, pool_size, output_width, output_height,
+                 record_spikes, sim_ticks):
+        """Create a new average pooling region.
+
+        Each pooled neuron counts the spikes emitted by the pool_size x
+        pool_size window of neurons it pools and emits a spike, subtracting
+        pool_size squared from its count, whenever this is reached. It
+        therefore spikes at the mean rate of the neurons in its window.
+
+        Parameters
+        ----------
+        pool_size : int or None
+            width and height of pooling window (None disables pooling)
+        output_width : int
+            width of 3D output volume of (unpooled) neurons
+        output_height : int
+            height of 3D output volume of (unpooled) neurons
+        """
+        if pool_size is not None:
+            assert (output_width % pool_size) == 0
+            assert (output_height % pool_size) == 0
+
+        self.pool_size = pool_size
+        self.output_width = (output_width if pool_size is None
+                             else output_width // pool_size)
+        self.output_height = (output_height if pool_size is None
+                              else output_height // pool_size)
+        self.record_spikes = record_spikes
+        self.sim_ticks = sim_ticks
+
+        if pool_size is not None:
+            logger.debug("\t\tPool size:%u, pooled width:%u, "
+                         "pooled height:%u", self.pool_size,
+                         self.output_width, self.output_height)
+
+    # --------------------------------------------------------------------------
+    # Properties
+    # --------------------------------------------------------------------------
+    @property
+    def enabled(self):
+        return self.pool_size is not None
+
+    # --------------------------------------------------------------------------
+    # Region methods
+    # --------------------------------------------------------------------------
+    def sizeof(self, x_slice, y_slice, z_slice):
+        """Get the size requirements of the region in bytes.
+
+        Parameters
+        ----------
+        x_slice : slice
+            slice of pooled output volume's width simulated by vertex
+        y_slice : slice
+            slice of pooled output volume's height simulated by vertex
+        z_slice : slice
+            slice of pooled output volume's depth simulated by vertex
+
+        Returns
+        -------
+        int
+            The number of bytes required to store the data in the given slice
+            of the region.
+        """
+        # If we're recording
+        if self.enabled and self.record_spikes:
+            # Calculate size of bitfield required to
+            # represent one time step of spiking output
+            recording_words = calc_bitfield_words(
+                (x_slice.stop - x_slice.start) *
+                (y_slice.stop - y_slice.start) *
+                (z_slice.stop - z_slice.start))
+
+            recording_bytes = (recording_words * 4 * self.sim_ticks)
+        else:
+            recording_bytes = 0
+
+        return self.HeaderBytes + recording_bytes
+
+    def write_subregion_to_file(self, fp, x_slice, y_slice, z_slice):
+        """Write a portion of the region to a file applying the formatter.
+
+        Parameters
+        ----------
+        fp : file-like object
+            The file-like object to which data from the region will be written.
+            This must support a `write` method.
+        x_slice : slice
+            slice of pooled output volume's width simulated by vertex
+        y_slice : slice
+            slice of pooled output volume's height simulated by vertex
+        z_slice : slice
+            slice of pooled output volume's depth simulated by vertex
+        """
+        # Write structure
+        # **NOTE** a pool size of zero disables pooling
+        fp.write(struct.pack("7I",
+                             self.pool_size if self.enabled else 0,
+                             x_slice.start, y_slice.start,
+                             x_slice.stop - x_slice.start,
+                             y_slice.stop - y_slice.start,
+                             z_slice.stop - z_slice.start,
+                             1 if self.record_spikes else 0))
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+    def read_recorded_spikes(self, x_slice, y_slice, z_slice, region_memory,
+                             tick_slice=None, indices=False):
+        """Read and decode recorded spikes of pooled neurons from a vertex's
+        region memory (see :py:meth:`~regions.Neurons.read_recorded_spikes`)
+        """
+        assert self.enabled and self.record_spikes
+
+        return read_spike_recording(x_slice, y_slice, z_slice, self.sim_ticks,
+                                    self.HeaderBytes, region_memory,
+                                    tick_slice, indices)
+
+    def get_pooled_slice(self, neuron_slice):
+        """Get the slice of pooled neurons a slice of neurons is pooled into"""
+        if self.enabled:
+            assert (neuron_slice.start % self.pool_size) == 0
+            assert (neuron_slice.stop % self.pool_size) == 0
+
+            return slice(neuron_slice.start // self.pool_size,
+                         neuron_slice.stop // self.pool_size)
+        else:
+            return neuron_slice
+
+    def get_dtcm_bytes(self, x_slice, y_slice):
+        """Get the DTCM required by each core regardless of how many
+        kernels it is responsible for, given the tile of pooled neurons it
+        drives - the lookup table Pooling::ReadSDRAMData builds to convert
+        neuron coordinates along either axis into pooled neuron coordinates"""
+        if not self.enabled:
+            return 0
+
+        # **NOTE** rounded up to a whole number of words as an overestimate
+        max_dimension = max(x_slice.stop - x_slice.start,
+                            y_slice.stop - y_slice.start)
+        return (((self.pool_size * max_dimension) + 3) // 4) * 4
+
+    def get_output_dim_dtcm_bytes(self, x_slice, y_slice):
+        """Get the DTCM required by the pooled neurons a single
+        kernel drives within a tile of the pooled output volume"""
+        if not self.enabled:
+            return 0
+
+        num_dim_neurons = ((x_slice.stop - x_slice.start) *
+                           (y_slice.stop - y_slice.start))
+
+        # If we're recording calculate the number of bytes required to
+        # store the spiking output of this dimension for one timestep
+        # **NOTE** this is an overestimate
+        if self.record_spikes:
+            recording_bytes = calc_bitfield_words(num_dim_neurons) * 4
+        else:
+            recording_bytes = 0
+
+        return (self.StateBytes * num_dim_neurons) + recording_bytes
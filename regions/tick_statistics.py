@@ -0,0 +1,95 @@
+# Import modules
+import logging
+import numpy as np
+import struct
+
+# Import classes
+from rig_cpp_common.regions import Region
+
+logger = logging.getLogger("convolver")
+
+# ------------------------------------------------------------------------------
+# TickStatistics
+# ------------------------------------------------------------------------------
+class TickStatistics(Region):
+    # Names of statistics recorded each tick
+    # **NOTE** these should match the TickStatWord enumeration in conv_layer.h
+    StatNames = (
+        "spikes_received",
+        "spikes_convolved",
+        "spikes_emitted",
+        "input_buffer_high_water_mark",
+    )
+
+    def __init__(self, record, sim_ticks):
+        """Create a new per-tick statistics region.
+
+        Parameters
+        ----------
+        record : bool
+            should statistics be recorded every tick
+        sim_ticks : int
+            total number of ticks simulated
+        """
+        self.record = record
+        self.sim_ticks = sim_ticks
+
+    # --------------------------------------------------------------------------
+    # Region methods
+    # --------------------------------------------------------------------------
+    def sizeof(self):
+        """Get the size requirements of the region in bytes.
+
+        Returns
+        -------
+        int
+            The number of bytes required to store the header and,
+            if recording is enabled, the statistics of every tick.
+        """
+        return 4 + self.get_recording_bytes()
+
+    def write_subregion_to_file(self, fp):
+        """Write a portion of the region to a file applying the formatter.
+
+        Parameters
+        ----------
+        fp : file-like object
+            The file-like object to which data from the region will be written.
+            This must support a `write` method.
+        """
+        # Write number of ticks to record (zero disables recording)
+        fp.write(struct.pack("I", self.sim_ticks if self.record else 0))
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+    def read_tick_stats(self, region_memory):
+        """Read statistics recorded each tick from a vertex's region memory.
+
+        Parameters
+        ----------
+        region_memory : file-like object
+            memory the region was written to
+
+        Returns
+        -------
+        ndarray
+            uint32 array of shape (ticks, stats)
+        """
+        assert self.record
+
+        region_memory.seek(4)
+        data = region_memory.read(self.get_recording_bytes())
+        return np.frombuffer(data, dtype="<u4").reshape(
+            (self.sim_ticks, len(self.StatNames)))
+
+    def get_recording_bytes(self):
+        """Get the SDRAM required to record statistics every tick"""
+        if self.record:
+            return self.sim_ticks * len(self.StatNames) * 4
+        else:
+            return 0
+
+    def get_dtcm_bytes(self):
+        """Get the DTCM required to accumulate a single tick's statistics"""
+        return len(self.StatNames) * 4
@@ -0,0 +1,137 @@
+# Import modules
+import logging
+
+# Import classes
+from rig.netlist import Net
+from rig.place_and_route import Cores
+
+# Import functions
+from rig.place_and_route import allocate, place, route
+from rig.place_and_route.utils import (build_application_map,
+                                       build_core_constraints, build_machine)
+from rig.routing_table import (build_routing_table_target_lengths,
+                               routing_tree_to_tables)
+from rig.routing_table.ordered_covering import minimise as ordered_covering
+from rig.routing_table.remove_default_routes import minimise as \
+    remove_default_entries
+from six import iteritems
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _overlaps(a, b):
+    return a.start < b.stop and b.start < a.stop
+
+def build_nets(layers):
+    """Build nets connecting each vertex to the vertices in the next layer
+    whose receptive fields overlap the tile of neurons it simulates.
+
+    Returns
+    -------
+    nets : [:py:class:`~rig.netlist.Net`, ...]
+    net_keys : {:py:class:`~rig.netlist.Net`: (key, mask), ...}
+    """
+    nets = []
+    net_keys = {}
+    for layer, next_layer in zip(layers[:-1], layers[1:]):
+        # Calculate the receptive field of each vertex in next layer
+        # **NOTE** every kernel spans the full depth of
+        # its input so only x and y need to be considered
+        receptive_fields = [(v, next_layer.get_receptive_field(v))
+                            for v in next_layer.vertices]
+
+        # Loop through all vertices in layer
+        for vertex in layer.vertices:
+            # Find vertices in next layer whose receptive field overlaps
+            # the (pooled) neurons whose spikes this vertex emits
+            vert_x_slice, vert_y_slice, _ = layer.get_output_slices(vertex)
+            sinks = [v for v, (x_slice, y_slice) in receptive_fields
+                     if _overlaps(vert_x_slice, x_slice)
+                     and _overlaps(vert_y_slice, y_slice)]
+
+            # If any vertices in the next layer are affected by this one
+            if len(sinks) > 0:
+                # Create a net connecting vertex to them
+                net = Net(vertex, sinks)
+
+                # Add net to list and associate with key
+                nets.append(net)
+                net_keys[net] = (vertex.routing_key, vertex.routing_mask)
+
+    return nets, net_keys
+
+def place_and_route(vertex_resources, vertex_applications,
+                    nets, net_keys, system_info):
+    """Place, allocate and route network, returning **unminimised**
+    routing tables alongside placements, allocations and application map"""
+    # Infer place-and-route data-structures from SystemInfo
+    machine = build_machine(system_info)
+    constraints = build_core_constraints(system_info)
+
+    # Place/Allocate/Route
+    placements = place(vertex_resources, nets, machine, constraints)
+    allocations = allocate(vertex_resources, nets, machine, constraints,
+                           placements)
+    routes = route(vertex_resources, nets, machine, constraints,
+                   placements, allocations, Cores)
+
+    # Build data-structures ready to feed to the machine loading functions
+    app_map = build_application_map(vertex_applications, placements,
+                                    allocations)
+    routing_tables = routing_tree_to_tables(routes, net_keys)
+
+    return placements, allocations, app_map, routing_tables
+
+def minimise_routing_tables(routing_tables, system_info):
+    """Minimise routing tables so they fit in the routers of a machine.
+
+    Default routes are always removed and, if any table is still larger than
+    the space available on its chip, ordered covering is applied to the
+    original table instead.
+
+    Returns
+    -------
+    routing_tables : {(x, y): [:py:class:`~rig.routing_table.RoutingTableEntry`, ...], ...}
+        minimised routing tables
+    report : {(x, y): (int, int), ...}
+        number of entries in each chip's table before and after minimisation
+    """
+    target_lengths = build_routing_table_target_lengths(system_info)
+
+    minimised_tables = {}
+    report = {}
+    for chip, table in iteritems(routing_tables):
+        # Remove entries the router's default routing will handle
+        minimised_table = remove_default_entries(table, None)
+
+        # If table still won't fit, apply ordered covering to original table
+        # **NOTE** ordered covering only preserves the routes of keys in the
+        # table it is given so, if applied to a table with default entries
+        # removed, merged entries could capture default-routed keys
+        target_length = target_lengths.get(chip)
+        if target_length is not None and len(minimised_table) > target_length:
+            minimised_table = ordered_covering(table, target_length)
+
+        report[chip] = (len(table), len(minimised_table))
+
+        # Store the table if it isn't empty
+        if len(minimised_table) > 0:
+            minimised_tables[chip] = minimised_table
+
+    return minimised_tables, report
+
+def log_routing_table_report(report):
+    """Log summary of routing table minimisation at info level and
+    the number of entries in each chip's table at debug level"""
+    if len(report) == 0:
+        logger.info("\tNo routing tables")
+        return
+
+    before, after = zip(*report.values())
+    logger.info("\tRouting table entries - total:%u->%u, largest:%u->%u "
+                "(%u chips)", sum(before), sum(after), max(before),
+                max(after), len(report))
+    for (x, y), (b, a) in sorted(iteritems(report)):
+        logger.debug("\t\tChip (%u, %u): %u->%u entries", x, y, b, a)
@@ -0,0 +1,112 @@
+# Import modules
+import logging
+import time
+
+# Import classes
+from collections import OrderedDict
+from rig.machine_control.consts import AppState
+from rig.place_and_route import Cores
+
+# Import functions
+from six import iteritems
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# RunMonitor
+# ----------------------------------------------------------------------------
+class RunMonitor(object):
+    """Follows the cores of a running application through the phases of a
+    simulation by polling their states, starting with a short interval which
+    grows geometrically so phases that complete quickly are detected quickly
+    while longer phases don't flood the machine with requests.
+
+    **NOTE** SARK signals used to count cores in each state are not
+    guaranteed to arrive so every phase has a deadline
+    """
+    # States which indicate a core has failed
+    error_states = (AppState.dead, AppState.power_down,
+                    AppState.runtime_exception, AppState.watchdog)
+
+    def __init__(self, machine_controller, placements, allocations,
+                 initial_poll_interval=0.01, max_poll_interval=0.25,
+                 backoff=2.0):
+        self.machine_controller = machine_controller
+        self.placements = placements
+        self.allocations = allocations
+        self.initial_poll_interval = initial_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+
+        # Time taken by each phase
+        self.phase_times = OrderedDict()
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def wait_for_state(self, phase, state, timeout):
+        """Block until every placed core reaches state, raising an exception
+        as soon as any core fails or if this doesn't happen within timeout.
+
+        Parameters
+        ----------
+        phase : string
+            name used to record time taken to reach state
+        state : :py:class:`~rig.machine_control.consts.AppState`
+            state all cores should reach
+        timeout : float
+            number of seconds after which to give up
+        """
+        num_cores = len(self.placements)
+        start_time = time.time()
+        deadline = start_time + timeout
+        poll_interval = self.initial_poll_interval
+        num_polls = 0
+        while True:
+            num_polls += 1
+            num_in_state = self.machine_controller.count_cores_in_state(state)
+
+            # If all cores have reached state, phase is complete
+            if num_in_state >= num_cores:
+                break
+
+            # If any cores have failed, there's no point in waiting further
+            num_failed = self.machine_controller.count_cores_in_state(
+                self.error_states)
+            if num_failed > 0:
+                self._report_core_states(state)
+                raise Exception("%u cores failed before reaching %s state "
+                                "(%u/%u)" % (num_failed, state.name,
+                                             num_in_state, num_cores))
+
+            # If deadline has passed, give up
+            now = time.time()
+            if now >= deadline:
+                self._report_core_states(state)
+                raise Exception("Timed out after %.1fs waiting for cores to "
+                                "reach %s state (%u/%u)" %
+                                (timeout, state.name, num_in_state, num_cores))
+
+            # Wait before polling again, never sleeping past the deadline
+            time.sleep(min(poll_interval, deadline - now))
+            poll_interval = min(self.max_poll_interval,
+                                poll_interval * self.backoff)
+
+        # Record time taken
+        duration = time.time() - start_time
+        self.phase_times[phase] = duration
+        logger.info("\t%u cores reached %s state after %.3fs (%u polls)",
+                    num_cores, state.name, duration, num_polls)
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _report_core_states(self, state):
+        # Loop through all placed vertices
+        for vertex, (x, y) in iteritems(self.placements):
+            p = self.allocations[vertex][Cores].start
+            status = self.machine_controller.get_processor_status(p, x, y)
+            if status.cpu_state is not state:
+                logger.error("Core (%u, %u, %u) in state %s", x, y, p,
+                             status.cpu_state.name)
+                logger.error(self.machine_controller.get_iobuf(p, x, y))
@@ -14,7 +14,10 @@ using namespace Common::ARMIntrinsics;
 //--------------------------------------------------------------------------
 namespace ConvLayer
 {
-template<typename Weight, unsigned int KernelSize, unsigned int Stride>
+// **NOTE** if WeightBits is 4, pairs of weights are packed into each
+// Weight with the even-indexed weight in the low nibble
+template<typename Weight, unsigned int KernelSize, unsigned int Stride,
+         unsigned int WeightBits = sizeof(Weight) * 8>
 class ConvKernelBase
 {
 private:
@@ -23,6 +26,9 @@ private:
   //--------------------------------------------------------------------------
   static const unsigned int HalfKernelSize = KernelSize / 2;
 
+  static_assert(WeightBits == (sizeof(Weight) * 8) || (WeightBits == 4 && sizeof(Weight) == 1),
+                "Only full-width or packed 4-bit weights are supported");
+
 public:
   //--------------------------------------------------------------------------
   // Public methods
@@ -48,7 +54,8 @@ public:
 
     // Loop through kernels
     uint8_t *kernelRegion = reinterpret_cast<uint8_t*>(region);
-    const unsigned int kernelBytes = KernelSize * KernelSize * kernelDepth * sizeof(Weight);
+    // **NOTE** each kernel is padded to a whole number of bytes
+    const unsigned int kernelBytes = ((KernelSize * KernelSize * kernelDepth * WeightBits) + 7) / 8;
     for(unsigned int k = 0; k < m_NumKernels; k++)
     {
       // Allocate kernel
@@ -69,6 +76,23 @@ public:
     return true;
   }
 
+  // Convert the coordinate of a spike from the previous layer into one
+  // relative to the input at the centre of a tile's first neuron
+  static int GetTileInput(unsigned int in, unsigned int tileStart)
+  {
+    return (int)in - (int)(tileStart * Stride);
+  }
+
+  // Can a spike at a (tile-relative) input coordinate
+  // affect any of the numNeurons neurons along that axis of the tile
+  // **NOTE** this is conservative as spikes which only reach neurons
+  // outside the tile are also discarded when they are applied
+  static bool IsInReceptiveField(int in, unsigned int numNeurons)
+  {
+    return (in > -(int)(HalfKernelSize + Stride))
+      && (in < (int)((numNeurons * Stride) + KernelSize - HalfKernelSize));
+  }
+
   template<typename A>
   void ConvolveSpike(int xIn, int yIn, int zIn,
     A applyFunc) const
@@ -101,7 +125,7 @@ public:
           // Get current kernel
           const Weight *kernel = m_KernelWeights[k];
 
-          applyFunc(xNeuron / Stride, yNeuron / Stride, k, kernel[kernelIndex]);
+          applyFunc(xNeuron / Stride, yNeuron / Stride, k, GetWeight(kernel, kernelIndex));
         }
       }
     }
@@ -134,9 +158,9 @@ public:
               auto imagePixel = getPixelFunc(imageX + kernelX, imageY + kernelY);
 
               // Read three colour components from image
-              const int32_t kernelR = kernel[kernelX + (KernelSize * (kernelY + (0 * KernelSize)))];
-              const int32_t kernelG = kernel[kernelX + (KernelSize * (kernelY + (1 * KernelSize)))];
-              const int32_t kernelB = kernel[kernelX + (KernelSize * (kernelY + (2 * KernelSize)))];
+              const int32_t kernelR = GetWeight(kernel, kernelX + (KernelSize * (kernelY + (0 * KernelSize))));
+              const int32_t kernelG = GetWeight(kernel, kernelX + (KernelSize * (kernelY + (1 * KernelSize))));
+              const int32_t kernelB = GetWeight(kernel, kernelX + (KernelSize * (kernelY + (2 * KernelSize))));
 
               // Convolve kernel with image
               value = __smlabb(std::get<0>(imagePixel), kernelR, value);
@@ -156,6 +180,27 @@ public:
     }
   }
 
+private:
+  //--------------------------------------------------------------------------
+  // Private static methods
+  //--------------------------------------------------------------------------
+  // Read a (sign-extended) weight from a kernel
+  static int32_t GetWeight(const Weight *kernel, unsigned int index)
+  {
+    if(WeightBits == 4)
+    {
+      // Shift required nibble to top of word and then back down
+      // arithmetically to sign extend it
+      const uint32_t packed = (uint8_t)kernel[index / 2];
+      const unsigned int shift = (index & 1) ? 24 : 28;
+      return (int32_t)(packed << shift) >> 28;
+    }
+    else
+    {
+      return kernel[index];
+    }
+  }
+
   //--------------------------------------------------------------------------
   // Members
   //--------------------------------------------------------------------------
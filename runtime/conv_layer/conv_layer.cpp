@@ -12,6 +12,8 @@
 #include "conv_kernel.h"
 #include "input.h"
 #include "neurons.h"
+#include "pooling.h"
+#include "tick_statistics.h"
 
 // Configuration include
 #include "config.h"
@@ -32,6 +34,7 @@ namespace
 enum DMATag
 {
   DMATagSpikeRecordingWrite,
+  DMATagPooledSpikeRecordingWrite,
 };
 
 //----------------------------------------------------------------------------
@@ -40,19 +43,49 @@ enum DMATag
 Config g_Config;
 SpikeInputBuffer g_SpikeInputBuffer;
 Statistics<StatWordMax> g_Statistics;
+TickStatistics<TickStatWordMax> g_TickStatistics;
 ConvKernel g_ConvKernel;
 Neurons g_Neurons;
 Input g_Input;
+Pooling g_Pooling;
 
 uint32_t g_AppWords[AppWordMax];
 
 uint g_Tick = 0;
 
+// Index of current image and how many ticks it has been presented for
+uint g_Image = 0;
+uint g_ImageTick = 0;
+
 bool g_PacketPipelineBusy = false;
 
+// Total number of spikes pushed into and popped from input buffer
+// **NOTE** these are only written by MCPacketReceived and
+// UserEvent respectively so their difference is the buffer occupancy
+uint32_t g_NumSpikesPushed = 0;
+uint32_t g_NumSpikesPopped = 0;
+
+// Number of recording DMA transfers which have not yet completed and
+// the number of ticks which will be recorded once they have
+uint g_NumPendingRecordingTransfers = 0;
+uint g_NumTicksTransferring = 0;
+
 //-----------------------------------------------------------------------------
 // Module functions
 //-----------------------------------------------------------------------------
+vcpu_t *GetVCPU()
+{
+  // Get this core's VCPU struct, used to communicate with the host
+  return &sv_vcpu[sark.virt_cpu];
+}
+//-----------------------------------------------------------------------------
+int ConvertInputCurrent(int input)
+{
+  // Shift input current from weight to neuron fixed-point format
+  // **NOTE** shift is performed unsigned to avoid undefined behaviour
+  return (int)((uint32_t)input << g_AppWords[AppWordInputShift]);
+}
+//-----------------------------------------------------------------------------
 bool ReadSDRAMData(uint32_t *baseAddress, uint32_t flags)
 {
   LOG_PRINT(LOG_LEVEL_INFO, "Largest DTCM heap block:%u bytes",
@@ -72,9 +105,12 @@ bool ReadSDRAMData(uint32_t *baseAddress, uint32_t flags)
   }
   else
   {
-    LOG_PRINT(LOG_LEVEL_INFO, "\tZ mask:%08x, z start:%u, spike key:%08x, fixed point position:%u",
+    LOG_PRINT(LOG_LEVEL_INFO, "\tZ mask:%08x, z start:%u, spike key:%08x, neuron fixed point position:%u, ticks per image:%u",
       g_AppWords[AppWordZMask], g_AppWords[AppWordOutputZStart],
-      g_AppWords[AppWordSpikeKey], g_AppWords[AppWordFixedPointPosition]);
+      g_AppWords[AppWordSpikeKey], g_AppWords[AppWordNeuronFixedPointPosition],
+      g_AppWords[AppWordTicksPerImage]);
+    LOG_PRINT(LOG_LEVEL_INFO, "\tTile x start:%u, y start:%u, input shift:%u",
+      g_AppWords[AppWordOutputXStart], g_AppWords[AppWordOutputYStart], g_AppWords[AppWordInputShift]);
   }
 
   // Read conv kernel region
@@ -113,9 +149,47 @@ bool ReadSDRAMData(uint32_t *baseAddress, uint32_t flags)
     return false;
   }
 
+  if(!g_TickStatistics.ReadSDRAMData(
+    Config::GetRegionStart(baseAddress, RegionTickStatistics),
+    flags))
+  {
+    return false;
+  }
+
+  // Read pooling region
+  if(!g_Pooling.ReadSDRAMData(
+    Config::GetRegionStart(baseAddress, RegionPooling), flags))
+  {
+    return false;
+  }
+
   return true;
 }
 
+//-----------------------------------------------------------------------------
+void SendSpike(unsigned int xOut, unsigned int yOut, unsigned int zOut)
+{
+  // Build neuron ID from x, y and z
+  const uint32_t n = (zOut  << 16) | (yOut << 8) | xOut;
+
+  if((n & g_AppWords[AppWordSpikeKey]) != 0)
+  {
+    LOG_PRINT(LOG_LEVEL_ERROR, "BAD KEY %08x %08x (%u, %u, %u)", n, g_AppWords[AppWordSpikeKey], xOut, yOut, zOut);
+  }
+  // Send spike
+  while(!spin1_send_mc_packet(g_AppWords[AppWordSpikeKey] | n, 0, NO_PAYLOAD))
+  {
+    spin1_delay_us(1);
+  }
+
+  // Increment spikes emitted statistics
+  g_Statistics[StatWordSpikesEmitted]++;
+  g_TickStatistics[TickStatWordSpikesEmitted]++;
+
+  // Leave a gap
+  spin1_delay_us(5);
+}
+
 //-----------------------------------------------------------------------------
 // Event handler functions
 //-----------------------------------------------------------------------------
@@ -124,9 +198,16 @@ void MCPacketReceived(uint key, uint)
   LOG_PRINT(LOG_LEVEL_TRACE, "Received spike %x at tick %u, packet pipeline busy = %u",
             key, g_Tick, g_PacketPipelineBusy);
 
+  g_TickStatistics[TickStatWordSpikesReceived]++;
+
   // If there was space to add spike to incoming spike queue
   if(g_SpikeInputBuffer.Push(key))
   {
+    // Update high-water mark of input buffer
+    g_NumSpikesPushed++;
+    g_TickStatistics.UpdateMax(TickStatWordInputBufferHighWaterMark,
+                               g_NumSpikesPushed - g_NumSpikesPopped);
+
     // If the packet pipeline is not already busy, start processing
     if(!g_PacketPipelineBusy)
     {
@@ -150,9 +231,22 @@ void DMATransferDone(uint, uint tag)
   {
     g_Neurons.ResetRecording();
   }
+  else if(tag == DMATagPooledSpikeRecordingWrite)
+  {
+    g_Pooling.ResetRecording();
+  }
   else
   {
     LOG_PRINT(LOG_LEVEL_ERROR, "DMA transfer done with unknown tag %u", tag);
+    return;
+  }
+
+  // If this was the last outstanding recording transfer, report
+  // to host that all ticks transferred so far have been recorded
+  g_NumPendingRecordingTransfers--;
+  if(g_NumPendingRecordingTransfers == 0)
+  {
+    GetVCPU()->user0 = g_NumTicksTransferring;
   }
 }
 //-----------------------------------------------------------------------------
@@ -165,22 +259,37 @@ void UserEvent(uint, uint)
     [](unsigned int xNeuron, unsigned int yNeuron, unsigned int zNeuron,
        int input)
     {
-      g_Neurons.AddInputCurrent(xNeuron, yNeuron, zNeuron, input);
+      g_Neurons.AddInputCurrent(xNeuron, yNeuron, zNeuron,
+                                ConvertInputCurrent(input));
     };
 
   // While there are spikes in input queue
   uint32_t spikeKey;
   while(g_SpikeInputBuffer.Pop(spikeKey))
   {
-    g_Statistics[StatWordSpikesConvolved]++;
+    g_NumSpikesPopped++;
 
-    // Extract x, y and z from spike
+    // Extract x, y and z from spike, making x and y relative to this tile
     // **THINK** if z was at bottom of key it be used to route
-    const unsigned int xIn = (spikeKey & 0xFF);
-    const unsigned int yIn = (spikeKey >> 8) & 0xFF;
+    const int xIn = ConvKernel::GetTileInput(spikeKey & 0xFF,
+                                             g_AppWords[AppWordOutputXStart]);
+    const int yIn = ConvKernel::GetTileInput((spikeKey >> 8) & 0xFF,
+                                             g_AppWords[AppWordOutputYStart]);
     const unsigned int zIn = (spikeKey >> 16) & g_AppWords[AppWordZMask];
 
-    LOG_PRINT(LOG_LEVEL_TRACE, "\tConvolving spike:%08x (%u, %u, %u)",
+    // If spike is outside of the receptive field of this tile, skip it
+    if(!ConvKernel::IsInReceptiveField(xIn, g_Neurons.GetWidth())
+      || !ConvKernel::IsInReceptiveField(yIn, g_Neurons.GetHeight()))
+    {
+      LOG_PRINT(LOG_LEVEL_TRACE, "\tSkipping spike:%08x outside of receptive field",
+                spikeKey);
+      continue;
+    }
+
+    g_Statistics[StatWordSpikesConvolved]++;
+    g_TickStatistics[TickStatWordSpikesConvolved]++;
+
+    LOG_PRINT(LOG_LEVEL_TRACE, "\tConvolving spike:%08x (%d, %d, %u)",
               spikeKey, xIn, yIn, zIn);
 
     // Convolve spike with convolution kernel
@@ -199,11 +308,23 @@ void TimerTick(uint tick, uint)
   // **NOTE** ticks start at 1
   g_Tick = (tick - 1);
 
-  // If a fixed number of simulation ticks are specified and these have passed
-  if(g_Config.GetSimulationTicks() != UINT32_MAX
-    && g_Tick >= g_Config.GetSimulationTicks())
+  // Get VCPU struct used to receive stop requests from host
+  vcpu_t *vcpu = GetVCPU();
+
+  // Record statistics accumulated during previous tick
+  // **NOTE** spikes can arrive while this is happening so, like
+  // the totals in g_Statistics, counts may very occasionally be lost
+  if(g_Tick > 0)
   {
-    LOG_PRINT(LOG_LEVEL_INFO, "Simulation complete");
+    g_TickStatistics.Record();
+  }
+
+  // If a fixed number of simulation ticks are specified and these have
+  // passed or the host has requested that the simulation stops early
+  if((g_Config.GetSimulationTicks() != UINT32_MAX
+    && g_Tick >= g_Config.GetSimulationTicks()) || vcpu->user1 != 0)
+  {
+    LOG_PRINT(LOG_LEVEL_INFO, "Simulation complete after %u ticks", g_Tick);
 
     // Finalise profiling
     Profiler::Finalise();
@@ -224,8 +345,40 @@ void TimerTick(uint tick, uint)
     LOG_PRINT(LOG_LEVEL_TRACE, "Timer tick %u", g_Tick);
 
     UserEvent(0, 0);
-    // If this vertex has any input to apply
-    if(g_Input.HasInput())
+
+    // If the current image has been presented for long enough
+    if(g_ImageTick == g_AppWords[AppWordTicksPerImage])
+    {
+      // Advance to next image
+      g_Image++;
+      g_ImageTick = 0;
+
+      LOG_PRINT(LOG_LEVEL_TRACE, "\tStarting image %u", g_Image);
+
+      // Reset neurons so no state carries over from previous image
+      // **NOTE** this also discards any spikes convolved above
+      g_Neurons.Reset();
+      g_Pooling.Reset();
+
+      // If this vertex has input, load next image
+      if(g_Input.HasInput())
+      {
+        g_Input.LoadImage(g_Image);
+      }
+    }
+    g_ImageTick++;
+    // If this vertex has precomputed input currents, add them to neurons
+    if(g_Input.HasPrecomputedInput())
+    {
+      LOG_PRINT(LOG_LEVEL_TRACE, "\tAdding precomputed input currents");
+
+      // **NOTE** this replaces convolving the input image so is profiled as such
+      Profiler::WriteEntry(Profiler::Enter | ProfilerTagConvolveImage);
+      g_Neurons.AddInputCurrents(g_Input.GetInputCurrents());
+      Profiler::WriteEntry(Profiler::Exit | ProfilerTagConvolveImage);
+    }
+    // Otherwise, if this vertex has an input image to convolve
+    else if(g_Input.HasImage())
     {
       // Lambda function to read input pixels
       auto getPixel =
@@ -239,7 +392,8 @@ void TimerTick(uint tick, uint)
         [](unsigned int xNeuron, unsigned int yNeuron, unsigned int zNeuron,
           int input)
         {
-          g_Neurons.AddInputCurrent(xNeuron, yNeuron, zNeuron, input);
+          g_Neurons.AddInputCurrent(xNeuron, yNeuron, zNeuron,
+                                    ConvertInputCurrent(input));
         };
 
       LOG_PRINT(LOG_LEVEL_TRACE, "\tConvolving input image");
@@ -255,36 +409,55 @@ void TimerTick(uint tick, uint)
     auto emitSpike =
       [](unsigned int x, unsigned int y, unsigned int z)
       {
-        // Build neuron ID from x, y and z (offset by this core's starting slice)
-        const unsigned int zOut = g_AppWords[AppWordOutputZStart] + z;
-        const uint32_t n = (zOut  << 16) | (y << 8) | x;
-
-        if((n & g_AppWords[AppWordSpikeKey]) != 0)
+        // If layer is pooled, count spike in pooled neuron
+        // **NOTE** pooled x and y are already offset by this core's tile
+        if(g_Pooling.IsEnabled())
         {
-          LOG_PRINT(LOG_LEVEL_ERROR, "BAD KEY %08x %08x (%u, %u, %u)", n, g_AppWords[AppWordSpikeKey], x, y, z);
+          g_Pooling.AddSpike(x, y, z,
+            [](unsigned int xPool, unsigned int yPool, unsigned int zPool)
+            {
+              SendSpike(xPool, yPool, g_AppWords[AppWordOutputZStart] + zPool);
+            });
         }
-        // Send spike
-        while(!spin1_send_mc_packet(g_AppWords[AppWordSpikeKey] | n, 0, NO_PAYLOAD))
+        // Otherwise, send spike offset by this core's tile and starting slice
+        else
         {
-          spin1_delay_us(1);
+          SendSpike(g_AppWords[AppWordOutputXStart] + x,
+                    g_AppWords[AppWordOutputYStart] + y,
+                    g_AppWords[AppWordOutputZStart] + z);
         }
-
-        // Increment spikes emitted statistic
-        g_Statistics[StatWordSpikesEmitted]++;
-
-        // Leave a gap
-        spin1_delay_us(5);
       };
 
     LOG_PRINT(LOG_LEVEL_TRACE, "\tUpdating neurons");
 
     // Update neural state using lambda function to emit spikes
     Profiler::WriteEntry(Profiler::Enter | ProfilerTagUpdateNeurons);
-    g_Neurons.Update(emitSpike, g_AppWords[AppWordFixedPointPosition]);
+    g_Neurons.Update(emitSpike, g_AppWords[AppWordNeuronFixedPointPosition]);
     Profiler::WriteEntry(Profiler::Exit | ProfilerTagUpdateNeurons);
 
-    // Write spike recording data to SDRAM
-    g_Neurons.TransferBuffer(DMATagSpikeRecordingWrite);
+    // Write spike recording data to SDRAM, counting the DMA transfers
+    // started so this tick is only reported to the host as recorded (in
+    // user0, letting it monitor recordings while the simulation runs)
+    // once they have completed and the recording is in SDRAM
+    // **NOTE** interrupts are disabled so DMATransferDone
+    // cannot pre-empt this before transfers are counted
+    const uint cpsr = spin1_int_disable();
+    g_NumTicksTransferring = g_Tick + 1;
+    if(g_Neurons.TransferBuffer(DMATagSpikeRecordingWrite))
+    {
+      g_NumPendingRecordingTransfers++;
+    }
+    if(g_Pooling.TransferBuffer(DMATagPooledSpikeRecordingWrite))
+    {
+      g_NumPendingRecordingTransfers++;
+    }
+
+    // If no transfers are outstanding, tick is already recorded
+    if(g_NumPendingRecordingTransfers == 0)
+    {
+      vcpu->user0 = g_NumTicksTransferring;
+    }
+    spin1_mode_restore(cpsr);
   }
 }
 } // Anonymous namespace
@@ -308,6 +481,12 @@ extern "C" void c_main()
   // Set timer tick (in microseconds) in both timer and
   spin1_set_timer_tick(g_Config.GetTimerPeriod());
 
+  // Clear VCPU fields used to report progress to and receive stop
+  // requests from the host before it can access them after synchronising
+  vcpu_t *vcpu = GetVCPU();
+  vcpu->user0 = 0;
+  vcpu->user1 = 0;
+
   // Register callbacks
   spin1_callback_on(MC_PACKET_RECEIVED, MCPacketReceived, -1);
   spin1_callback_on(DMA_TRANSFER_DONE,  DMATransferDone,   0);
@@ -14,6 +14,8 @@ enum Region
   RegionInput,
   RegionProfiler,
   RegionStatistics,
+  RegionTickStatistics,
+  RegionPooling,
 };
 
 // Indexes of application words
@@ -22,7 +24,11 @@ enum AppWord
   AppWordZMask,
   AppWordOutputZStart,
   AppWordSpikeKey,
-  AppWordFixedPointPosition,
+  AppWordNeuronFixedPointPosition,
+  AppWordTicksPerImage,
+  AppWordOutputXStart,
+  AppWordOutputYStart,
+  AppWordInputShift,
   AppWordMax,
 };
 
@@ -44,4 +50,14 @@ enum StatWord
   StatWordMax,
 };
 
+// Indices of statistic words recorded every tick
+enum TickStatWord
+{
+  TickStatWordSpikesReceived,
+  TickStatWordSpikesConvolved,
+  TickStatWordSpikesEmitted,
+  TickStatWordInputBufferHighWaterMark,
+  TickStatWordMax,
+};
+
 };  // namespace ConvLayer
\ No newline at end of file
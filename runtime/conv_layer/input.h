@@ -20,6 +20,11 @@ template<typename Input>
 class InputBase
 {
 public:
+  InputBase() : m_NumImages(0), m_Input(NULL), m_InputCurrentsSDRAM(NULL),
+    m_InputCurrents(NULL)
+  {
+  }
+
   //--------------------------------------------------------------------------
   // Public methods
   //--------------------------------------------------------------------------
@@ -28,10 +33,31 @@ public:
     LOG_PRINT(LOG_LEVEL_INFO, "InputBase::ReadSDRAMData");
 
     // Read input image count
-    const unsigned int numInputImages = *region++;
-    LOG_PRINT(LOG_LEVEL_INFO, "\t%u input images", numInputImages);
+    m_NumImages = *region++;
+    LOG_PRINT(LOG_LEVEL_INFO, "\t%u input images", m_NumImages);
+
+    if(m_NumImages == 0)
+    {
+      return true;
+    }
+
+    // If the input current each image applies to each neuron
+    // has been precomputed on the host, cache pointer to them
+    // **NOTE** these are read directly from SDRAM each tick
+    const bool precomputed = (*region++ != 0);
+    if(precomputed)
+    {
+      const uint32_t numNeurons = *region++;
+      LOG_PRINT(LOG_LEVEL_INFO, "\tPrecomputed input currents for %u neurons",
+                numNeurons);
+
+      // Each image's currents are padded to a whole number of words
+      m_InputCurrentsSDRAM = reinterpret_cast<const int16_t*>(region);
+      m_InputCurrentsStride = (((numNeurons * sizeof(int16_t)) + 3) / 4) * 2;
 
-    if(numInputImages > 0)
+      LoadImage(0);
+    }
+    else
     {
       // Read fixed point position
       m_FixedPointPosition = *region++;
@@ -52,18 +78,21 @@ public:
         return false;
       }
 
+      // Cache pointer to images in SDRAM
+      m_ImagesSDRAM = reinterpret_cast<Input*>(region);
+
       // Allocate array, large enough to hold a single image
-      const unsigned int numBytes = m_Width * m_Height * depth * sizeof(Input);
-      m_Input = (Input*)spin1_malloc(numBytes);
+      m_ImageBytes = m_Width * m_Height * depth * sizeof(Input);
+      m_Input = (Input*)spin1_malloc(m_ImageBytes);
       if(m_Input == NULL)
       {
         LOG_PRINT(LOG_LEVEL_ERROR, "Cannot allocate %u bytes for input images",
-                  numBytes);
+                  m_ImageBytes);
         return false;
       }
 
       // Copy first image into DTCM
-      spin1_memcpy(m_Input, region, numBytes);
+      LoadImage(0);
 
 #if LOG_LEVEL <= LOG_LEVEL_TRACE
       for(unsigned int y = 0; y < m_Height; y++)
@@ -82,6 +111,23 @@ public:
     return true;
   }
 
+  void LoadImage(unsigned int image)
+  {
+    LOG_PRINT(LOG_LEVEL_TRACE, "\tLoading input image %u", image);
+
+    // If input is precomputed, point to this image's input currents
+    if(HasPrecomputedInput())
+    {
+      m_InputCurrents = m_InputCurrentsSDRAM + (image * m_InputCurrentsStride);
+    }
+    // Otherwise, copy image from SDRAM into DTCM
+    else
+    {
+      const uint8_t *imagesSDRAM = reinterpret_cast<const uint8_t*>(m_ImagesSDRAM);
+      spin1_memcpy(m_Input, imagesSDRAM + (image * m_ImageBytes), m_ImageBytes);
+    }
+  }
+
   std::tuple<int32_t, int32_t, int32_t> GetPixel(unsigned int x, unsigned int y) const
   {
     // Get index in x-y
@@ -109,16 +155,36 @@ public:
     return m_Height;
   }
 
+  uint32_t GetNumImages() const
+  {
+    return m_NumImages;
+  }
+
   uint32_t GetFixedPointPosition() const
   {
     return m_FixedPointPosition;
   }
 
+  const int16_t *GetInputCurrents() const
+  {
+    return m_InputCurrents;
+  }
+
   bool HasInput() const
+  {
+    return (m_NumImages > 0);
+  }
+
+  bool HasImage() const
   {
     return (m_Input != NULL);
   }
 
+  bool HasPrecomputedInput() const
+  {
+    return (m_InputCurrentsSDRAM != NULL);
+  }
+
 private:
   //--------------------------------------------------------------------------
   // Members
@@ -128,7 +194,22 @@ private:
   uint32_t m_Width;
   uint32_t m_Height;
 
-  // 3D image
+  // Number of images and size of each one
+  uint32_t m_NumImages;
+  uint32_t m_ImageBytes;
+
+  // All images in SDRAM
+  Input *m_ImagesSDRAM;
+
+  // 3D image currently being presented
   Input *m_Input;
+
+  // Precomputed input currents of all images in SDRAM
+  // and the number of currents between each image's
+  const int16_t *m_InputCurrentsSDRAM;
+  unsigned int m_InputCurrentsStride;
+
+  // Precomputed input currents of image currently being presented
+  const int16_t *m_InputCurrents;
 };
 } // ConvLayer
\ No newline at end of file
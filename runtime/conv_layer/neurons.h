@@ -19,7 +19,20 @@ template<typename State>
 class NeuronsBase
 {
 public:
-  NeuronsBase() : m_MembraneVoltage(NULL), m_Width(0), m_Height(0), m_Depth(0)
+  // How spikes are recorded
+  // **NOTE** these should match the recording modes in neurons.py
+  enum RecordingMode
+  {
+    RecordingNone,
+    RecordingBitField,
+    RecordingIndices,
+  };
+
+  NeuronsBase() : m_MembraneVoltage(NULL), m_Width(0), m_Height(0), m_Depth(0),
+    m_RecordingMode(RecordingNone), m_NumRecordingWords(0),
+    m_RecordingBuffer(NULL), m_RecordingSDRAM(NULL),
+    m_NumRecordingIndicesRemaining(0), m_NumTickSpikes(0),
+    m_RecordingOverflow(false)
   {
   }
 
@@ -37,14 +50,17 @@ public:
     LOG_PRINT(LOG_LEVEL_INFO, "\tWidth:%u, height:%u, depth:%u",
               m_Width, m_Height, m_Depth);
 
-    // Read recording flag
-    const bool record = (*region++ != 0);
+    // Read recording mode
+    m_RecordingMode = (RecordingMode)*region++;
 
     m_ThresholdVoltage = *reinterpret_cast<int32_t*>(region++);
     m_Decay = *reinterpret_cast<int32_t*>(region++);
     LOG_PRINT(LOG_LEVEL_INFO, "\tDecay:%d, threshold:%d",
               m_ThresholdVoltage, m_Decay);
 
+    // Read number of words available for recording spike indices
+    const uint32_t indexCapacityWords = *region++;
+
     // Attempt to allocate memory for membrane voltages
     const unsigned int numNeurons = m_Width * m_Height * m_Depth;
     const unsigned int membraneVoltageBytes = numNeurons * sizeof(State);
@@ -62,15 +78,27 @@ public:
                 membraneVoltageBytes);
 
       // Zero membrane voltages
-      State *membraneVoltage = m_MembraneVoltage;
-      for(unsigned int n = 0; n < numNeurons; n++)
-      {
-        *membraneVoltage++ = 0;
-      }
+      Reset();
     }
 
-    // If recording is enabled
-    if(record)
+    // If recording indices
+    if(m_RecordingMode == RecordingIndices)
+    {
+      // Cache pointer to rest of region to use for recording
+      // **NOTE** indices are written directly to SDRAM each tick
+      m_RecordingSDRAM = region;
+
+      // Calculate how many 16-bit indices can be recorded
+      m_NumRecordingIndicesRemaining = indexCapacityWords * 2;
+      LOG_PRINT(LOG_LEVEL_INFO, "\tRecording up to %u spike indices",
+                m_NumRecordingIndicesRemaining);
+
+      m_NumRecordingWords = 0;
+      m_RecordingBuffer = NULL;
+      ResetRecording();
+    }
+    // Otherwise, if recording a bitfield
+    else if(m_RecordingMode == RecordingBitField)
     {
       // Cache pointer to rest of region to use for recording
       m_RecordingSDRAM = region;
@@ -124,6 +152,18 @@ public:
     }
   }
 
+  void AddInputCurrents(const int16_t *inputCurrents)
+  {
+    // Add input 'current' to every neuron's 'voltage'
+    // **NOTE** currents are in the same order as membrane voltages
+    const unsigned int numNeurons = m_Width * m_Height * m_Depth;
+    State *membraneVoltage = m_MembraneVoltage;
+    for(unsigned int n = 0; n < numNeurons; n++)
+    {
+      *membraneVoltage++ += *inputCurrents++;
+    }
+  }
+
   template<typename E>
   void Update(E emitSpikeFunc, uint32_t fixedPointPosition)
   {
@@ -145,10 +185,10 @@ public:
             // Emit spike
             emitSpikeFunc(x, y, z);
 
-            // If we're recording, set appropriate bit
-            if(m_RecordingBuffer != NULL)
+            // If we're recording, record spike
+            if(m_RecordingMode != RecordingNone)
             {
-              BitField::SetBit(m_RecordingBuffer, membraneVoltage - m_MembraneVoltage);
+              RecordSpike(membraneVoltage - m_MembraneVoltage);
             }
 
             // Reset membrane voltage
@@ -168,16 +208,56 @@ public:
     }
   }
 
+  void Reset()
+  {
+    // Zero membrane voltages
+    const unsigned int numNeurons = m_Width * m_Height * m_Depth;
+    State *membraneVoltage = m_MembraneVoltage;
+    for(unsigned int n = 0; n < numNeurons; n++)
+    {
+      *membraneVoltage++ = 0;
+    }
+  }
+
+  uint32_t GetWidth() const
+  {
+    return m_Width;
+  }
+
+  uint32_t GetHeight() const
+  {
+    return m_Height;
+  }
+
   void ResetRecording()
   {
     if(m_RecordingBuffer != NULL)
     {
       BitField::Clear(m_RecordingBuffer, m_NumRecordingWords);
     }
+
+    m_NumTickSpikes = 0;
+    m_RecordingOverflow = false;
   }
 
-  void TransferBuffer(uint tag)
+  bool TransferBuffer(uint tag)
   {
+    // If we're recording indices, they have already been written to
+    // SDRAM so write tick's header with its spike count and overflow flag
+    // **NOTE** as no DMA transfer is required, the tick is recorded
+    if(m_RecordingMode == RecordingIndices)
+    {
+      *m_RecordingSDRAM = m_NumTickSpikes | (m_RecordingOverflow ? 0x80000000 : 0);
+
+      // Advance SDRAM pointer past header and indices, padded to a word
+      const unsigned int numTickWords = (m_NumTickSpikes + 1) / 2;
+      m_RecordingSDRAM += 1 + numTickWords;
+      m_NumRecordingIndicesRemaining -= numTickWords * 2;
+
+      ResetRecording();
+      return false;
+    }
+
     LOG_PRINT(LOG_LEVEL_TRACE, "\tTransferring record buffer to SDRAM:%08x",
       m_RecordingSDRAM);
 #if LOG_LEVEL <= LOG_LEVEL_TRACE
@@ -188,16 +268,45 @@ public:
     // Use DMA to transfer record buffer to SDRAM
     if(m_NumRecordingWords > 0)
     {
-      spin1_dma_transfer(tag, m_RecordingSDRAM,
-                         m_RecordingBuffer, DMA_WRITE,
-                         m_NumRecordingWords * sizeof(uint32_t));
+      const bool transferring = (spin1_dma_transfer(
+        tag, m_RecordingSDRAM, m_RecordingBuffer, DMA_WRITE,
+        m_NumRecordingWords * sizeof(uint32_t)) != 0);
 
       // Advance SDRAM pointer
       m_RecordingSDRAM += m_NumRecordingWords;
+      return transferring;
+    }
+    else
+    {
+      return false;
     }
   }
 
 private:
+  //-----------------------------------------------------------------------------
+  // Private methods
+  //-----------------------------------------------------------------------------
+  void RecordSpike(unsigned int n)
+  {
+    // If we're recording a bitfield, set appropriate bit
+    if(m_RecordingMode == RecordingBitField)
+    {
+      BitField::SetBit(m_RecordingBuffer, n);
+    }
+    // Otherwise, if there's space, write index after tick's header
+    // **NOTE** the space remaining is always a whole number of words
+    // at the start of each tick so there is always space for padding
+    else if(m_NumTickSpikes < m_NumRecordingIndicesRemaining)
+    {
+      reinterpret_cast<uint16_t*>(m_RecordingSDRAM + 1)[m_NumTickSpikes++] = (uint16_t)n;
+    }
+    // Otherwise, flag that some of this tick's spikes weren't recorded
+    else
+    {
+      m_RecordingOverflow = true;
+    }
+  }
+
   //-----------------------------------------------------------------------------
   // Members
   //-----------------------------------------------------------------------------
@@ -213,8 +322,16 @@ private:
   uint32_t m_Height;
   uint32_t m_Depth;
 
+  RecordingMode m_RecordingMode;
+
   uint32_t m_NumRecordingWords;
   uint32_t *m_RecordingBuffer;
   uint32_t *m_RecordingSDRAM;
+
+  // Number of spike indices which can still be recorded, the number
+  // recorded in the current tick and whether any were dropped
+  uint32_t m_NumRecordingIndicesRemaining;
+  uint32_t m_NumTickSpikes;
+  bool m_RecordingOverflow;
 };
 } // ConvLayer
\ No newline at end of file
@@ -0,0 +1,210 @@
+#pragma once
+
+// Rig CPP common includes
+#include "rig_cpp_common/bit_field.h"
+#include "rig_cpp_common/log.h"
+#include "rig_cpp_common/spinnaker.h"
+
+// Namespaces
+using namespace Common;
+
+//-----------------------------------------------------------------------------
+// ConvLayer::Pooling
+//-----------------------------------------------------------------------------
+namespace ConvLayer
+{
+// Average pooling of the spikes emitted by a tile of neurons. Each pooled
+// neuron counts the spikes emitted by its window of neurons and spikes
+// whenever this count reaches the size of the window, meaning that it
+// spikes at the mean rate of the neurons in the window
+class Pooling
+{
+public:
+  Pooling() : m_PoolSize(0), m_SpikeCount(NULL), m_PoolCoord(NULL),
+    m_XStart(0), m_YStart(0), m_Width(0), m_Height(0), m_Depth(0),
+    m_NumRecordingWords(0), m_RecordingBuffer(NULL), m_RecordingSDRAM(NULL)
+  {
+  }
+
+  //-----------------------------------------------------------------------------
+  // Public API
+  //-----------------------------------------------------------------------------
+  bool ReadSDRAMData(uint32_t *region, uint32_t)
+  {
+    LOG_PRINT(LOG_LEVEL_INFO, "Pooling::ReadSDRAMData");
+
+    // Read pool size, returning if pooling is disabled
+    m_PoolSize = *region++;
+    if(m_PoolSize == 0)
+    {
+      LOG_PRINT(LOG_LEVEL_INFO, "\tPooling disabled");
+      return true;
+    }
+
+    // Read pooled neuron slice position and dimensions
+    m_XStart = *region++;
+    m_YStart = *region++;
+    m_Width = *region++;
+    m_Height = *region++;
+    m_Depth = *region++;
+    LOG_PRINT(LOG_LEVEL_INFO, "\tPool size:%u, x start:%u, y start:%u, width:%u, height:%u, depth:%u",
+              m_PoolSize, m_XStart, m_YStart, m_Width, m_Height, m_Depth);
+
+    // Read recording flag
+    const bool record = (*region++ != 0);
+
+    // Attempt to allocate memory for spike counts
+    const unsigned int numNeurons = m_Width * m_Height * m_Depth;
+    const unsigned int spikeCountBytes = numNeurons * sizeof(uint16_t);
+    m_SpikeCount = (uint16_t*)spin1_malloc(spikeCountBytes);
+    if(m_SpikeCount == NULL)
+    {
+      LOG_PRINT(LOG_LEVEL_ERROR, "\tFailed to allocate %u bytes for spike counts",
+                spikeCountBytes);
+      return false;
+    }
+
+    // Build lookup table to convert neuron coordinates along either axis
+    // into pooled neuron coordinates, avoiding division when counting spikes
+    const unsigned int maxDimension = (m_Width > m_Height) ? m_Width : m_Height;
+    const unsigned int numPoolCoords = m_PoolSize * maxDimension;
+    m_PoolCoord = (uint8_t*)spin1_malloc(numPoolCoords);
+    if(m_PoolCoord == NULL)
+    {
+      LOG_PRINT(LOG_LEVEL_ERROR, "\tFailed to allocate %u byte pool coordinate lookup table",
+                numPoolCoords);
+      return false;
+    }
+    for(unsigned int i = 0, c = 0; c < maxDimension; c++)
+    {
+      for(unsigned int j = 0; j < m_PoolSize; j++)
+      {
+        m_PoolCoord[i++] = (uint8_t)c;
+      }
+    }
+
+    // Zero spike counts
+    Reset();
+
+    // If recording is enabled
+    if(record)
+    {
+      // Cache pointer to rest of region to use for recording
+      m_RecordingSDRAM = region;
+
+      // Calculate number of recording words
+      m_NumRecordingWords = BitField::GetWordSize(numNeurons);
+      LOG_PRINT(LOG_LEVEL_INFO, "\tRecording using %u word bitfield",
+                m_NumRecordingWords);
+
+      // Allocate recording buffer
+      m_RecordingBuffer = (uint32_t*)spin1_malloc(m_NumRecordingWords * sizeof(uint32_t));
+      if(m_RecordingBuffer == NULL)
+      {
+        LOG_PRINT(LOG_LEVEL_ERROR, "Unable to allocate local record buffer");
+        return false;
+      }
+
+      // Zero recording buffer
+      ResetRecording();
+    }
+
+    return true;
+  }
+
+  template<typename E>
+  void AddSpike(unsigned int x, unsigned int y, unsigned int z,
+                E emitSpikeFunc)
+  {
+    // Calculate index of the pooled neuron this neuron is pooled into
+    // **NOTE** n = z + depth * (y + (height * x))
+    const unsigned int xPool = m_PoolCoord[x];
+    const unsigned int yPool = m_PoolCoord[y];
+    const unsigned int n = z + (m_Depth * (yPool + (m_Height * xPool)));
+
+    // Count spike and, if count has reached window size, emit
+    // spike from pooled neuron and subtract window size from count
+    // **NOTE** neurons spike at most once per tick and counts are always
+    // below the window size afterwards so pooled neurons do the same
+    const unsigned int windowSize = m_PoolSize * m_PoolSize;
+    if(++m_SpikeCount[n] >= windowSize)
+    {
+      emitSpikeFunc(m_XStart + xPool, m_YStart + yPool, z);
+
+      // If we're recording, set appropriate bit
+      if(m_RecordingBuffer != NULL)
+      {
+        BitField::SetBit(m_RecordingBuffer, n);
+      }
+
+      m_SpikeCount[n] -= windowSize;
+    }
+  }
+
+  void Reset()
+  {
+    // Zero spike counts
+    const unsigned int numNeurons = m_Width * m_Height * m_Depth;
+    for(unsigned int n = 0; n < numNeurons; n++)
+    {
+      m_SpikeCount[n] = 0;
+    }
+  }
+
+  bool IsEnabled() const
+  {
+    return (m_PoolSize != 0);
+  }
+
+  void ResetRecording()
+  {
+    if(m_RecordingBuffer != NULL)
+    {
+      BitField::Clear(m_RecordingBuffer, m_NumRecordingWords);
+    }
+  }
+
+  bool TransferBuffer(uint tag)
+  {
+    // Use DMA to transfer record buffer to SDRAM
+    if(m_NumRecordingWords > 0)
+    {
+      const bool transferring = (spin1_dma_transfer(
+        tag, m_RecordingSDRAM, m_RecordingBuffer, DMA_WRITE,
+        m_NumRecordingWords * sizeof(uint32_t)) != 0);
+
+      // Advance SDRAM pointer
+      m_RecordingSDRAM += m_NumRecordingWords;
+      return transferring;
+    }
+    else
+    {
+      return false;
+    }
+  }
+
+private:
+  //-----------------------------------------------------------------------------
+  // Members
+  //-----------------------------------------------------------------------------
+  // Width and height of pooling window
+  uint32_t m_PoolSize;
+
+  // Number of spikes counted by each pooled neuron
+  uint16_t *m_SpikeCount;
+
+  // Lookup table of pooled neuron coordinate of each neuron coordinate
+  uint8_t *m_PoolCoord;
+
+  // Pooled neuron slice position and dimensions
+  uint32_t m_XStart;
+  uint32_t m_YStart;
+  uint32_t m_Width;
+  uint32_t m_Height;
+  uint32_t m_Depth;
+
+  uint32_t m_NumRecordingWords;
+  uint32_t *m_RecordingBuffer;
+  uint32_t *m_RecordingSDRAM;
+};
+} // ConvLayer
@@ -0,0 +1,221 @@
+#pragma once
+
+// Standard includes
+#include <tuple>
+
+// Rig CPP common includes
+#include "rig_cpp_common/arm_intrinsics.h"
+
+// Conv layer includes
+#include "conv_kernel.h"
+
+// Namespaces
+using namespace Common::ARMIntrinsics;
+
+//--------------------------------------------------------------------------
+// ConvLayer::SparseConvKernelBase
+//--------------------------------------------------------------------------
+// Pruned convolution kernels stored as a row for each index into a dense
+// kernel (i.e. x + (KernelSize * (y + (KernelSize * z)))) containing an
+// entry for each kernel with a non-zero weight at that index. Each 16-bit
+// entry contains the kernel index in its upper byte and the weight below.
+namespace ConvLayer
+{
+template<typename Weight, unsigned int KernelSize, unsigned int Stride>
+class SparseConvKernelBase
+{
+private:
+  //--------------------------------------------------------------------------
+  // Typedefines
+  //--------------------------------------------------------------------------
+  typedef ConvKernelBase<Weight, KernelSize, Stride> DenseConvKernel;
+
+  //--------------------------------------------------------------------------
+  // Constants
+  //--------------------------------------------------------------------------
+  static const unsigned int HalfKernelSize = KernelSize / 2;
+
+  static_assert(sizeof(Weight) == 1, "Sparse kernels only support 8-bit weights");
+
+public:
+  //--------------------------------------------------------------------------
+  // Public methods
+  //--------------------------------------------------------------------------
+  bool ReadSDRAMData(uint32_t *region, uint32_t)
+  {
+    LOG_PRINT(LOG_LEVEL_INFO, "SparseConvKernelBase::ReadSDRAMData");
+
+    m_NumKernels = *region++;
+    const uint32_t kernelDepth = *region++;
+
+    // Copy row offsets into DTCM
+    // **NOTE** there is one more row offset than rows and
+    // the array is padded to a whole number of words
+    const unsigned int numRows = KernelSize * KernelSize * kernelDepth;
+    const unsigned int rowOffsetBytes = (numRows + 1) * sizeof(uint16_t);
+    m_RowOffsets = (uint16_t*)spin1_malloc(rowOffsetBytes);
+    if(m_RowOffsets == NULL)
+    {
+      LOG_PRINT(LOG_LEVEL_ERROR, "Cannot allocate %u bytes for row offsets",
+                rowOffsetBytes);
+      return false;
+    }
+    spin1_memcpy(m_RowOffsets, region, rowOffsetBytes);
+    region += (rowOffsetBytes + 3) / 4;
+
+    LOG_PRINT(LOG_LEVEL_INFO, "\tStride:%u, num kernels:%u, kernel size:%u, kernel depth:%u, num entries:%u",
+      Stride, m_NumKernels, KernelSize, kernelDepth, m_RowOffsets[numRows]);
+
+    // Copy entries into DTCM
+    const unsigned int entryBytes = m_RowOffsets[numRows] * sizeof(uint16_t);
+    m_Entries = (uint16_t*)spin1_malloc(entryBytes);
+    if(m_Entries == NULL)
+    {
+      LOG_PRINT(LOG_LEVEL_ERROR, "Cannot allocate %u bytes for entries",
+                entryBytes);
+      return false;
+    }
+    spin1_memcpy(m_Entries, region, entryBytes);
+
+    // Allocate an accumulator for each kernel, used when convolving images
+    const unsigned int accumulatorBytes = m_NumKernels * sizeof(int32_t);
+    m_ImageAccumulators = (int32_t*)spin1_malloc(accumulatorBytes);
+    if(m_ImageAccumulators == NULL)
+    {
+      LOG_PRINT(LOG_LEVEL_ERROR, "Cannot allocate %u bytes for image accumulators",
+                accumulatorBytes);
+      return false;
+    }
+
+    return true;
+  }
+
+  // Receptive field calculations are independent of kernel format
+  static int GetTileInput(unsigned int in, unsigned int tileStart)
+  {
+    return DenseConvKernel::GetTileInput(in, tileStart);
+  }
+
+  static bool IsInReceptiveField(int in, unsigned int numNeurons)
+  {
+    return DenseConvKernel::IsInReceptiveField(in, numNeurons);
+  }
+
+  template<typename A>
+  void ConvolveSpike(int xIn, int yIn, int zIn,
+    A applyFunc) const
+  {
+    const unsigned zStride = zIn * KernelSize;
+
+    // Calculate starting position in kernel
+    // **NOTE** this matches ConvKernelBase::ConvolveSpike
+    const unsigned int xStart = (Stride == 1) ? 0 : (xIn & (Stride - 1)) ? 0 : 1;
+    const unsigned int yStart = (Stride == 1) ? 0 : (yIn & (Stride - 1)) ? 0 : 1;
+
+    // Loop through kernel pixels
+    for(unsigned int xKernel = xStart; xKernel < KernelSize; xKernel += Stride)
+    {
+      for(unsigned int yKernel = yStart; yKernel < KernelSize; yKernel += Stride)
+      {
+        // Calculate row for this pixel
+        const unsigned int row = xKernel + (KernelSize * (yKernel + zStride));
+
+        // Calculate corresponding output pixel
+        const int xNeuron = xIn - (int)xKernel + HalfKernelSize;
+        const int yNeuron = yIn - (int)yKernel + HalfKernelSize;
+
+        // Loop through the kernels with non-zero weights for this pixel
+        const uint16_t *rowEnd = &m_Entries[m_RowOffsets[row + 1]];
+        for(const uint16_t *entry = &m_Entries[m_RowOffsets[row]]; entry != rowEnd; entry++)
+        {
+          applyFunc(xNeuron / Stride, yNeuron / Stride, *entry >> 8, GetWeight(*entry));
+        }
+      }
+    }
+  }
+
+  // Convolve a (padded) input image with the convolution kernel
+  template<typename A, typename I>
+  void ConvolveImage(unsigned int imageWidth, unsigned int imageHeight,
+                    unsigned int fixedPoint, A applyFunc, I getPixelFunc)
+  {
+    // Stride through image pixels
+    // **NOTE** images are padded on host
+    for(unsigned int imageX = 0; imageX < (imageWidth - KernelSize); imageX += Stride)
+    {
+      for(unsigned int imageY = 0; imageY < (imageHeight - KernelSize); imageY += Stride)
+      {
+        // Zero accumulators
+        for(unsigned int k = 0; k < m_NumKernels; k++)
+        {
+          m_ImageAccumulators[k] = 0;
+        }
+
+        // Loop through kernel pixels
+        for(unsigned int kernelX = 0; kernelX < KernelSize; kernelX++)
+        {
+          for(unsigned int kernelY = 0; kernelY < KernelSize; kernelY++)
+          {
+            // Get image pixel
+            auto imagePixel = getPixelFunc(imageX + kernelX, imageY + kernelY);
+
+            // Convolve three colour components with the kernels
+            // which have non-zero weights for them
+            const unsigned int row = kernelX + (KernelSize * kernelY);
+            AccumulatePixel(row + (0 * KernelSize * KernelSize), std::get<0>(imagePixel));
+            AccumulatePixel(row + (1 * KernelSize * KernelSize), std::get<1>(imagePixel));
+            AccumulatePixel(row + (2 * KernelSize * KernelSize), std::get<2>(imagePixel));
+          }
+        }
+
+        // Loop through kernels
+        for(unsigned int k = 0; k < m_NumKernels; k++)
+        {
+          // Shift down to complete fixed point multiply-accumulate
+          // and apply value to pixel at centre of kernel
+          // **NOTE** because of padding this doesn't need to be offset
+          applyFunc(imageX / Stride, imageY / Stride, k,
+                    m_ImageAccumulators[k] >> fixedPoint);
+        }
+      }
+    }
+  }
+
+private:
+  //--------------------------------------------------------------------------
+  // Private static methods
+  //--------------------------------------------------------------------------
+  static int32_t GetWeight(uint16_t entry)
+  {
+    return (int8_t)(entry & 0xFF);
+  }
+
+  //--------------------------------------------------------------------------
+  // Private methods
+  //--------------------------------------------------------------------------
+  void AccumulatePixel(unsigned int row, int32_t pixel)
+  {
+    const uint16_t *rowEnd = &m_Entries[m_RowOffsets[row + 1]];
+    for(const uint16_t *entry = &m_Entries[m_RowOffsets[row]]; entry != rowEnd; entry++)
+    {
+      int32_t &accumulator = m_ImageAccumulators[*entry >> 8];
+      accumulator = __smlabb(pixel, GetWeight(*entry), accumulator);
+    }
+  }
+
+  //--------------------------------------------------------------------------
+  // Members
+  //--------------------------------------------------------------------------
+  // Number of kernels
+  unsigned int m_NumKernels;
+
+  // Offset of the first entry in each row
+  uint16_t *m_RowOffsets;
+
+  // Kernel index and weight entries
+  uint16_t *m_Entries;
+
+  // Per-kernel accumulators used when convolving images
+  int32_t *m_ImageAccumulators;
+};
+} // ConvLayer
@@ -0,0 +1,102 @@
+#pragma once
+
+// Rig CPP common includes
+#include "rig_cpp_common/log.h"
+#include "rig_cpp_common/spinnaker.h"
+
+//-----------------------------------------------------------------------------
+// ConvLayer::TickStatistics
+//-----------------------------------------------------------------------------
+// Statistics accumulated over the course of each tick and
+// written to SDRAM at the end of it, alongside spike recording
+namespace ConvLayer
+{
+template<unsigned int N>
+class TickStatistics
+{
+public:
+  TickStatistics() : m_RecordingSDRAM(NULL), m_RecordingSDRAMEnd(NULL)
+  {
+    Reset();
+  }
+
+  //-----------------------------------------------------------------------------
+  // Public API
+  //-----------------------------------------------------------------------------
+  bool ReadSDRAMData(uint32_t *region, uint32_t)
+  {
+    LOG_PRINT(LOG_LEVEL_INFO, "TickStatistics::ReadSDRAMData");
+
+    // Read number of ticks to record (zero if recording is disabled)
+    const uint32_t numTicks = *region++;
+    LOG_PRINT(LOG_LEVEL_INFO, "\tRecording %u statistics for %u ticks",
+              N, numTicks);
+
+    // Cache pointers to rest of region to use for recording
+    if(numTicks > 0)
+    {
+      m_RecordingSDRAM = region;
+      m_RecordingSDRAMEnd = region + (numTicks * N);
+    }
+    else
+    {
+      m_RecordingSDRAM = NULL;
+      m_RecordingSDRAMEnd = NULL;
+    }
+
+    return true;
+  }
+
+  uint32_t &operator[](unsigned int s)
+  {
+    return m_Statistics[s];
+  }
+
+  void UpdateMax(unsigned int s, uint32_t value)
+  {
+    if(value > m_Statistics[s])
+    {
+      m_Statistics[s] = value;
+    }
+  }
+
+  void Record()
+  {
+    // If recording is enabled and there is space, copy
+    // this tick's statistics to SDRAM and advance pointer
+    // **NOTE** a handful of words doesn't warrant a DMA
+    if(m_RecordingSDRAM != NULL && m_RecordingSDRAM < m_RecordingSDRAMEnd)
+    {
+      for(unsigned int s = 0; s < N; s++)
+      {
+        *m_RecordingSDRAM++ = m_Statistics[s];
+      }
+    }
+
+    // Reset statistics for next tick
+    Reset();
+  }
+
+private:
+  //-----------------------------------------------------------------------------
+  // Private methods
+  //-----------------------------------------------------------------------------
+  void Reset()
+  {
+    for(unsigned int s = 0; s < N; s++)
+    {
+      m_Statistics[s] = 0;
+    }
+  }
+
+  //-----------------------------------------------------------------------------
+  // Members
+  //-----------------------------------------------------------------------------
+  // Statistics accumulated during current tick
+  uint32_t m_Statistics[N];
+
+  // Pointer to next tick's statistics and end of recording in SDRAM
+  uint32_t *m_RecordingSDRAM;
+  uint32_t *m_RecordingSDRAMEnd;
+};
+} // ConvLayer
@@ -0,0 +1,336 @@
+# Import modules
+import logging
+import numpy as np
+import struct
+
+# Import classes
+from conv_neuron_layer import Regions
+from io import BytesIO
+
+# Import functions
+from regions.input import convolve_image
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _serialise_region(region, region_arguments):
+    # Write region into an in-memory file exactly as it would be written to SDRAM
+    args, kwargs = region_arguments
+    fp = BytesIO()
+    region.write_subregion_to_file(fp, *args, **kwargs)
+    return fp.getvalue()
+
+def _sign_extend_16(value):
+    # Mimic how the ARM SMULBB instruction interprets bottom 16 bits of a word
+    value &= 0xFFFF
+    return (value ^ 0x8000) - 0x8000
+
+def _build_kernel_offset_indices(kernel_size, stride, input_size, output_size,
+                                 output_start):
+    # For each kernel offset along an axis, calculate the input coordinates
+    # ConvKernelBase::ConvolveSpike would apply that offset to and the
+    # coordinates of the neurons in a tile these inputs would be applied to
+    half_kernel_size = kernel_size // 2
+    input_coords = np.arange(input_size)
+
+    # Make input coordinates relative to tile as ConvKernelBase::GetTileInput
+    tile_input_coords = input_coords - (output_start * stride)
+
+    # Calculate starting position in kernel for each input coordinate
+    if stride == 1:
+        start = np.zeros(input_size, dtype=int)
+    else:
+        start = np.where((tile_input_coords & (stride - 1)) != 0, 0, 1)
+
+    indices = []
+    for k in range(kernel_size):
+        # Offsets are only visited from start in steps of stride
+        valid = (k >= start) & (((k - start) % stride) == 0)
+
+        # Calculate corresponding output pixel
+        # **NOTE** negative neuron coordinates wrap to very large
+        # unsigned values on the core so are also discarded
+        neuron_coords = tile_input_coords - k + half_kernel_size
+        valid &= (neuron_coords >= 0)
+        neuron_coords = neuron_coords // stride
+        valid &= (neuron_coords < output_size)
+
+        indices.append((input_coords[valid], neuron_coords[valid]))
+    return indices
+
+# ----------------------------------------------------------------------------
+# VertexSimulator
+# ----------------------------------------------------------------------------
+class VertexSimulator(object):
+    """Host-side model of a single convolution neuron core, reproducing the
+    fixed-point arithmetic of ConvKernelBase, InputBase and NeuronsBase
+    and the spike counting of Pooling"""
+    def __init__(self, layer, vertex, z_mask, input_size):
+        region_arguments = layer.get_region_arguments(vertex, z_mask)
+
+        # Extract application words
+        (self.z_mask, self.z_start, self.spike_key,
+         self.neuron_fixed_point_pos, _,
+         self.x_start, self.y_start, self.input_shift) = region_arguments[Regions.system].kwargs["application_words"]
+
+        # Read back neuron parameters from serialised neurons region
+        neuron_data = _serialise_region(layer.regions[Regions.neurons],
+                                        region_arguments[Regions.neurons])
+        (self.width, self.height, self.depth, _,
+         self.threshold, decay) = struct.unpack_from("4I2i", neuron_data)
+        self.decay = _sign_extend_16(decay)
+
+        # Read back kernels from serialised conv kernel region
+        conv_kernel_region = layer.regions[Regions.conv_kernel]
+        self.kernels = conv_kernel_region.get_runtime_kernels(
+            vertex.weights, vertex.fixed_point_pos)
+        self.kernel_size = conv_kernel_region.kernel_width
+        self.stride = layer.stride
+        assert self.kernels.shape[0] == self.depth
+
+        # Read back pooling parameters from serialised pooling region
+        pooling_data = _serialise_region(layer.regions[Regions.pooling],
+                                         region_arguments[Regions.pooling])
+        (self.pool_size, pooled_x_start, pooled_y_start, self.pooled_width,
+         self.pooled_height, _, _) = struct.unpack_from("7I", pooling_data)
+
+        # If layer is pooled, spikes are emitted by pooled neurons
+        if self.pool_size != 0:
+            self.x_start_out = pooled_x_start
+            self.y_start_out = pooled_y_start
+        else:
+            self.x_start_out = self.x_start
+            self.y_start_out = self.y_start
+
+        # Zero membrane voltages and pooled spike counts
+        self.membrane_voltage = np.zeros((self.width, self.height, self.depth),
+                                         dtype=np.int16)
+        self.pool_counts = np.zeros((self.pooled_width, self.pooled_height,
+                                     self.depth), dtype=np.int32)
+
+        # Calculate how spikes map through each kernel offset
+        self.x_indices = _build_kernel_offset_indices(
+            self.kernel_size, self.stride, input_size[0], self.width,
+            self.x_start)
+        self.y_indices = _build_kernel_offset_indices(
+            self.kernel_size, self.stride, input_size[1], self.height,
+            self.y_start)
+
+        # If region has input, read back (or precompute) the
+        # (constant) convolution of each image it contains
+        input_region = layer.regions[Regions.input]
+        if input_region.input_data is not None:
+            input_data = _serialise_region(input_region,
+                                           region_arguments[Regions.input])
+            self.image_inputs = self._read_image_inputs(input_data)
+        else:
+            self.image_inputs = None
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def apply_spikes(self, spike_counts):
+        # Loop through kernel offsets
+        input_current = np.zeros(self.membrane_voltage.shape, dtype=np.int64)
+        for x_kernel, (x_in, x_neuron) in enumerate(self.x_indices):
+            for y_kernel, (y_in, y_neuron) in enumerate(self.y_indices):
+                # Get spikes this kernel offset applies to
+                spikes = spike_counts[np.ix_(x_in, y_in)]
+                if not np.any(spikes):
+                    continue
+
+                # Multiply spike counts by weights of all kernels at this offset
+                kernel = self.kernels[:, :, y_kernel, x_kernel].astype(np.int64)
+                input_current[np.ix_(x_neuron, y_neuron)] += np.dot(spikes, kernel.T)
+
+        # Convert input current from weight to neuron format
+        self._add_input_current(np.left_shift(input_current, self.input_shift))
+
+    def apply_image(self, image):
+        if self.image_inputs is not None:
+            self._add_input_current(self.image_inputs[image])
+
+    def reset(self):
+        self.membrane_voltage[:] = 0
+        self.pool_counts[:] = 0
+
+    def update(self):
+        membrane_voltage = self.membrane_voltage.astype(np.int32)
+
+        # Determine which neurons have crossed threshold
+        spiking = membrane_voltage > self.threshold
+
+        # Decay membrane voltages using 16x16 bit multiply and reset spiking neurons
+        decayed = np.right_shift(membrane_voltage * self.decay,
+                                 self.neuron_fixed_point_pos)
+        self.membrane_voltage = np.where(spiking, 0, decayed).astype(np.int16)
+
+        # If layer is pooled, count spikes in each pooling window and
+        # emit a spike from pooled neurons whose count has reached the
+        # window size, subtracting it from the count as Pooling::AddSpike
+        # **NOTE** as each neuron spikes at most once per tick and counts
+        # start below the window size, each pooled neuron can spike at most
+        # once per tick so the order spikes are counted in doesn't matter
+        if self.pool_size != 0:
+            window_spikes = spiking.reshape(
+                (self.pooled_width, self.pool_size, self.pooled_height,
+                 self.pool_size, self.depth)).sum(axis=(1, 3))
+            self.pool_counts += window_spikes
+            spiking = self.pool_counts >= (self.pool_size ** 2)
+            self.pool_counts[spiking] -= (self.pool_size ** 2)
+
+        return spiking
+
+    def get_spike_keys(self, spiking):
+        # Build keys in the same way as SendSpike
+        x, y, z = np.nonzero(spiking)
+        x_out = self.x_start_out + x
+        y_out = self.y_start_out + y
+        z_out = self.z_start + z
+        n = (z_out << 16) | (y_out << 8) | x_out
+        return (self.spike_key | n).astype(np.uint32)
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _add_input_current(self, input_current):
+        # Membrane voltages are 16-bit so wrap just as on the core
+        self.membrane_voltage = (self.membrane_voltage + input_current).astype(np.int16)
+
+    def _read_image_inputs(self, input_data):
+        num_images, precomputed = struct.unpack_from("2I", input_data)
+
+        # If input currents were precomputed on the host, read them back
+        # in the order of NeuronsBase's membrane voltages
+        if precomputed:
+            num_neurons = struct.unpack_from("I", input_data, 8)[0]
+            image_words = ((num_neurons * 2) + 3) // 4
+            input_currents = np.frombuffer(input_data, dtype=np.int16,
+                                           offset=12)
+            input_currents = input_currents.reshape((num_images,
+                                                     image_words * 2))
+            return [c[:num_neurons].reshape(self.membrane_voltage.shape)
+                    for c in input_currents]
+        # Otherwise, read header and view images as InputBase::GetPixel
+        # indexes them and convolve them as ConvKernelBase would
+        else:
+            (image_fixed_point, image_width,
+             image_height, image_depth) = struct.unpack_from("4I", input_data,
+                                                             8)
+            images = np.frombuffer(input_data, dtype=np.int8, offset=24)
+            images = images.reshape((num_images, image_height,
+                                     image_width, image_depth))
+
+            # **NOTE** input currents are converted from weight to neuron
+            # format as each is applied by the lambda in UserEvent
+            return [np.left_shift(convolve_image(i, self.kernels, self.stride,
+                                                 image_fixed_point, self.width,
+                                                 self.height),
+                                  self.input_shift)
+                    for i in images]
+
+# ----------------------------------------------------------------------------
+# Simulator
+# ----------------------------------------------------------------------------
+class Simulator(object):
+    """Vectorised host-side model of a network of ConvNeuronLayers,
+    intended to produce the same spikes as the SpiNNaker runtime"""
+    def __init__(self, layers, z_mask, sim_ticks, num_images):
+        self.sim_ticks = sim_ticks
+        self.num_images = num_images
+
+        # Create vertex simulators for each layer
+        self._layers = []
+        input_size = None
+        for l in layers:
+            # If there is no previous layer, no spikes will be received
+            if input_size is None:
+                input_size = (0, 0, 0)
+
+            self._layers.append(
+                (l, [VertexSimulator(l, v, z_mask, input_size)
+                     for v in l.vertices],
+                 input_size))
+
+            # Spikes emitted by this layer are received by the next
+            input_size = (l.output_width, l.output_height,
+                          l.vertices[-1].z_slice.stop)
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def run(self):
+        # Create arrays to hold spikes emitted by each layer
+        layer_spikes = []
+        for l, _, _ in self._layers:
+            layer_spikes.append(
+                np.zeros((self.num_images, self.sim_ticks,
+                          l.output_width, l.output_height,
+                          l.vertices[-1].z_slice.stop),
+                         dtype=np.uint8))
+
+        for i in range(self.num_images):
+            logger.info("\tImage %u", i)
+
+            # Reset neurons between images
+            for _, vertex_sims, _ in self._layers:
+                for s in vertex_sims:
+                    s.reset()
+
+            self._run_image(i, layer_spikes)
+
+        return layer_spikes
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _run_image(self, image, layer_spikes):
+        # Spikes emitted by each layer in previous tick
+        # **NOTE** spikes emitted during one tick are modelled
+        # as arriving at the next layer before the following tick
+        # so spikes emitted at the end of the previous image are
+        # discarded when the neurons are reset, as on the core
+        spike_keys = [np.empty(0, dtype=np.uint32)] * len(self._layers)
+
+        for t in range(self.sim_ticks):
+            logger.debug("\t\tTick %u", t)
+
+            new_spike_keys = []
+            for i, (l, vertex_sims, input_size) in enumerate(self._layers):
+                # Decode spikes emitted by previous layer in previous tick
+                spike_counts = (self._decode_spikes(spike_keys[i - 1],
+                                                    vertex_sims[0].z_mask,
+                                                    input_size)
+                                if i > 0 else None)
+
+                tick_keys = []
+                for v, s in zip(l.vertices, vertex_sims):
+                    # Convolve spikes, add image input and update neurons
+                    if spike_counts is not None:
+                        s.apply_spikes(spike_counts)
+                    s.apply_image(image)
+                    spiking = s.update()
+
+                    # Record spikes and build keys
+                    layer_spikes[i][(image, t) +
+                                    l.get_output_slices(v)] = spiking
+                    tick_keys.append(s.get_spike_keys(spiking))
+
+                new_spike_keys.append(np.concatenate(tick_keys))
+
+            spike_keys = new_spike_keys
+
+    def _decode_spikes(self, keys, z_mask, input_size):
+        # Extract x, y and z from spikes as in UserEvent
+        x = keys & 0xFF
+        y = (keys >> 8) & 0xFF
+        z = (keys >> 16) & z_mask
+
+        # Count spikes at each input coordinate
+        spike_counts = np.zeros(input_size, dtype=np.int64)
+        valid = ((x < input_size[0]) & (y < input_size[1]) &
+                 (z < input_size[2]))
+        np.add.at(spike_counts, (x[valid], y[valid], z[valid]), 1)
+        return spike_counts
@@ -0,0 +1,144 @@
+# Import modules
+import numpy as np
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _compact(values, max_value):
+    # Convert values to the smallest unsigned type able to hold max_value
+    return np.asarray(values).astype(np.min_scalar_type(max_value))
+
+# ----------------------------------------------------------------------------
+# SpikeStore
+# ----------------------------------------------------------------------------
+class SpikeStore(object):
+    """Sparse event-list representation of the spikes emitted by a layer.
+
+    Spikes are stored as compact tick, x, y and z columns, sorted by tick,
+    alongside an index of where each tick's spikes start. Any axes preceding
+    the width, height and depth of the layer (i.e. image and tick) are
+    flattened into a single tick axis.
+    """
+    def __init__(self, shape, tick_offsets, tick, x, y, z):
+        """Create a new spike store.
+
+        Parameters
+        ----------
+        shape : tuple
+            shape of the equivalent dense spike array
+        tick_offsets : ndarray
+            index of first spike in each tick, followed by the total
+            number of spikes
+        tick : ndarray
+            (flattened) tick each spike was emitted in
+        x : ndarray
+            x coordinate of neuron which emitted each spike
+        y : ndarray
+            y coordinate of neuron which emitted each spike
+        z : ndarray
+            z coordinate of neuron which emitted each spike
+        """
+        self.shape = tuple(int(s) for s in shape)
+        self.tick_offsets = tick_offsets
+        self.tick = tick
+        self.x = x
+        self.y = y
+        self.z = z
+
+        assert len(self.shape) >= 4
+        assert len(self.tick_offsets) == (self.num_ticks + 1)
+
+    # ------------------------------------------------------------------------
+    # Class methods
+    # ------------------------------------------------------------------------
+    @classmethod
+    def from_events(cls, shape, tick, x, y, z):
+        """Create a spike store from unsorted columns of spike events"""
+        num_ticks = int(np.prod(shape[:-3]))
+        tick = np.asarray(tick, dtype=np.intp)
+
+        # Stable sort spikes by tick
+        order = np.argsort(tick, kind="mergesort")
+
+        # Build index of where each tick's spikes start
+        tick_offsets = np.zeros(num_ticks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tick, minlength=num_ticks),
+                  out=tick_offsets[1:])
+
+        return cls(shape, tick_offsets,
+                   _compact(tick[order], num_ticks),
+                   _compact(np.asarray(x)[order], shape[-3]),
+                   _compact(np.asarray(y)[order], shape[-2]),
+                   _compact(np.asarray(z)[order], shape[-1]))
+
+    @classmethod
+    def from_dense(cls, spikes):
+        """Create a spike store from a dense array of spikes"""
+        # Flatten leading axes into ticks and find spikes
+        flat_spikes = spikes.reshape((-1,) + spikes.shape[-3:])
+        tick, x, y, z = np.nonzero(flat_spikes)
+        return cls.from_events(spikes.shape, tick, x, y, z)
+
+    @classmethod
+    def load(cls, filename):
+        """Load a spike store previously saved with `save`"""
+        data = np.load(filename)
+        return cls(data["shape"], data["tick_offsets"], data["tick"],
+                   data["x"], data["y"], data["z"])
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def save(self, filename):
+        """Save spike store to an (uncompressed) numpy .npz file"""
+        np.savez(filename, shape=np.asarray(self.shape),
+                 tick_offsets=self.tick_offsets, tick=self.tick,
+                 x=self.x, y=self.y, z=self.z)
+
+    def events(self, tick_slice=None):
+        """Get tick, x, y and z columns of spikes in a range of ticks"""
+        start, stop = self._get_spike_range(tick_slice)
+        return (self.tick[start:stop], self.x[start:stop],
+                self.y[start:stop], self.z[start:stop])
+
+    def dense(self, tick_slice=None):
+        """Reconstruct dense array of spikes, either for a contiguous range
+        of (flattened) ticks or, if no range is specified, in full"""
+        start_tick, stop_tick, _ = (slice(None) if tick_slice is None
+                                    else tick_slice).indices(self.num_ticks)
+        num_ticks = max(0, stop_tick - start_tick)
+
+        # Scatter spikes within range into dense array
+        spikes = np.zeros((num_ticks,) + self.shape[-3:], dtype=np.uint8)
+        tick, x, y, z = self.events(slice(start_tick, stop_tick))
+        spikes[tick.astype(np.intp) - start_tick, x, y, z] = 1
+
+        # If all ticks were requested, restore original shape
+        if tick_slice is None:
+            return spikes.reshape(self.shape)
+        else:
+            return spikes
+
+    # ------------------------------------------------------------------------
+    # Properties
+    # ------------------------------------------------------------------------
+    @property
+    def num_ticks(self):
+        return int(np.prod(self.shape[:-3]))
+
+    @property
+    def num_spikes(self):
+        return int(self.tick_offsets[-1])
+
+    @property
+    def spikes_per_tick(self):
+        return np.diff(self.tick_offsets)
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _get_spike_range(self, tick_slice):
+        start_tick, stop_tick, _ = (slice(None) if tick_slice is None
+                                    else tick_slice).indices(self.num_ticks)
+        stop_tick = max(start_tick, stop_tick)
+        return self.tick_offsets[start_tick], self.tick_offsets[stop_tick]
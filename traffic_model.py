@@ -0,0 +1,295 @@
+# Import modules
+import logging
+import numpy as np
+
+# Import classes
+from conv_neuron_layer import Regions
+from rig.links import Links
+from rig.routing_table import Routes
+
+# Import functions
+from six import iteritems
+
+logger = logging.getLogger("convolver")
+
+# ----------------------------------------------------------------------------
+# Functions
+# ----------------------------------------------------------------------------
+def _get_num_neurons(x_slice, y_slice, z_slice):
+    return ((x_slice.stop - x_slice.start) * (y_slice.stop - y_slice.start) *
+            (z_slice.stop - z_slice.start))
+
+def get_expected_vertex_packets(layers, spike_rates):
+    """Get the number of packets each vertex is expected to send per tick
+    if its neurons spike at the rates passed to
+    :py:meth:`~conv_net.ConvNet.add_layer` (None is treated as no spikes)"""
+    return {v: _get_num_neurons(*l.get_output_slices(v)) *
+               (0.0 if r is None else r)
+            for l, r in zip(layers, spike_rates) for v in l.vertices}
+
+def get_simulated_vertex_packets(layers, layer_spikes):
+    """Get the number of packets each vertex sends in each tick from the
+    spikes of each layer, as returned by
+    :py:meth:`~simulator.Simulator.run`, with images one after another"""
+    vertex_packets = {}
+    for l, spikes in zip(layers, layer_spikes):
+        spikes = spikes.reshape((-1,) + spikes.shape[2:])
+        for v in l.vertices:
+            x_slice, y_slice, z_slice = l.get_output_slices(v)
+            vertex_packets[v] = np.sum(spikes[:, x_slice, y_slice, z_slice],
+                                       axis=(1, 2, 3))
+    return vertex_packets
+
+def get_recorded_vertex_packets(layers, num_ticks, region_memory=None):
+    """Get the number of packets each vertex sent in each tick of a
+    simulation on SpiNNaker from the statistics it recorded every tick or,
+    if these weren't recorded, the mean number sent per tick"""
+    vertex_packets = {}
+    for l in layers:
+        if l.regions[Regions.tick_statistics].record:
+            spikes_emitted = l.read_tick_statistics(region_memory)[
+                :num_ticks, :, l.tick_statistic_names.index("spikes_emitted")]
+            vertex_packets.update(
+                (v, spikes_emitted[:, i]) for i, v in enumerate(l.vertices))
+        else:
+            spikes_emitted = l.read_statistics(region_memory)["spikes_emitted"]
+            vertex_packets.update(
+                (v, float(s) / float(num_ticks))
+                for v, s in zip(l.vertices, spikes_emitted))
+    return vertex_packets
+
+# ----------------------------------------------------------------------------
+# TrafficEstimate
+# ----------------------------------------------------------------------------
+class TrafficEstimate(object):
+    """Multicast packets handled by each router and sent along each inter-
+    chip link in each tick, alongside the fraction of their capacity this
+    requires while the cores sending them are emitting spikes"""
+    def __init__(self, router_packets, router_utilisation, link_packets,
+                 link_utilisation):
+        """
+        Parameters
+        ----------
+        router_packets : {(x, y): ndarray, ...}
+        router_utilisation : {(x, y): ndarray, ...}
+        link_packets : {((x, y), :py:class:`~rig.links.Links`): ndarray, ...}
+        link_utilisation : {((x, y), :py:class:`~rig.links.Links`): ndarray, ...}
+        """
+        self.router_packets = router_packets
+        self.router_utilisation = router_utilisation
+        self.link_packets = link_packets
+        self.link_utilisation = link_utilisation
+
+# ----------------------------------------------------------------------------
+# TrafficModel
+# ----------------------------------------------------------------------------
+class TrafficModel(object):
+    """Model of the multicast traffic each router and inter-chip link carries,
+    used to find links busy enough for packets to be dropped.
+
+    The route each vertex's packets take is found by looking up its routing
+    key in the routing tables loaded onto each chip, following default routes
+    where no entry matches. As in
+    :py:class:`~performance_model.PerformanceModel`, each core is assumed to
+    emit its spikes back-to-back at the start of each tick, so the packets
+    crossing a router or link arrive over the longest emission period of the
+    cores which send them. If this rate exceeds the capacity of the link,
+    packets back up into the router which, after a timeout, drops them.
+
+    **NOTE** the default capacities are rough estimates for SpiNNaker and
+    should be calibrated against the router diagnostic counters
+    """
+    def __init__(self, cost_model, placements, routing_tables, machine_width,
+                 machine_height, link_packets_per_us=6.0,
+                 router_packets_per_us=50.0, max_utilisation=0.5):
+        """
+        Parameters
+        ----------
+        cost_model : :py:class:`~cost_model.CostModel`
+            used to calculate how quickly cores emit spikes
+        placements : {vertex: (x, y), ...}
+        routing_tables : {(x, y): [:py:class:`~rig.routing_table.RoutingTableEntry`, ...], ...}
+            routing tables, as loaded onto the machine
+        machine_width : int
+        machine_height : int
+        link_packets_per_us : float
+            number of multicast packets an inter-chip link can carry per us
+        router_packets_per_us : float
+            number of multicast packets a router can route per us
+        max_utilisation : float
+            fraction of a link or router's capacity above which packets are
+            at risk of being dropped due to bursts of traffic
+        """
+        self.link_packets_per_us = link_packets_per_us
+        self.router_packets_per_us = router_packets_per_us
+        self.max_utilisation = max_utilisation
+        self.routing_tables = routing_tables
+        self.machine_width = machine_width
+        self.machine_height = machine_height
+
+        # Calculate the time taken by a core to emit each spike
+        self.emit_us = (cost_model.get_emit_cycles(1) /
+                        float(cost_model.clock_mhz))
+
+        # Trace the routers and links each vertex's packets pass through
+        self.vertex_routes = {v: self._trace_route(p, v.routing_key)
+                              for v, p in iteritems(placements)}
+
+    # ------------------------------------------------------------------------
+    # Public methods
+    # ------------------------------------------------------------------------
+    def estimate(self, vertex_packets):
+        """Estimate the traffic through every router and link.
+
+        Parameters
+        ----------
+        vertex_packets : {vertex: float or ndarray, ...}
+            number of packets sent by each vertex, either per tick on
+            average or as an array with an entry for each tick
+
+        Returns
+        -------
+        :py:class:`TrafficEstimate`
+        """
+        # Stack packets sent by each vertex into an array of shape
+        # (ticks, vertices), broadcasting mean counts across all ticks
+        vertices = [v for v in vertex_packets if v in self.vertex_routes]
+        num_ticks = max([np.size(vertex_packets[v]) for v in vertices] + [1])
+        packets = np.vstack([np.broadcast_to(vertex_packets[v], (num_ticks,))
+                             for v in vertices] +
+                            [np.zeros((0, num_ticks))]).T.astype(float)
+
+        # Build the indices of the vertices whose packets
+        # pass through each router and along each link
+        router_vertices = {}
+        link_vertices = {}
+        for i, v in enumerate(vertices):
+            chips, links = self.vertex_routes[v]
+            for c in chips:
+                router_vertices.setdefault(c, []).append(i)
+            for l in links:
+                link_vertices.setdefault(l, []).append(i)
+
+        router_packets, router_utilisation = self._sum_traffic(
+            packets, router_vertices, self.router_packets_per_us)
+        link_packets, link_utilisation = self._sum_traffic(
+            packets, link_vertices, self.link_packets_per_us)
+        return TrafficEstimate(router_packets, router_utilisation,
+                               link_packets, link_utilisation)
+
+    def log_report(self, estimate, num_hottest=5):
+        """Log the routers and links carrying the most traffic and a
+        warning if any are busy enough for packets to be dropped"""
+        logger.info("Traffic estimate")
+        for name, packets, utilisation in (
+                ("Router", estimate.router_packets,
+                 estimate.router_utilisation),
+                ("Link", estimate.link_packets, estimate.link_utilisation)):
+            if len(packets) == 0:
+                logger.info("\tNo %s traffic", name.lower())
+                continue
+
+            total_packets = sum(np.sum(p) for p in packets.values())
+            num_ticks = len(next(iter(packets.values())))
+            logger.info("\t%ss - %u used, %.1f packets per tick in total",
+                        name, len(packets), total_packets / float(num_ticks))
+
+            # Log resources with the busiest ticks
+            hottest = sorted(packets, key=lambda k: np.amax(packets[k]),
+                             reverse=True)[:num_hottest]
+            for k in hottest:
+                logger.info("\t\t%s %s - mean:%.1f, max:%.1f packets per tick, "
+                            "peak utilisation:%.1f%%", name,
+                            self._get_name(k), np.mean(packets[k]),
+                            np.amax(packets[k]),
+                            np.amax(utilisation[k]) * 100.0)
+
+            # Warn about resources whose utilisation is high enough
+            # that packets are likely to be or will be dropped
+            at_risk = [k for k, u in iteritems(utilisation)
+                       if np.amax(u) > self.max_utilisation]
+            if len(at_risk) > 0:
+                saturated = [k for k in at_risk if np.amax(utilisation[k]) > 1.0]
+                worst = max(at_risk, key=lambda k: np.amax(utilisation[k]))
+                logger.warning("\t\t%u %ss are at risk of dropping packets "
+                               "(%u saturated) - worst is %s at %.1f%% "
+                               "utilisation in %u ticks", len(at_risk),
+                               name.lower(), len(saturated),
+                               self._get_name(worst),
+                               np.amax(utilisation[worst]) * 100.0,
+                               np.count_nonzero(utilisation[worst] >
+                                                self.max_utilisation))
+
+    # ------------------------------------------------------------------------
+    # Private methods
+    # ------------------------------------------------------------------------
+    def _lookup_route(self, chip, key):
+        # Find the route of the first entry in the chip's table
+        # which matches key, returning None if it is default routed
+        for entry in self.routing_tables.get(chip, []):
+            if (key & entry.mask) == entry.key:
+                return entry.route
+        return None
+
+    def _trace_route(self, source_chip, key):
+        # Follow the packets sent with key from their source chip,
+        # building the chips and (chip, link) pairs they pass through
+        chips = []
+        links = []
+        visited = set()
+        to_visit = [(source_chip, None)]
+        while len(to_visit) > 0:
+            chip, in_link = to_visit.pop()
+
+            # Don't follow any loops in routes
+            if chip in visited:
+                continue
+            visited.add(chip)
+            chips.append(chip)
+
+            # If no entry matches, packets arriving from another chip are
+            # default routed out of the opposite link whereas those
+            # sent by a core on this chip have nowhere to go
+            route = self._lookup_route(chip, key)
+            if route is None:
+                if in_link is None:
+                    continue
+                route = [Routes(in_link.opposite)]
+
+            # Follow each link of route to neighbouring chip
+            # **NOTE** wrap-around links are only followed if routed along
+            for r in route:
+                if r.is_link:
+                    link = Links(r)
+                    dx, dy = link.to_vector()
+                    links.append((chip, link))
+                    to_visit.append((((chip[0] + dx) % self.machine_width,
+                                      (chip[1] + dy) % self.machine_height),
+                                     link.opposite))
+        return chips, links
+
+    def _sum_traffic(self, packets, resource_vertices, packets_per_us):
+        # Sum the packets each resource carries per tick
+        # **NOTE** emission of each vertex's packets is spread
+        # over the time its core takes to emit them one by one
+        resource_packets = {}
+        resource_utilisation = {}
+        for k, vertex_indices in iteritems(resource_vertices):
+            vertex_packets = packets[:, vertex_indices]
+            total_packets = np.sum(vertex_packets, axis=1)
+            emit_us = np.amax(vertex_packets, axis=1) * self.emit_us
+
+            resource_packets[k] = total_packets
+            resource_utilisation[k] = np.divide(
+                total_packets, emit_us * packets_per_us,
+                out=np.zeros_like(total_packets), where=(emit_us > 0.0))
+        return resource_packets, resource_utilisation
+
+    @staticmethod
+    def _get_name(key):
+        # Get name of router or link
+        if isinstance(key[1], Links):
+            (x, y), link = key
+            return "(%u, %u) %s" % (x, y, link.name)
+        else:
+            return "(%u, %u)" % key